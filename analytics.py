@@ -0,0 +1,263 @@
+import logging
+import math
+from datetime import datetime, timezone
+
+from caches import LRUCache
+
+VERDICTS = ('approved', 'rejected')
+REVIEWING = 'reviewing'
+HOUR = 3600
+WINDOW_SLOTS = 24
+SKETCH_ACCURACY = 0.02
+SKETCH_MIN = 1
+SKETCH_MAX = 90 * 24 * HOUR
+TRACKED_HOMEWORKS = 100000
+MIN_SAMPLES = 20
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+DATE_LENGTH = len('2024-01-01T00:00:00Z')
+
+REVIEW_SLA_BREACHED = (
+    'Нарушен SLA проверки: {:.0%} работ проверялись дольше {:.1f} ч '
+    '(допустимо {:.0%}) за последние {} ч'
+)
+REJECTION_SLA_BREACHED = (
+    'Нарушен SLA возвратов: возвращено {:.0%} работ (допустимо {:.0%}) '
+    'за последние {} ч'
+)
+SLA_RESTORED = 'SLA {} снова соблюдается'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value):
+    """Метка времени из поля date_updated или None."""
+    if not isinstance(value, str) or len(value) != DATE_LENGTH:
+        return None
+    try:
+        return datetime.strptime(value, DATE_FORMAT).replace(
+            tzinfo=timezone.utc
+        ).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class LogHistogram:
+    """Гистограмма с логарифмическими корзинами для квантилей.
+
+    Число корзин фиксировано диапазоном значений, относительная
+    погрешность квантиля не больше accuracy.
+    """
+
+    def __init__(
+        self, accuracy=SKETCH_ACCURACY, low=SKETCH_MIN, high=SKETCH_MAX
+    ):
+        """Пустая гистограмма значений от low до high."""
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.low = low
+        self.counts = [0] * (self.index(high) + 1)
+        self.total = 0
+
+    def index(self, value):
+        """Номер корзины значения; края диапазона прижимаются."""
+        value = max(value, self.low)
+        return math.ceil(math.log(value / self.low) / self.log_gamma)
+
+    def add(self, value, count=1):
+        """Учёт значения."""
+        index = min(self.index(value), len(self.counts) - 1)
+        self.counts[index] += count
+        self.total += count
+
+    def subtract(self, other):
+        """Вычитание другой гистограммы той же формы."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] -= count
+        self.total -= other.total
+
+    def clear(self):
+        """Обнуление счётчиков."""
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+
+    def quantile(self, share):
+        """Оценка квантиля или None для пустой гистограммы."""
+        if not self.total:
+            return None
+        rank = share * (self.total - 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                return self.low * 2 * self.gamma ** index / (self.gamma + 1)
+        return None
+
+
+class WindowSlot:
+    """Счётчики одного интервала скользящего окна."""
+
+    def __init__(self):
+        """Пустой интервал."""
+        self.number = None
+        self.durations = LogHistogram()
+        self.approved = 0
+        self.rejected = 0
+        self.late = 0
+
+    def clear(self, number):
+        """Переиспользование интервала под номер number."""
+        self.number = number
+        self.durations.clear()
+        self.approved = self.rejected = self.late = 0
+
+
+class ReviewAnalytics:
+    """Потоковая статистика проверок со скользящим окном и SLA.
+
+    Окно из slots интервалов по slot_seconds секунд: каждое событие
+    добавляется в свой интервал и в общие счётчики, а устаревший
+    интервал вычитается из них при сдвиге окна. Память не зависит
+    от истории: гистограмма на интервал и LRU начала проверок.
+
+    SLA проверки — доля работ дольше review_sla не выше
+    1 - sla_quantile (то есть квантиль sla_quantile не выше review_sla);
+    эта доля считается счётчиком, поэтому проверка SLA — O(1).
+    """
+
+    def __init__(
+        self, review_sla=None, rejection_sla=None, sla_quantile=0.95,
+        slots=WINDOW_SLOTS, slot_seconds=HOUR, min_samples=MIN_SAMPLES,
+        on_alert=None, tracked=TRACKED_HOMEWORKS
+    ):
+        """Статистика за slots * slot_seconds секунд."""
+        self.review_sla = review_sla
+        self.rejection_sla = rejection_sla
+        self.sla_quantile = sla_quantile
+        self.slot_seconds = slot_seconds
+        self.min_samples = min_samples
+        self.on_alert = on_alert
+        self.slots = [WindowSlot() for _ in range(slots)]
+        self.total = WindowSlot()
+        self.current = None
+        self.started = LRUCache(tracked)
+        self.seen = LRUCache(tracked)
+        self.alerts = set()
+
+    @property
+    def window_hours(self):
+        """Длина окна в часах."""
+        return len(self.slots) * self.slot_seconds // HOUR
+
+    def slot(self, moment):
+        """Интервал окна для момента или None, если он вне окна."""
+        number = int(moment // self.slot_seconds)
+        if self.current is None or number > self.current:
+            self.advance(number)
+        if number <= self.current - len(self.slots):
+            return None
+        slot = self.slots[number % len(self.slots)]
+        if slot.number != number:
+            slot.clear(number)
+        return slot
+
+    def advance(self, number):
+        """Сдвиг окна: устаревшие интервалы вычитаются из общих счётчиков."""
+        self.current = number
+        for slot in self.slots:
+            if slot.number is None:
+                continue
+            if slot.number <= number - len(self.slots):
+                self.total.durations.subtract(slot.durations)
+                self.total.approved -= slot.approved
+                self.total.rejected -= slot.rejected
+                self.total.late -= slot.late
+                slot.clear(None)
+
+    def observe(self, source, homework, now=None):
+        """Учёт статуса работы из ответа API.
+
+        Повтор уже учтённого статуса (повторный запрос, общий токен)
+        пропускается. source — источник без секретов (хеш токена):
+        ключи учёта живут в памяти дольше кэша расшифрованных токенов.
+        """
+        status = homework.get('status')
+        key = (source, homework.get('id', homework.get('homework_name')))
+        moment = parse_date(homework.get('date_updated')) or now
+        if moment is None or self.seen.get(key) == (status, moment):
+            return
+        self.seen.set(key, (status, moment))
+        if status == REVIEWING:
+            self.started.set(key, moment)
+        elif status in VERDICTS:
+            self.record_verdict(key, status, moment)
+
+    def record_verdict(self, key, status, moment):
+        """Учёт вердикта и времени в статусе reviewing."""
+        slot = self.slot(moment)
+        if slot is None:
+            return
+        started = self.started.pop(key)
+        duration = None if started is None else moment - started
+        late = bool(
+            self.review_sla and duration is not None
+            and duration > self.review_sla
+        )
+        rejected = status == 'rejected'
+        for counters in (slot, self.total):
+            counters.rejected += rejected
+            counters.approved += not rejected
+            counters.late += late
+            if duration is not None:
+                counters.durations.add(duration)
+        self.check_sla()
+
+    def check_sla(self):
+        """Сравнение с SLA и оповещение при нарушении и восстановлении."""
+        reviews = self.total.durations.total
+        verdicts = self.total.approved + self.total.rejected
+        if self.review_sla and reviews >= self.min_samples:
+            late_share = self.total.late / reviews
+            self.alert(
+                'review_latency', late_share > 1 - self.sla_quantile,
+                REVIEW_SLA_BREACHED.format(
+                    late_share, self.review_sla / HOUR,
+                    1 - self.sla_quantile, self.window_hours
+                )
+            )
+        if self.rejection_sla and verdicts >= self.min_samples:
+            rate = self.total.rejected / verdicts
+            self.alert(
+                'rejection_rate', rate > self.rejection_sla,
+                REJECTION_SLA_BREACHED.format(
+                    rate, self.rejection_sla, self.window_hours
+                )
+            )
+
+    def alert(self, name, breached, message):
+        """Оповещение о смене состояния SLA name."""
+        if breached == (name in self.alerts):
+            return
+        if breached:
+            self.alerts.add(name)
+            logger.error(message)
+        else:
+            self.alerts.discard(name)
+            message = SLA_RESTORED.format(name)
+            logger.info(message)
+        if self.on_alert:
+            self.on_alert(message)
+
+    def report(self):
+        """Сводка за окно."""
+        verdicts = self.total.approved + self.total.rejected
+        return {
+            'window_hours': self.window_hours,
+            'verdicts': verdicts,
+            'reviews_timed': self.total.durations.total,
+            'reviewing_p50': self.total.durations.quantile(0.5),
+            'reviewing_p95': self.total.durations.quantile(0.95),
+            'rejection_rate': (
+                self.total.rejected / verdicts if verdicts else None
+            ),
+            'alerts': sorted(self.alerts),
+        }
@@ -0,0 +1,126 @@
+import logging
+import random
+import time
+
+from telebot import TeleBot, apihelper
+
+from botapi import TelegramClient
+from fake_telegram import FakeTelegramServer
+from replay import replay
+from validation import HOMEWORK_SCHEMA, BatchValidator
+
+BENCH_RESULT = '{}: {} элементов, {:.0f} элементов/с (лучшее из {})'
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def make_homeworks(count, invalid_share=0.01, seed=0):
+    """Ответ API из count работ с долей некорректных."""
+    generator = random.Random(seed)
+    homeworks = []
+    for index in range(count):
+        homework = {
+            'id': index,
+            'homework_name': f'hw{index}.zip',
+            'status': generator.choice(STATUSES),
+            'reviewer_comment': 'Принято!',
+            'date_updated': '2021-04-11T10:31:09Z',
+            'lesson_name': 'Проект спринта',
+        }
+        if generator.random() < invalid_share:
+            del homework['homework_name']
+        homeworks.append(homework)
+    return homeworks
+
+
+def measure(func, items, repeat):
+    """Лучшая пропускная способность func на items за repeat прогонов."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def bench_validation(count=10000, repeat=5):
+    """Пропускная способность пакетной проверки работ."""
+    validator = BatchValidator(HOMEWORK_SCHEMA, quarantine_size=count)
+    rate = measure(validator.validate, make_homeworks(count), repeat)
+    print(BENCH_RESULT.format('validation', count, rate, repeat))
+    return rate
+
+
+def make_records(count, homeworks_per_response=3, error_share=0.05, seed=0):
+    """Запись count ответов API в формате recording."""
+    generator = random.Random(seed)
+    records = []
+    for index in range(count):
+        record = {'t': index * 600.0, 'd': 0.2, 'f': index}
+        if generator.random() < error_share:
+            record['e'] = ['ConnectionError', 'Connection reset by peer']
+        else:
+            record['r'] = {
+                'homeworks': make_homeworks(
+                    homeworks_per_response, invalid_share=0, seed=index
+                ),
+                'current_date': index + 1,
+            }
+        records.append(record)
+    return records
+
+
+def bench_replay(count=2000, repeat=3):
+    """Пропускная способность конвейера на воспроизведённых ответах."""
+    records = make_records(count)
+    rate = measure(replay, records, repeat)
+    print(BENCH_RESULT.format('replay', count, rate, repeat))
+    return rate
+
+
+def bench_telegram(count=200, repeat=3, latency=0.005, chats=20):
+    """Отправка сообщений: TeleBot против пула соединений.
+
+    Локальный сервер Bot API отвечает с задержкой latency, как сеть;
+    сообщения распределены по chats чатам.
+    """
+    messages = [
+        (str(index % chats), f'hw{index}.zip') for index in range(count)
+    ]
+    server = FakeTelegramServer(latency=latency)
+    server.start()
+    api_url, apihelper.API_URL = apihelper.API_URL, server.url + '/bot{0}/{1}'
+    bot = TeleBot('1:bench')
+    client = TelegramClient('1:bench', server.url)
+    senders = {
+        'telegram/telebot': lambda items: [
+            bot.send_message(*message) for message in items
+        ],
+        'telegram/pooled': lambda items: [
+            client.send_message(*message) for message in items
+        ],
+        'telegram/pipelined': client.send_many,
+    }
+    rates = {}
+    try:
+        for name, sender in senders.items():
+            rates[name] = measure(sender, messages, repeat)
+            print(BENCH_RESULT.format(name, count, rates[name], repeat))
+    finally:
+        apihelper.API_URL = api_url
+        client.close()
+        server.stop()
+    return rates
+
+
+BENCHMARKS = {
+    'validation': bench_validation,
+    'replay': bench_replay,
+    'telegram': bench_telegram,
+}
+
+
+if __name__ == '__main__':
+    logging.disable(logging.CRITICAL)
+    for bench in BENCHMARKS.values():
+        bench()
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = 'https://api.telegram.org'
+POOL_SIZE = 8
+REQUEST_TIMEOUT = 30
+FLOOD_RETRIES = 3
+MAX_RETRY_AFTER = 5
+
+TELEGRAM_ERROR = 'Bot API, код {}: {}'
+BAD_REPLY = 'ответ не в формате Bot API: {!r}'
+FLOOD_WAIT = 'Telegram просит подождать {} с перед отправкой в чат {}'
+FLOOD_BLOCKED = 'отправка приостановлена по retry_after ещё на {} с'
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramError(Exception):
+    """Ответ Bot API с ok=false."""
+
+    def __init__(self, description, error_code=None, retry_after=None):
+        """Ошибка с кодом error_code; retry_after — для ответа 429."""
+        super().__init__(TELEGRAM_ERROR.format(error_code, description))
+        self.description = description
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+
+def parse_reply(status_code, body):
+    """Поле result ответа Bot API; TelegramError при ok=false.
+
+    Для ответа 429 retry_after берётся из parameters.
+    """
+    try:
+        reply = json.loads(body)
+    except ValueError:
+        reply = None
+    if not isinstance(reply, dict):
+        raise TelegramError(BAD_REPLY.format(body[:100]), status_code)
+    if reply.get('ok'):
+        return reply.get('result')
+    parameters = reply.get('parameters')
+    retry_after = None
+    if isinstance(parameters, dict):
+        retry_after = parameters.get('retry_after')
+    if not isinstance(retry_after, int) or retry_after < 0:
+        retry_after = None
+    raise TelegramError(
+        reply.get('description'), reply.get('error_code', status_code),
+        retry_after
+    )
+
+
+class TelegramClient:
+    """Клиент Bot API с пулом keep-alive соединений.
+
+    Заменяет TeleBot за send_chat_message: метод send_message(chat_id,
+    text) с той же сигнатурой. Ответ 429 с retry_after не больше
+    max_retry_after секунд ждётся и запрос повторяется; более долгое
+    ожидание поднимает TelegramError, и до его окончания отправка
+    отклоняется без запроса к API.
+    """
+
+    def __init__(
+        self, token, api_url=API_URL, pool_size=POOL_SIZE,
+        timeout=REQUEST_TIMEOUT, flood_retries=FLOOD_RETRIES,
+        max_retry_after=MAX_RETRY_AFTER, sleep=time.sleep,
+        clock=time.monotonic
+    ):
+        """Клиент бота token на pool_size соединений."""
+        self.url = f'{api_url.rstrip("/")}/bot{token}/'
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.flood_retries = flood_retries
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep
+        self.clock = clock
+        self.blocked_until = 0
+        self.flood_waits = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def check_blocked(self):
+        """TelegramError, пока не истёк долгий retry_after."""
+        remaining = self.blocked_until - self.clock()
+        if remaining > 0:
+            raise TelegramError(
+                FLOOD_BLOCKED.format(math.ceil(remaining)), 429,
+                math.ceil(remaining)
+            )
+
+    def call(self, method, **params):
+        """Вызов метода Bot API; возвращает поле result."""
+        for attempt in range(self.flood_retries + 1):
+            self.check_blocked()
+            response = self.session.post(
+                self.url + method, json=params, timeout=self.timeout
+            )
+            try:
+                return parse_reply(response.status_code, response.content)
+            except TelegramError as error:
+                if error.retry_after is None:
+                    raise
+                if (
+                    attempt == self.flood_retries
+                    or error.retry_after > self.max_retry_after
+                ):
+                    self.blocked_until = self.clock() + error.retry_after
+                    raise
+                logger.warning(FLOOD_WAIT.format(
+                    error.retry_after, params.get('chat_id')
+                ))
+                self.flood_waits += 1
+                self.sleep(error.retry_after)
+
+    def send_message(self, chat_id, text, **params):
+        """Отправка сообщения в чат."""
+        return self.call('sendMessage', chat_id=chat_id, text=text, **params)
+
+    def send_many(self, messages):
+        """Одновременная отправка пар (chat_id, text) по соединениям пула.
+
+        Сообщения одного чата уходят по очереди, чтобы сохранить порядок.
+        Результаты — в порядке messages; на месте неотправленного
+        сообщения стоит исключение.
+        """
+        chats = {}
+        for index, (chat_id, _) in enumerate(messages):
+            chats.setdefault(chat_id, []).append(index)
+        results = [None] * len(messages)
+
+        def send_chat(indices):
+            for index in indices:
+                try:
+                    results[index] = self.send_message(*messages[index])
+                except (TelegramError, requests.RequestException) as error:
+                    results[index] = error
+
+        with ThreadPoolExecutor(self.pool_size) as executor:
+            list(executor.map(send_chat, chats.values()))
+        return results
+
+    def close(self):
+        """Закрытие соединений пула."""
+        self.session.close()
+
+
+class AsyncTelegramClient:
+    """Асинхронный вариант TelegramClient для asyncio.
+
+    Запросы идут через пул соединений TelegramClient в потоках
+    по числу соединений, так что одновременные send_message
+    не блокируют цикл событий и не открывают лишних соединений.
+    Одновременные отправки в один чат выполняются в порядке вызова.
+    """
+
+    def __init__(self, token, api_url=API_URL, pool_size=POOL_SIZE, **options):
+        """Клиент бота token на pool_size соединений."""
+        self.client = TelegramClient(token, api_url, pool_size, **options)
+        self.executor = ThreadPoolExecutor(
+            pool_size, thread_name_prefix='telegram'
+        )
+        self.chats = {}
+        self.lock = threading.Lock()
+
+    async def call(self, method, **params):
+        """Вызов метода Bot API; возвращает поле result."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, partial(self.client.call, method, **params)
+        )
+
+    async def send_message(self, chat_id, text, **params):
+        """Отправка сообщения в чат после предыдущих в этот же чат."""
+        with self.lock:
+            entry = self.chats.setdefault(chat_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self.call(
+                    'sendMessage', chat_id=chat_id, text=text, **params
+                )
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.chats[chat_id]
+
+    async def send_many(self, messages):
+        """Одновременная отправка пар (chat_id, text).
+
+        Результаты — в порядке messages, ошибки — на месте результата.
+        """
+        return await asyncio.gather(
+            *(self.send_message(chat_id, text) for chat_id, text in messages),
+            return_exceptions=True
+        )
+
+    def close(self):
+        """Остановка потоков и закрытие соединений."""
+        self.executor.shutdown()
+        self.client.close()
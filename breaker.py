@@ -0,0 +1,82 @@
+import logging
+import time
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+FAILURE_THRESHOLD = 5
+COOLDOWN = 300
+
+BREAKER_OPENED = 'Запросы к {} приостановлены на {} с после {} сбоев подряд'
+BREAKER_OPEN_ERROR = 'Запросы к {} приостановлены после сбоев подряд'
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(ConnectionError):
+    """Запрос не выполнялся: автомат разомкнут."""
+
+
+class CircuitBreaker:
+    """Автомат, приостанавливающий запросы к недоступному сервису.
+
+    После threshold сбоев сервиса подряд запросы не выполняются cooldown
+    секунд, затем пропускается один пробный запрос.
+    """
+
+    def __init__(
+        self, name, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN,
+        failures=(ConnectionError,), clock=time.monotonic, counted=None
+    ):
+        """Замкнутый автомат для сервиса name.
+
+        Сбоем считаются исключения failures и те, для которых
+        counted(исключение) истинно (например, ответы 5xx).
+        """
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failure_types = failures
+        self.counted = counted
+        self.clock = clock
+        self.failures = 0
+        self.opened = None
+
+    @property
+    def state(self):
+        """Состояние: closed, open или half_open."""
+        if self.opened is None:
+            return CLOSED
+        if self.clock() - self.opened < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def success(self):
+        """Учёт успешного запроса."""
+        self.failures = 0
+        self.opened = None
+
+    def failure(self):
+        """Учёт сбоя; при достижении порога автомат размыкается."""
+        self.failures += 1
+        if self.failures >= self.threshold or self.opened is not None:
+            self.opened = self.clock()
+            logger.warning(BREAKER_OPENED.format(
+                self.name, self.cooldown, self.failures
+            ))
+
+    def wrap(self, func):
+        """Функция, вызываемая только при замкнутом автомате."""
+        def guarded(*args, **kwargs):
+            if self.state == OPEN:
+                raise UpstreamUnavailable(BREAKER_OPEN_ERROR.format(self.name))
+            try:
+                result = func(*args, **kwargs)
+            except Exception as error:
+                if isinstance(error, self.failure_types) or (
+                    self.counted is not None and self.counted(error)
+                ):
+                    self.failure()
+                raise
+            self.success()
+            return result
+        guarded.__name__ = func.__name__
+        return guarded
@@ -0,0 +1,165 @@
+import sys
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Приблизительный размер объекта с вложенными контейнерами, байт."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(key) + estimate_size(item)
+            for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class LRUCache:
+    """Словарь ограниченного размера с вытеснением давно не используемых.
+
+    Размер ограничен числом записей maxsize и, если задана функция
+    weigh, суммарным весом записей maxweight (например, в байтах).
+    Попадания, промахи и вытеснения считаются для метрик. on_evict(ключ,
+    значение) вызывается для вытесненных записей, например чтобы
+    закрыть соединения.
+    """
+
+    def __init__(self, maxsize, maxweight=None, weigh=None, on_evict=None):
+        """Пустой кэш на maxsize записей."""
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.on_evict = on_evict
+        self.data = OrderedDict()
+        self.weights = {}
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        """Есть ли ключ в кэше."""
+        return key in self.data
+
+    def __len__(self):
+        """Число записей в кэше."""
+        return len(self.data)
+
+    def __getitem__(self, key):
+        """Значение по ключу; KeyError, если его нет."""
+        if key not in self:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Запись значения."""
+        self.set(key, value)
+
+    def entry_value(self, entry):
+        """Значение хранимой записи."""
+        return entry
+
+    def get(self, key, default=None):
+        """Значение по ключу с отметкой об использовании."""
+        if key not in self:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.data.move_to_end(key)
+        return self.entry_value(self.data[key])
+
+    def store(self, key, entry, value):
+        """Запись с учётом веса и вытеснением самых старых."""
+        self.pop(key)
+        self.data[key] = entry
+        if self.weigh:
+            self.weights[key] = self.weigh(value)
+            self.weight += self.weights[key]
+        while len(self.data) > self.maxsize or (
+            self.maxweight is not None and self.weight > self.maxweight
+            and len(self.data) > 1
+        ):
+            oldest = next(iter(self.data))
+            evicted = self.remove(oldest)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(oldest, self.entry_value(evicted))
+
+    def set(self, key, value):
+        """Запись значения с вытеснением самых старых при переполнении."""
+        self.store(key, value, value)
+
+    def remove(self, key):
+        """Удаление записи; возвращает хранимую запись."""
+        self.weight -= self.weights.pop(key, 0)
+        return self.data.pop(key)
+
+    def pop(self, key, default=None):
+        """Удаление значения по ключу."""
+        if key not in self.data:
+            return default
+        return self.entry_value(self.remove(key))
+
+    def clear(self):
+        """Удаление всех записей."""
+        self.data.clear()
+        self.weights.clear()
+        self.weight = 0
+
+    def items(self):
+        """Пары ключ-значение от старых к новым."""
+        return list(self.data.items())
+
+    def stats(self):
+        """Размер, попадания и вытеснения для метрик."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'weight': self.weight if self.weigh else None,
+            'maxweight': self.maxweight,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'evictions': self.evictions,
+        }
+
+
+class TTLCache(LRUCache):
+    """LRU-кэш, записи которого устаревают через ttl секунд."""
+
+    def __init__(
+        self, maxsize, ttl, timer=time.monotonic, maxweight=None, weigh=None
+    ):
+        """Пустой кэш на maxsize записей со сроком жизни ttl."""
+        super().__init__(maxsize, maxweight, weigh)
+        self.ttl = ttl
+        self.timer = timer
+
+    def __contains__(self, key):
+        """Есть ли неустаревшая запись с ключом."""
+        entry = self.data.get(key)
+        if entry is None:
+            return False
+        if self.timer() >= entry[1]:
+            self.remove(key)
+            return False
+        return True
+
+    def entry_value(self, entry):
+        """Значение без срока жизни."""
+        return entry[0]
+
+    def set(self, key, value):
+        """Запись значения со сроком жизни ttl."""
+        self.store(key, (value, self.timer() + self.ttl), value)
+
+    def items(self):
+        """Неустаревшие пары ключ-значение от старых к новым."""
+        now = self.timer()
+        return [
+            (key, value) for key, (value, expires) in list(self.data.items())
+            if now < expires
+        ]
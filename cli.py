@@ -0,0 +1,203 @@
+import argparse
+import csv
+import logging
+import sys
+from datetime import datetime, timezone
+
+import benchmarks
+import homework
+from history import COLUMNS, scan
+from statuses import StatusRegistry
+from tenants import Tenant, TenantRegistry, read_tenants_csv
+from vault import TokenVault
+
+DRY_RUN_MESSAGE = '[{}] {}'
+CHECK_FAILED = 'Проверка не пройдена: {}'
+CHECK_PASSED = (
+    'Проверка пройдена: арендаторов {}, статусов {}, хранилище: {}'
+)
+VAULT_REQUIRED = 'Для импорта нужны VAULT_FILE и VAULT_KEY (--vault, --key)'
+IMPORT_FAILED = 'Импорт отменён, ничего не записано: {}'
+IMPORT_CHECKED = 'Проверено арендаторов: {}, запись не выполнялась'
+IMPORT_DONE = 'Импортировано арендаторов: {}'
+UNKNOWN_BENCHMARKS = 'Неизвестные бенчмарки: {}; доступны: {}'
+HISTORY_REQUIRED = 'Укажите каталог истории: HISTORY_DIR или --dir'
+DRY_RUN_DISABLED = (
+    'STATE_FILE', 'SNAPSHOT_FILE', 'HISTORY_DIR', 'RECORD_FILE',
+    'INGEST_PORT', 'BROKER_FILE'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def dry_run_sender(bot, tenant, text):
+    """Вывод сообщения вместо отправки."""
+    print(DRY_RUN_MESSAGE.format(tenant.chat_id, text))
+    return True
+
+
+def run(args):
+    """Цикл опроса; с once — один цикл по всем арендаторам."""
+    homework.apply_run_arguments(args)
+    homework.ONCE = args.once
+    if args.dry_run:
+        homework.SENDER = dry_run_sender
+        for name in DRY_RUN_DISABLED:
+            setattr(homework, name, None)
+    homework.setup_logging(logging.INFO if args.dry_run else logging.DEBUG)
+    homework.main()
+    return 0
+
+
+def check(args):
+    """Проверка окружения и конфигурации без запросов к API."""
+    try:
+        homework.check_tokens()
+        statuses = StatusRegistry(
+            homework.HOMEWORK_VERDICTS, homework.STATUS_CHANGED,
+            homework.UNEXPECTED_STATUS
+        )
+        if homework.STATUSES_FILE:
+            statuses.load(homework.STATUSES_FILE)
+        vault = None
+        if homework.VAULT_FILE:
+            vault = TokenVault(homework.VAULT_FILE, homework.VAULT_KEY)
+        registry = TenantRegistry(
+            Tenant(
+                homework.PRACTICUM_TOKEN, homework.TELEGRAM_TOKEN,
+                homework.TELEGRAM_CHAT_ID
+            ),
+            homework.TENANTS_FILE, vault
+        )
+    except Exception as error:
+        print(CHECK_FAILED.format(error))
+        return 1
+    print(CHECK_PASSED.format(
+        len(registry), len(statuses.statuses),
+        homework.VAULT_FILE or '—'
+    ))
+    return 0
+
+
+def import_tenants(args):
+    """Загрузка арендаторов из CSV в хранилище одной транзакцией."""
+    if not (args.vault and args.key):
+        print(VAULT_REQUIRED)
+        return 1
+    try:
+        tenants = read_tenants_csv(args.path)
+    except (OSError, ValueError) as error:
+        print(IMPORT_FAILED.format(error))
+        return 1
+    if args.dry_run:
+        print(IMPORT_CHECKED.format(len(tenants)))
+        return 0
+    vault = TokenVault(args.vault, args.key)
+    try:
+        vault.put_many(tenants)
+    finally:
+        vault.close()
+    print(IMPORT_DONE.format(len(tenants)))
+    return 0
+
+
+def bench(args):
+    """Запуск бенчмарков."""
+    unknown = set(args.names) - set(benchmarks.BENCHMARKS)
+    if unknown:
+        print(UNKNOWN_BENCHMARKS.format(
+            ', '.join(sorted(unknown)), ', '.join(benchmarks.BENCHMARKS)
+        ))
+        return 2
+    logging.disable(logging.CRITICAL)
+    for name in args.names or benchmarks.BENCHMARKS:
+        benchmarks.BENCHMARKS[name]()
+    return 0
+
+
+def moment(value):
+    """Метка времени из даты ISO 8601; без часового пояса — UTC."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def export_history(args):
+    """Вывод событий истории за интервал в CSV."""
+    if not args.dir:
+        print(HISTORY_REQUIRED)
+        return 1
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    writer.writerows(scan(args.dir, args.since, args.until, args.tenant))
+    return 0
+
+
+def build_parser():
+    """Разбор команд homework-bot."""
+    parser = argparse.ArgumentParser(
+        prog='homework-bot', description='Бот статусов домашних работ'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, once, help_text in (
+        ('run', False, 'опрос в бесконечном цикле'),
+        ('once', True, 'один цикл опроса всех арендаторов и выход'),
+    ):
+        command = homework.add_run_arguments(
+            commands.add_parser(name, help=help_text)
+        )
+        command.add_argument(
+            '--dry-run', action='store_true',
+            help=(
+                'вывести сообщения вместо отправки, не сохраняя состояние '
+                'и не принимая события'
+            )
+        )
+        command.set_defaults(handler=run, once=once)
+    commands.add_parser(
+        'check', help='проверка окружения и конфигурации'
+    ).set_defaults(handler=check)
+    importer = commands.add_parser(
+        'import', help='загрузка арендаторов из CSV в хранилище токенов'
+    )
+    importer.add_argument(
+        'path', help='CSV с колонками practicum_token,telegram_token,chat_id'
+    )
+    importer.add_argument('--vault', default=homework.VAULT_FILE)
+    importer.add_argument('--key', default=homework.VAULT_KEY)
+    importer.add_argument(
+        '--dry-run', action='store_true', help='только проверить файл'
+    )
+    importer.set_defaults(handler=import_tenants)
+    bencher = commands.add_parser('bench', help='бенчмарки')
+    bencher.add_argument(
+        'names', nargs='*',
+        help='имена бенчмарков ({}), по умолчанию все'.format(
+            ', '.join(benchmarks.BENCHMARKS)
+        )
+    )
+    bencher.set_defaults(handler=bench)
+    history = commands.add_parser(
+        'history', help='выгрузка истории статусов в CSV'
+    )
+    history.add_argument('--dir', default=homework.HISTORY_DIR)
+    history.add_argument(
+        '--since', type=moment, help='начало интервала, ISO 8601 (UTC)'
+    )
+    history.add_argument(
+        '--until', type=moment, help='конец интервала, не включая его'
+    )
+    history.add_argument('--tenant', help='ключ арендатора')
+    history.set_defaults(handler=export_history)
+    return parser
+
+
+def main(argv=None):
+    """Запуск команды; возвращает код выхода."""
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import time
+
+
+class SystemClock:
+    """Системные часы: текущее время, монотонное время и пауза."""
+
+    def time(self):
+        """Текущее время."""
+        return time.time()
+
+    def monotonic(self):
+        """Монотонное время."""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Пауза."""
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """Часы модельного времени: пауза только сдвигает время."""
+
+    def __init__(self, start=0.0):
+        """Часы, показывающие start."""
+        self.now = float(start)
+        self.slept = 0.0
+
+    def time(self):
+        """Текущее модельное время."""
+        return self.now
+
+    def monotonic(self):
+        """Монотонное время совпадает с модельным."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Сдвиг времени вместо ожидания."""
+        self.now += seconds
+        self.slept += seconds
+
+
+system_clock = SystemClock()
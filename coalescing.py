@@ -0,0 +1,71 @@
+import logging
+import threading
+
+from caches import LRUCache
+
+COMPLETED_CALLS = 1024
+
+COALESCED_CALL = 'Запрос {} объединён с уже выполненным'
+
+logger = logging.getLogger(__name__)
+
+
+class Call:
+    """Результат одного вызова, общий для всех ожидающих."""
+
+    def __init__(self):
+        """Ещё не завершённый вызов."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединение одинаковых запросов в один вызов.
+
+    Пока вызов с ключом выполняется, остальные запросы с тем же ключом
+    ждут его результата. Завершённые вызовы хранятся до reset() в кэше
+    completed (по умолчанию LRU на COMPLETED_CALLS записей), поэтому
+    в пределах одного цикла опроса запрос с ключом выполняется один раз,
+    а память под результаты ограничена.
+    """
+
+    def __init__(self, completed=None):
+        """Пустой набор вызовов."""
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.completed = (
+            LRUCache(COMPLETED_CALLS) if completed is None else completed
+        )
+        self.hits = 0
+
+    def do(self, key, func, *args):
+        """Выполнить func(*args) или дождаться результата такого же вызова."""
+        with self.lock:
+            call = self.calls.get(key) or self.completed.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+            else:
+                self.hits += 1
+        if leader:
+            try:
+                call.result = func(*args)
+            except Exception as error:
+                call.error = error
+            finally:
+                call.done.set()
+                with self.lock:
+                    del self.calls[key]
+                    self.completed.set(key, call)
+        else:
+            logger.debug(COALESCED_CALL.format(func.__name__))
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def reset(self):
+        """Забыть завершённые вызовы перед новым циклом."""
+        with self.lock:
+            self.completed.clear()
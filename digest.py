@@ -0,0 +1,82 @@
+import threading
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+SEPARATOR = '\n\n'
+FLUSH_RESOLUTION = 0.5
+
+
+def cut_text(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Разбиение текста на куски не длиннее limit."""
+    return [text[start:start + limit] for start in range(0, len(text), limit)]
+
+
+def split_digest(items, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Объединение сообщений в сводки не длиннее limit.
+
+    Возвращает пары (текст сводки, сообщения в ней); слишком длинное
+    сообщение режется и попадает в несколько сводок.
+    """
+    chunks = []
+    texts, members, size = [], [], 0
+    for item in items:
+        for piece in cut_text(item.text, limit) or ['']:
+            extra = len(piece) + (len(SEPARATOR) if texts else 0)
+            if texts and size + extra > limit:
+                chunks.append((SEPARATOR.join(texts), members))
+                texts, members, size = [], [], 0
+                extra = len(piece)
+            texts.append(piece)
+            if not members or members[-1] is not item:
+                members.append(item)
+            size += extra
+    if texts:
+        chunks.append((SEPARATOR.join(texts), members))
+    return chunks
+
+
+def chat_key(outgoing):
+    """Ключ чата: бот и идентификатор чата арендатора."""
+    return id(outgoing.bot), outgoing.tenant.chat_id
+
+
+class DigestFlusher:
+    """Поток, отправляющий сводки по окончании окна.
+
+    Поток спит до окончания окна самой старой сводки в очереди, но не
+    дольше самого окна: сообщение, пришедшее во время сна, ждёт своего
+    окна не дольше digest_window. Очередь разгружается под lock, общим
+    с циклом опроса и приёмом событий.
+    """
+
+    def __init__(self, dispatcher, lock, budget=None):
+        """Поток для dispatcher с бюджетом budget сообщений за раз."""
+        self.dispatcher = dispatcher
+        self.lock = lock
+        self.budget = budget
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name='digest', daemon=True
+        )
+
+    def delay(self):
+        """Сколько ждать до следующей разгрузки."""
+        with self.lock:
+            due = self.dispatcher.next_flush()
+        if due is None:
+            return self.dispatcher.digest_window
+        return max(due, FLUSH_RESOLUTION)
+
+    def run(self):
+        """Разгрузка очереди по окончании окон до остановки."""
+        while not self.stopped.wait(self.delay()):
+            with self.lock:
+                self.dispatcher.drain(self.budget)
+
+    def start(self):
+        """Запуск потока."""
+        self.thread.start()
+
+    def stop(self):
+        """Остановка потока."""
+        self.stopped.set()
+        self.thread.join()
@@ -0,0 +1,364 @@
+import logging
+import time
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from digest import SEPARATOR, chat_key, cut_text, split_digest
+
+VERDICTS, REVIEWING, ERRORS = range(3)
+LANE_NAMES = ('verdicts', 'reviewing', 'errors')
+ERROR_LANE_SIZE = 100
+BLOCK, DROP_OLDEST, COALESCE = 'block', 'drop_oldest', 'coalesce'
+
+MESSAGE_DROPPED = 'Очередь {} переполнена, сообщение отброшено: {}'
+MESSAGE_REJECTED = 'Очередь {} переполнена, сообщение не принято: {}'
+
+Outgoing = namedtuple(
+    'Outgoing', ('bot', 'tenant', 'text', 'callback', 'created')
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Batch:
+    """Группа сообщений: on_complete вызывается после доставки всех."""
+
+    def __init__(self, size, on_complete):
+        """Группа из size сообщений."""
+        self.remaining = size
+        self.failed = False
+        self.on_complete = on_complete
+
+    def __call__(self, delivered):
+        """Учёт результата отправки одного сообщения."""
+        self.failed = self.failed or not delivered
+        self.remaining -= 1
+        if not self.remaining and not self.failed:
+            self.on_complete()
+
+
+def chain(first, second):
+    """Обратный вызов, передающий результат обоим."""
+    if not (first and second):
+        return first or second
+
+    def both(delivered):
+        first(delivered)
+        second(delivered)
+    return both
+
+
+class Lane:
+    """Полоса очереди отправки с ограничением размера.
+
+    При переполнении: block — новое сообщение не принимается (его
+    обратный вызов получает неудачу, и метка времени арендатора
+    не сдвигается), drop_oldest — отбрасывается самое старое,
+    coalesce — сообщение присоединяется к ожидающему в тот же чат.
+    Для наблюдения хранятся максимальная глубина и счётчики потерь.
+    """
+
+    def __init__(self, name, maxsize=None, overflow=BLOCK):
+        """Полоса на maxsize сообщений; None — без ограничения."""
+        self.name = name
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.items = deque()
+        self.high_watermark = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        """Число сообщений в полосе."""
+        return len(self.items)
+
+    def __iter__(self):
+        """Сообщения от старых к новым."""
+        return iter(self.items)
+
+    @property
+    def full(self):
+        """Достигнут ли предел размера."""
+        return self.maxsize is not None and len(self.items) >= self.maxsize
+
+    @property
+    def fill(self):
+        """Доля заполнения: от 0 до 1, без ограничения — 0."""
+        return len(self.items) / self.maxsize if self.maxsize else 0.0
+
+    def offer(self, outgoing):
+        """Постановка с учётом политики переполнения.
+
+        Возвращает (принято ли сообщение, вытесненное сообщение или None).
+        """
+        if not self.full:
+            self.append(outgoing)
+            return True, None
+        if self.overflow == DROP_OLDEST:
+            dropped = self.items.popleft()
+            self.dropped += 1
+            self.append(outgoing)
+            return True, dropped
+        if self.overflow == COALESCE and self.coalesce(outgoing):
+            return True, None
+        self.rejected += 1
+        return False, None
+
+    def coalesce(self, outgoing):
+        """Присоединение к последнему ожидающему сообщению того же чата."""
+        key = chat_key(outgoing)
+        for index in range(len(self.items) - 1, -1, -1):
+            waiting = self.items[index]
+            if chat_key(waiting) == key:
+                self.items[index] = waiting._replace(
+                    text=waiting.text + SEPARATOR + outgoing.text,
+                    callback=chain(waiting.callback, outgoing.callback)
+                )
+                self.coalesced += 1
+                return True
+        return False
+
+    def append(self, outgoing):
+        """Добавление в конец без проверки размера."""
+        self.items.append(outgoing)
+        self.high_watermark = max(self.high_watermark, len(self.items))
+
+    def popleft(self):
+        """Извлечение самого старого сообщения."""
+        return self.items.popleft()
+
+    def replace(self, items):
+        """Замена содержимого полосы."""
+        self.items = deque(items)
+
+    def metrics(self):
+        """Глубина, предел и счётчики полосы."""
+        return {
+            'depth': len(self.items),
+            'maxsize': self.maxsize,
+            'overflow': self.overflow,
+            'high_watermark': self.high_watermark,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+            'coalesced': self.coalesced,
+        }
+
+
+class Dispatcher:
+    """Очередь отправки с приоритетными полосами.
+
+    Сначала отправляются вердикты (approved/rejected), затем взятие
+    на проверку, последними ошибки. Размер и политика переполнения
+    полос задаются limits: {полоса: (размер, политика)}; по умолчанию
+    ограничена только полоса ошибок, с вытеснением старых сообщений.
+
+    С digest_window сообщения одного чата копятся до digest_window секунд
+    и уходят одной сводкой, разбитой по лимиту длины сообщения Telegram.
+    quota (с методом allow(ключ арендатора)) ограничивает отправку
+    каждому арендатору: сверх квоты сообщения остаются в очереди.
+
+    С workers > 1 разные чаты отправляются одновременно в workers
+    потоках, сообщения одного чата — по очереди; обратные вызовы
+    выполняются в вызывающем потоке после отправки.
+    """
+
+    def __init__(
+        self, sender, error_lane_size=ERROR_LANE_SIZE, digest_window=None,
+        clock=time.monotonic, limits=None, quota=None, workers=1
+    ):
+        """Очередь с функцией отправки sender(bot, tenant, text)."""
+        self.sender = sender
+        self.workers = workers
+        self.digest_window = digest_window
+        self.clock = clock
+        self.quota = quota
+        limits = {ERRORS: (error_lane_size, DROP_OLDEST), **(limits or {})}
+        self.lanes = tuple(
+            Lane(name, *limits.get(lane, (None, BLOCK)))
+            for lane, name in enumerate(LANE_NAMES)
+        )
+        self.pending = Counter()
+        self.dropped = 0
+        self.rejected = 0
+
+    def __len__(self):
+        """Общее число сообщений в очереди."""
+        return sum(len(lane) for lane in self.lanes)
+
+    def depths(self):
+        """Длины полос по именам."""
+        return {
+            name: len(lane) for name, lane in zip(LANE_NAMES, self.lanes)
+        }
+
+    def pressure(self):
+        """Заполнение самой загруженной ограниченной полосы, от 0 до 1.
+
+        Полосы drop_oldest (ошибки) не учитываются: при переполнении
+        они вытесняют старое, и опрос из-за них не откладывается.
+        """
+        return max(
+            (lane.fill for lane in self.lanes if lane.overflow != DROP_OLDEST),
+            default=0.0
+        )
+
+    def metrics(self):
+        """Метрики полос по именам."""
+        return {lane.name: lane.metrics() for lane in self.lanes}
+
+    def submit(self, lane, bot, tenant, text, callback=None):
+        """Постановка сообщения в полосу; False, если оно не принято."""
+        queue = self.lanes[lane]
+        outgoing = Outgoing(bot, tenant, text, callback, self.clock())
+        depth = len(queue)
+        accepted, dropped = queue.offer(outgoing)
+        if dropped:
+            self.dropped += 1
+            logger.warning(MESSAGE_DROPPED.format(queue.name, dropped.text))
+            self.finish(dropped, False)
+        if not accepted:
+            self.rejected += 1
+            logger.warning(MESSAGE_REJECTED.format(queue.name, text))
+            if callback:
+                callback(False)
+            return False
+        if len(queue) > depth or dropped:
+            self.pending[tenant.key] += 1
+        return True
+
+    def outbox(self):
+        """Сообщения вне групп Batch: тройки (полоса, ключ арендатора, текст).
+
+        Сообщения групп не переносятся: их арендатор ещё не сдвинул
+        метку времени и получит их снова при следующем опросе.
+        """
+        return [
+            (lane, outgoing.tenant.key, outgoing.text)
+            for lane, queue in enumerate(self.lanes)
+            for outgoing in queue
+            if not isinstance(outgoing.callback, Batch)
+        ]
+
+    def next_flush(self):
+        """Секунды до окончания окна самой старой сводки или None."""
+        if self.digest_window is None:
+            return None
+        created = [
+            outgoing.created for queue in self.lanes for outgoing in queue
+        ]
+        if not created:
+            return None
+        return max(min(created) + self.digest_window - self.clock(), 0)
+
+    def has_pending(self, tenant):
+        """Есть ли у арендатора неотправленные сообщения."""
+        return self.pending[tenant.key] > 0
+
+    def drain(self, budget=None, flush=False):
+        """Отправка не более budget сообщений в порядке приоритета.
+
+        flush отправляет сводки, не дожидаясь окончания окна.
+        """
+        if self.digest_window is not None:
+            return self.drain_digests(budget, flush)
+        taken = []
+        for queue in self.lanes:
+            deferred = []
+            while queue and (budget is None or len(taken) < budget):
+                outgoing = queue.popleft()
+                if not self.allowed(outgoing):
+                    deferred.append(outgoing)
+                    continue
+                taken.append(outgoing)
+            if deferred:
+                queue.replace(deferred + list(queue))
+        chats = OrderedDict()
+        for outgoing in taken:
+            chats.setdefault(chat_key(outgoing), []).append(outgoing)
+        results = {}
+        for chat in self.send_chats(chats.values(), self.send_each):
+            results.update(chat)
+        for outgoing in taken:
+            self.finish(outgoing, results[id(outgoing)])
+        return len(taken)
+
+    def send_each(self, items):
+        """Отправка сообщений одного чата по очереди.
+
+        Возвращает {id(сообщение): доставлено ли}.
+        """
+        return {
+            id(outgoing): all([
+                self.sender(outgoing.bot, outgoing.tenant, piece)
+                for piece in cut_text(outgoing.text) or ['']
+            ])
+            for outgoing in items
+        }
+
+    def send_chats(self, chats, send):
+        """Результаты send(группа) по группам чатов, в порядке chats.
+
+        Группы отправляются одновременно, если workers > 1.
+        """
+        chats = list(chats)
+        if self.workers <= 1 or len(chats) <= 1:
+            return [send(chat) for chat in chats]
+        with ThreadPoolExecutor(min(self.workers, len(chats))) as executor:
+            return list(executor.map(send, chats))
+
+    def allowed(self, outgoing):
+        """Укладывается ли сообщение в квоту арендатора."""
+        return self.quota is None or self.quota.allow(outgoing.tenant.key)
+
+    def drain_digests(self, budget=None, flush=False):
+        """Отправка сводок по чатам, у которых истекло окно."""
+        groups = OrderedDict()
+        for queue in self.lanes:
+            for outgoing in queue:
+                groups.setdefault(chat_key(outgoing), []).append(outgoing)
+        now = self.clock()
+        sent = 0
+        ready = []
+        for items in groups.values():
+            if budget is not None and sent >= budget:
+                break
+            oldest = min(outgoing.created for outgoing in items)
+            waiting = not flush and now - oldest < self.digest_window
+            if waiting or not self.allowed(items[0]):
+                continue
+            chunks = split_digest(items)
+            ready.append((items, chunks))
+            sent += len(chunks)
+        taken = set()
+        for (items, _), results in zip(
+            ready, self.send_chats(ready, self.send_digest)
+        ):
+            for outgoing in items:
+                taken.add(id(outgoing))
+                self.finish(outgoing, results[id(outgoing)])
+        for queue in self.lanes:
+            queue.replace(item for item in queue if id(item) not in taken)
+        return sent
+
+    def send_digest(self, group):
+        """Отправка сводок одного чата: group — (сообщения, сводки).
+
+        Возвращает {id(сообщение): доставлены ли все его сводки}.
+        """
+        items, chunks = group
+        results = {id(outgoing): True for outgoing in items}
+        for text, members in chunks:
+            first = members[0]
+            delivered = self.sender(first.bot, first.tenant, text)
+            for outgoing in members:
+                results[id(outgoing)] = results[id(outgoing)] and delivered
+        return results
+
+    def finish(self, outgoing, delivered):
+        """Учёт отправленного или отброшенного сообщения."""
+        self.pending[outgoing.tenant.key] -= 1
+        if not self.pending[outgoing.tenant.key]:
+            del self.pending[outgoing.tenant.key]
+        if outgoing.callback:
+            outgoing.callback(delivered)
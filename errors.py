@@ -0,0 +1,63 @@
+import traceback
+
+from caches import LRUCache
+
+ERROR_WINDOW = 3600
+ERROR_FINGERPRINTS_LIMIT = 64
+
+ERROR_DIGEST = '{} (повторилось ещё {} раз за {} мин.)'
+
+
+def fingerprint(error):
+    """Отпечаток ошибки: тип и место возникновения без текста."""
+    frames = traceback.extract_tb(error.__traceback__)
+    origin = f'{frames[-1].name}:{frames[-1].lineno}' if frames else ''
+    return f'{type(error).__name__}@{origin}'
+
+
+class ErrorAggregator:
+    """Подавление повторов ошибок в окне времени со сводкой по окончании.
+
+    Первая ошибка с новым отпечатком отправляется сразу, повторы в окне
+    только подсчитываются. Сводка содержит текст последнего повтора,
+    отпечаток пользователю не показывается. Число отпечатков ограничено
+    LRU-кэшем.
+    """
+
+    def __init__(
+        self, window=ERROR_WINDOW, max_fingerprints=ERROR_FINGERPRINTS_LIMIT
+    ):
+        """Учёт ошибок с окном window секунд."""
+        self.window = window
+        self.entries = LRUCache(max_fingerprints)
+
+    def record(self, error, message, now):
+        """Учёт ошибки; возвращает сообщение, если его нужно отправить."""
+        key = fingerprint(error)
+        entry = self.entries.get(key)
+        if entry and now - entry['since'] < self.window:
+            entry['suppressed'] += 1
+            entry['message'] = message
+            return None
+        self.entries.set(
+            key, {'since': now, 'suppressed': 0, 'message': message}
+        )
+        return message
+
+    def discard(self, error):
+        """Забыть ошибку, сообщение о которой не удалось отправить."""
+        self.entries.pop(fingerprint(error))
+
+    def digests(self, now):
+        """Сводки по истёкшим окнам с подавленными повторами."""
+        messages = []
+        for key, entry in self.entries.items():
+            if now - entry['since'] < self.window:
+                continue
+            self.entries.pop(key)
+            if entry['suppressed']:
+                messages.append(ERROR_DIGEST.format(
+                    entry.get('message') or key.split('@')[0],
+                    entry['suppressed'], self.window // 60
+                ))
+        return messages
@@ -0,0 +1,159 @@
+import heapq
+import logging
+import time
+
+from caches import LRUCache
+
+DEMOTE_AFTER = 3
+MIN_WEIGHT = 1 / 16
+BACKOFF = 600
+MAX_BACKOFF = 6 * 3600
+QUOTA_KEYS = 100000
+
+TENANT_DEMOTED = (
+    'Арендатор {} понижен после {} ошибок подряд: следующий опрос через {} с, '
+    'ошибки пишутся в журнал с уровнем DEBUG'
+)
+TENANT_RESTORED = 'Арендатор {} снова опрашивается в обычном режиме'
+
+logger = logging.getLogger(__name__)
+
+
+def tenant_weight(state, demote_after=DEMOTE_AFTER):
+    """Вес арендатора в очереди опросов.
+
+    Здоровый арендатор весит 1; начиная с demote_after ошибок подряд
+    вес вдвое меньше за каждую ошибку, но не меньше MIN_WEIGHT.
+    """
+    excess = state.get('errors', 0) - demote_after
+    if excess < 0:
+        return 1.0
+    return max(0.5 ** (excess + 1), MIN_WEIGHT)
+
+
+class FairScheduler:
+    """Взвешенная справедливая очередь опросов арендаторов.
+
+    У каждого арендатора есть виртуальное время state['vtime']; опрос
+    сдвигает его на 1 / вес. Цикл опрашивает готовых арендаторов
+    по возрастанию виртуального времени, не больше budget за цикл,
+    поэтому при нехватке бюджета здоровые арендаторы получают равные
+    доли опросов, а арендаторы с ошибками — меньшие. Простаивавший
+    или новый арендатор начинает с виртуального времени системы
+    и не копит преимущество.
+
+    После demote_after ошибок подряд арендатор понижается: опрос
+    откладывается на backoff секунд с удвоением за каждую следующую
+    ошибку, но не больше max_backoff.
+    """
+
+    def __init__(
+        self, budget=None, demote_after=DEMOTE_AFTER, backoff=BACKOFF,
+        max_backoff=MAX_BACKOFF
+    ):
+        """Очередь с бюджетом budget опросов за цикл; None — без него."""
+        self.budget = budget
+        self.demote_after = demote_after
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.virtual = 0.0
+        self.deferred = 0
+
+    def order(self, tenants, states):
+        """Готовые арендаторы в порядке опроса, не больше budget.
+
+        При равном виртуальном времени сохраняется порядок tenants.
+        """
+        queue = []
+        for index, tenant in enumerate(tenants):
+            state = states[tenant.key]
+            state['vtime'] = max(state.get('vtime', 0.0), self.virtual)
+            queue.append((state['vtime'], index, tenant))
+        if self.budget is None:
+            queue.sort()
+        else:
+            queue = heapq.nsmallest(self.budget, queue)
+        if queue:
+            self.virtual = queue[0][0]
+        self.deferred += len(tenants) - len(queue)
+        return [tenant for _, _, tenant in queue]
+
+    def charge(self, state):
+        """Учёт опроса в виртуальном времени арендатора."""
+        state['vtime'] = state.get('vtime', self.virtual) + 1 / tenant_weight(
+            state, self.demote_after
+        )
+
+    def demoted(self, state):
+        """Понижен ли арендатор."""
+        return state.get('errors', 0) >= self.demote_after
+
+    def failed(self, tenant, state, now):
+        """Откладывание опроса арендатора с ошибками подряд."""
+        excess = state.get('errors', 0) - self.demote_after
+        if excess < 0:
+            return
+        delay = min(self.backoff * 2 ** excess, self.max_backoff)
+        state['next_poll'] = max(state.get('next_poll') or 0, now + delay)
+        if not excess:
+            logger.warning(TENANT_DEMOTED.format(
+                tenant.key, state['errors'], delay
+            ))
+
+    def succeeded(self, tenant, state):
+        """Возврат понижённого арендатора после успешного опроса.
+
+        Виртуальное время, накопленное с малым весом, обрезается,
+        чтобы арендатор не ждал дольше остальных.
+        """
+        if self.demoted(state):
+            logger.info(TENANT_RESTORED.format(tenant.key))
+        state['vtime'] = min(
+            state.get('vtime', self.virtual), self.virtual + 1
+        )
+
+    def report(self, states):
+        """Сводка для метрик."""
+        return {
+            'budget': self.budget,
+            'virtual_time': self.virtual,
+            'deferred': self.deferred,
+            'demoted': sum(self.demoted(state) for state in states.values()),
+        }
+
+
+class Quota:
+    """Ограничение числа действий каждого ключа за период.
+
+    Счётчики ведутся по фиксированным окнам period секунд; число
+    отслеживаемых ключей ограничено LRU-кэшем.
+    """
+
+    def __init__(self, limit, period, clock=time.time, keys=QUOTA_KEYS):
+        """Не больше limit действий за period секунд на ключ."""
+        self.limit = limit
+        self.period = period
+        self.clock = clock
+        self.counters = LRUCache(keys)
+        self.denied = 0
+
+    def allow(self, key, cost=1):
+        """Списание cost действий; False, если квота окна исчерпана."""
+        window = int(self.clock() // self.period)
+        entry = self.counters.get(key)
+        if entry is None or entry[0] != window:
+            entry = [window, 0]
+            self.counters.set(key, entry)
+        if entry[1] + cost > self.limit:
+            self.denied += 1
+            return False
+        entry[1] += cost
+        return True
+
+    def report(self):
+        """Сводка для метрик."""
+        return {
+            'limit': self.limit,
+            'period': self.period,
+            'denied': self.denied,
+        }
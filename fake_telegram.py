@@ -0,0 +1,120 @@
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+TOO_MANY_REQUESTS = 'Too Many Requests: retry after {}'
+METHOD_NOT_FOUND = 'Not Found: method not found'
+
+logger = logging.getLogger(__name__)
+
+
+class FakeTelegramServer:
+    """Локальный сервер Bot API для тестов и бенчмарков.
+
+    Принимает sendMessage (параметры в строке запроса, JSON или форме)
+    и запоминает сообщения. Первые flood запросов получают 429
+    с retry_after, каждый ответ задерживается на latency секунд.
+    Соединения держатся открытыми (HTTP/1.1), их число — в connections.
+    """
+
+    def __init__(
+        self, port=0, host='127.0.0.1', latency=0, flood=0, retry_after=1
+    ):
+        """Сервер на host:port; запускается методом start."""
+        self.latency = latency
+        self.flood = flood
+        self.retry_after = retry_after
+        self.messages = []
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name='fake-telegram',
+            daemon=True
+        )
+
+    @property
+    def url(self):
+        """Адрес API для клиента."""
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def reply(self, method, params):
+        """Код и тело ответа на вызов метода."""
+        with self.lock:
+            self.requests += 1
+            if self.flood:
+                self.flood -= 1
+                return HTTPStatus.TOO_MANY_REQUESTS, {
+                    'ok': False, 'error_code': 429,
+                    'description': TOO_MANY_REQUESTS.format(self.retry_after),
+                    'parameters': {'retry_after': self.retry_after},
+                }
+            if method != 'sendMessage':
+                return HTTPStatus.NOT_FOUND, {
+                    'ok': False, 'error_code': 404,
+                    'description': METHOD_NOT_FOUND,
+                }
+            self.messages.append((str(params['chat_id']), params['text']))
+            number = len(self.messages)
+        return HTTPStatus.OK, {'ok': True, 'result': {
+            'message_id': number,
+            'date': int(time.time()),
+            'chat': {'id': int(params['chat_id']), 'type': 'private'},
+            'text': params['text'],
+        }}
+
+    def make_handler(self):
+        """Класс обработчика запросов с доступом к серверу."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = 64 * 1024
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                parts = urlsplit(self.path)
+                params = dict(parse_qsl(parts.query))
+                body = self.rfile.read(
+                    int(self.headers.get('Content-Length') or 0)
+                )
+                if self.headers.get('Content-Type') == 'application/json':
+                    params.update(json.loads(body))
+                elif body:
+                    params.update(parse_qsl(body.decode()))
+                time.sleep(fake.latency)
+                status, reply = fake.reply(
+                    parts.path.rsplit('/', 1)[-1], params
+                )
+                data = json.dumps(reply, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
+
+    def start(self):
+        """Запуск сервера."""
+        self.thread.start()
+
+    def stop(self):
+        """Остановка сервера."""
+        self.server.shutdown()
+        self.server.server_close()
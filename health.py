@@ -0,0 +1,129 @@
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOCALHOST = '127.0.0.1'
+
+HEALTH_STARTED = 'Сервер состояния слушает порт {}'
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Наблюдение за циклом опроса для проверок живости и готовности.
+
+    Цикл считается зависшим, если с начала текущего или конца прошлого
+    цикла прошло больше liveness_timeout секунд. Отставание — насколько
+    позже ожидаемого начался последний цикл.
+    """
+
+    def __init__(self, period, liveness_timeout, clock=time.time):
+        """Монитор цикла с периодом period."""
+        self.period = period
+        self.liveness_timeout = liveness_timeout
+        self.clock = clock
+        self.started = clock()
+        self.finished = None
+        self.cycles = 0
+        self.lag = 0.0
+        self.stopping = False
+
+    def cycle_started(self):
+        """Отметка о начале цикла."""
+        now = self.clock()
+        if self.finished is not None:
+            self.lag = max(now - self.finished - self.period, 0.0)
+        self.started = now
+
+    def cycle_finished(self):
+        """Отметка о конце цикла."""
+        self.finished = self.clock()
+        self.cycles += 1
+
+    @property
+    def live(self):
+        """Цикл не завис."""
+        last = max(self.started, self.finished or 0)
+        return self.clock() - last <= self.liveness_timeout
+
+    @property
+    def ready(self):
+        """Был хотя бы один цикл, и процесс не останавливается."""
+        return self.cycles > 0 and not self.stopping and self.live
+
+    def report(self):
+        """Сводка о цикле."""
+        return {
+            'live': self.live,
+            'ready': self.ready,
+            'cycles': self.cycles,
+            'last_cycle_started': self.started,
+            'last_cycle_finished': self.finished,
+            'scheduler_lag': self.lag,
+        }
+
+
+class HealthServer:
+    """HTTP-сервер проверок в отдельном потоке.
+
+    /healthz и /readyz отвечают 200 или 503, /status — подробной сводкой.
+    probe возвращает словарь с ключами live и ready. Сводка называет
+    арендаторов и не требует авторизации, поэтому по умолчанию сервер
+    слушает только LOCALHOST.
+    """
+
+    def __init__(self, probe, port, host=LOCALHOST):
+        """Сервер на host:port; запускается методом start."""
+        self.probe = probe
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name='health', daemon=True
+        )
+
+    @property
+    def port(self):
+        """Фактический порт сервера."""
+        return self.server.server_address[1]
+
+    def make_handler(self):
+        """Класс обработчика запросов с доступом к probe."""
+        probe = self.probe
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                report = probe()
+                checks = {'/healthz': 'live', '/readyz': 'ready'}
+                if self.path in checks:
+                    healthy = report.get(checks[self.path])
+                    status = (
+                        HTTPStatus.OK if healthy
+                        else HTTPStatus.SERVICE_UNAVAILABLE
+                    )
+                elif self.path == '/status':
+                    status = HTTPStatus.OK
+                else:
+                    status = HTTPStatus.NOT_FOUND
+                body = json.dumps(report, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
+
+    def start(self):
+        """Запуск сервера."""
+        self.thread.start()
+        logger.info(HEALTH_STARTED.format(self.port))
+
+    def stop(self):
+        """Остановка сервера."""
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,296 @@
+import csv
+import io
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from analytics import parse_date
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CHUNK_ROWS = 1000
+CHUNK_AGE = 3600
+BLOCK_SIZE = 64 * 1024
+GZIP_WBITS = 31
+DAY_FORMAT = '%Y-%m-%d'
+DAY_LENGTH = len('2024-01-01')
+CSV, PARQUET = 'csv', 'parquet'
+SUFFIXES = {CSV: '.csv.gz', PARQUET: '.parquet'}
+COLUMNS = (
+    'time', 'tenant', 'id', 'homework_name', 'lesson_name', 'status',
+    'updated'
+)
+NUMERIC = {'time': float, 'id': int, 'updated': float}
+OPTIONAL = ('id', 'lesson_name', 'updated')
+
+HISTORY_FAILED = 'Не удалось записать историю статусов в {}: {}'
+HISTORY_TORN = 'Отброшен неполный блок в конце файла истории {}'
+PARQUET_UNAVAILABLE = 'Для чтения {} нужен pyarrow'
+
+Event = namedtuple('Event', COLUMNS)
+
+logger = logging.getLogger(__name__)
+
+
+def day_of(timestamp):
+    """День UTC метки времени в виде 2024-01-01."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        DAY_FORMAT
+    )
+
+
+def in_range(moment, start=None, end=None):
+    """Попадает ли момент в полуинтервал [start, end)."""
+    return (start is None or moment >= start) and (
+        end is None or moment < end
+    )
+
+
+def overlaps(low, high, start=None, end=None):
+    """Пересекается ли отрезок [low, high] с [start, end)."""
+    return (start is None or high >= start) and (end is None or low < end)
+
+
+def encode_chunk(rows):
+    """Блок событий: сжатый gzip CSV, одна строка на колонку.
+
+    Строка колонки начинается с её имени, поэтому блоки с другим
+    набором колонок читаются тем же кодом.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for name, values in zip(COLUMNS, zip(*rows)):
+        writer.writerow((name, *values))
+    deflater = zlib.compressobj(9, zlib.DEFLATED, GZIP_WBITS)
+    return deflater.compress(
+        buffer.getvalue().encode('utf-8')
+    ) + deflater.flush()
+
+
+def decode_column(name, values):
+    """Значения колонки с исходными типами; пустые — None."""
+    kind = NUMERIC.get(name)
+    if kind is not None:
+        return [kind(value) if value else None for value in values]
+    if name in OPTIONAL:
+        return [value or None for value in values]
+    return values
+
+
+def read_chunks(path):
+    """Тексты блоков файла по порядку, без чтения файла целиком.
+
+    Неполный блок в конце (процесс остановился во время записи)
+    отбрасывается.
+    """
+    inflater, pieces, started = zlib.decompressobj(GZIP_WBITS), [], False
+    with open(path, 'rb') as file:
+        data = file.read(BLOCK_SIZE)
+        while data:
+            started = True
+            try:
+                pieces.append(inflater.decompress(data))
+            except zlib.error:
+                break
+            if not inflater.eof:
+                data = file.read(BLOCK_SIZE)
+                continue
+            yield b''.join(pieces).decode('utf-8')
+            data = inflater.unused_data or file.read(BLOCK_SIZE)
+            inflater, pieces, started = (
+                zlib.decompressobj(GZIP_WBITS), [], False
+            )
+    if started:
+        logger.warning(HISTORY_TORN.format(path))
+
+
+def read_csv(path, start=None, end=None):
+    """События из файла CSV+gzip в полуинтервале [start, end).
+
+    Блок, все события которого вне интервала, пропускается после
+    разбора одной колонки времени.
+    """
+    for text in read_chunks(path):
+        columns = {row[0]: row[1:] for row in csv.reader(io.StringIO(text))}
+        times = decode_column('time', columns.get('time', []))
+        if not times or not overlaps(min(times), max(times), start, end):
+            continue
+        decoded = [times] + [
+            decode_column(name, columns.get(name, [None] * len(times)))
+            for name in COLUMNS[1:]
+        ]
+        for event in map(Event._make, zip(*decoded)):
+            if in_range(event.time, start, end):
+                yield event
+
+
+def read_parquet(path, start=None, end=None):
+    """События из файла Parquet в полуинтервале [start, end)."""
+    if pyarrow is None:
+        logger.warning(PARQUET_UNAVAILABLE.format(path))
+        return
+    table = pyarrow.parquet.read_table(path)
+    for row in table.to_pylist():
+        event = Event(**{name: row.get(name) for name in COLUMNS})
+        if in_range(event.time, start, end):
+            yield event
+
+
+READERS = {CSV: read_csv, PARQUET: read_parquet}
+
+
+def history_files(directory, start=None, end=None):
+    """Файлы истории за дни, пересекающие [start, end), по порядку дней.
+
+    Файлы ищутся и во вложенных каталогах (по одному на процесс
+    опроса в режиме супервизора).
+    """
+    first = None if start is None else day_of(start)
+    last = None if end is None else day_of(end)
+    found = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            day = name[:DAY_LENGTH]
+            for kind, suffix in SUFFIXES.items():
+                if not name.endswith(suffix):
+                    continue
+                if (first and day < first) or (last and day > last):
+                    continue
+                found.append((day, os.path.join(root, name), kind))
+    return [(path, kind) for _, path, kind in sorted(found)]
+
+
+def scan(directory, start=None, end=None, tenant=None):
+    """События истории с time в [start, end) в порядке дней.
+
+    Читаются только файлы на диске, работающий бот не затрагивается.
+    Внутри дня события каждого процесса идут в порядке записи.
+    """
+    for path, kind in history_files(directory, start, end):
+        for event in READERS[kind](path, start, end):
+            if tenant is None or event.tenant == tenant:
+                yield event
+
+
+class HistoryExporter:
+    """Выгрузка смен статусов работ в сжатые колоночные файлы по дням.
+
+    События копятся блоками до chunk_rows событий или chunk_age секунд
+    и дописываются в файл дня UTC: с pyarrow — отдельным файлом
+    Parquet на блок, без него — блоком CSV+gzip в конец файла
+    ГГГГ-ММ-ДД.csv.gz (файл читается и zcat). Ошибка записи не прерывает
+    опрос: блок отбрасывается с записью в журнал.
+    """
+
+    def __init__(
+        self, chunk_rows=CHUNK_ROWS, chunk_age=CHUNK_AGE, clock=time.time
+    ):
+        """Выгрузка выключена до configure."""
+        self.chunk_rows = chunk_rows
+        self.chunk_age = chunk_age
+        self.clock = clock
+        self.directory = None
+        self.format = None
+        self.day = None
+        self.opened = None
+        self.rows = []
+        self.chunks = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Включена ли выгрузка."""
+        return self.directory is not None
+
+    def configure(self, directory, format=None):
+        """Включение выгрузки в каталог directory.
+
+        format — csv или parquet; по умолчанию parquet, если
+        установлен pyarrow.
+        """
+        self.close()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.directory = directory
+            self.format = format or (CSV if pyarrow is None else PARQUET)
+
+    def record(self, tenant_key, homeworks, now):
+        """Учёт статусов работ арендатора, замеченных в момент now."""
+        if not self.enabled:
+            return
+        day = day_of(now)
+        with self.lock:
+            if day != self.day:
+                self.write_chunk()
+                self.day = day
+            for homework in homeworks:
+                if not self.rows:
+                    self.opened = now
+                self.rows.append(Event(
+                    now, tenant_key, homework.get('id'),
+                    homework['homework_name'], homework.get('lesson_name'),
+                    homework['status'],
+                    parse_date(homework.get('date_updated'))
+                ))
+            if self.rows and (
+                len(self.rows) >= self.chunk_rows
+                or now - self.opened >= self.chunk_age
+            ):
+                self.write_chunk()
+
+    def flush(self):
+        """Запись накопленного блока."""
+        with self.lock:
+            self.write_chunk()
+
+    def write_chunk(self):
+        """Запись блока; вызывается под self.lock."""
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        path = os.path.join(self.directory, self.day)
+        try:
+            if self.format == PARQUET:
+                self.write_parquet(path, rows)
+            else:
+                with open(path + SUFFIXES[CSV], 'ab') as file:
+                    file.write(encode_chunk(rows))
+        except OSError as error:
+            logger.error(HISTORY_FAILED.format(self.directory, error))
+            return
+        self.chunks += 1
+
+    def write_parquet(self, path, rows):
+        """Блок в отдельный файл Parquet с атомарной заменой."""
+        path = f'{path}-{int(self.clock() * 1000)}{SUFFIXES[PARQUET]}'
+        table = pyarrow.Table.from_pydict(
+            {name: list(values) for name, values in zip(COLUMNS, zip(*rows))},
+            schema=pyarrow.schema([
+                ('time', pyarrow.float64()),
+                ('tenant', pyarrow.string()),
+                ('id', pyarrow.int64()),
+                ('homework_name', pyarrow.string()),
+                ('lesson_name', pyarrow.string()),
+                ('status', pyarrow.string()),
+                ('updated', pyarrow.float64()),
+            ])
+        )
+        pyarrow.parquet.write_table(table, path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        """Запись накопленного и завершение выгрузки."""
+        if self.enabled:
+            self.flush()
+        self.directory = None
+
+
+exporter = HistoryExporter()
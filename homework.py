@@ -1,19 +1,116 @@
+import argparse
 import logging
 import os
 import sys
+import threading
 import time
+from functools import partial
 
 from dotenv import load_dotenv
 from telebot import TeleBot
 import requests
 
+from analytics import ReviewAnalytics
+from botapi import API_URL, POOL_SIZE, TelegramClient
+from breaker import CircuitBreaker
+from caches import LRUCache, estimate_size
+from clock import system_clock
+from coalescing import SingleFlight
+from digest import DigestFlusher
+from dispatch import (
+    BLOCK, COALESCE, ERRORS, REVIEWING, VERDICTS, Batch, Dispatcher, chain
+)
+from errors import ErrorAggregator
+from fairness import FairScheduler, Quota
+from health import LOCALHOST, HealthServer, LoopMonitor
+from history import exporter
+from ingest import (
+    BrokerConsumer, Ingestor, LocalBroker, QueueConsumer, WebhookServer
+)
+from lifecycle import Lifecycle, ShutdownRequested
+from recording import recorder
+from retry import RetryPolicy, Retrier
+from snapshot import SnapshotLog
+from state import (
+    StateStore, merge_states, shard_files, shard_path, sync_states
+)
+from statuses import (
+    ESCALATE, RENDERED_CACHE_SIZE, SILENT, StatusRegistry
+)
+from tenants import Tenant, TenantRegistry, oauth_headers, token_digest
+from tracing import Profiler, traced, tracer
+from validation import BatchValidator, preview
+from vault import TokenVault
+
 load_dotenv()
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+STATE_FILE = os.getenv('STATE_FILE')
+VAULT_FILE = os.getenv('VAULT_FILE')
+VAULT_KEY = os.getenv('VAULT_KEY')
+STATUSES_FILE = os.getenv('STATUSES_FILE')
+TRACE_EXPORT = os.getenv('TRACE_EXPORT')
+RECORD_FILE = os.getenv('RECORD_FILE')
+HEALTH_PORT = int(os.getenv('HEALTH_PORT', 0)) or None
+HEALTH_HOST = os.getenv('HEALTH_HOST', LOCALHOST)
+DISPATCH_BUDGET = int(os.getenv('DISPATCH_BUDGET', 0)) or None
+DISPATCH_QUEUE_SIZE = int(os.getenv('DISPATCH_QUEUE_SIZE', 1000))
+REVIEW_SLA = float(os.getenv('REVIEW_SLA', 0)) or None
+REJECTION_SLA = float(os.getenv('REJECTION_SLA', 0)) or None
+INGEST_PORT = int(os.getenv('INGEST_PORT', 0)) or None
+INGEST_SECRET = os.getenv('INGEST_SECRET')
+BROKER_FILE = os.getenv('BROKER_FILE')
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE')
+HISTORY_DIR = os.getenv('HISTORY_DIR')
+POLL_BUDGET = int(os.getenv('POLL_BUDGET', 0)) or None
+TENANT_POLL_QUOTA = int(os.getenv('TENANT_POLL_QUOTA', 0)) or None
+TENANT_MESSAGE_QUOTA = int(os.getenv('TENANT_MESSAGE_QUOTA', 0)) or None
+RECONCILE_PERIOD = int(os.getenv('RECONCILE_PERIOD', 6 * 3600))
+CACHE_MEMORY_LIMIT = int(os.getenv('CACHE_MEMORY_LIMIT', 64)) * 2 ** 20
+TELEGRAM_CLIENT = os.getenv('TELEGRAM_CLIENT', 'telebot')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', API_URL)
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', POOL_SIZE))
+DIGEST_WINDOW = (
+    float(os.getenv('DIGEST_WINDOW')) if os.getenv('DIGEST_WINDOW') else None
+)
+PROFILE_CYCLES = 0
+ONCE = False
+SHARD = None
+SENDER = None
+EVENT_QUEUE = None
+CYCLE_HOOKS = []
+PROGRESS_HOOKS = []
+PROFILE_FILE = 'homework.prof'
+POOLED = 'pooled'
 
 RETRY_PERIOD = 600
+REQUEST_TIMEOUT = 30
+LIVENESS_TIMEOUT = int(
+    os.getenv('LIVENESS_TIMEOUT', 2 * RETRY_PERIOD + REQUEST_TIMEOUT)
+)
+ERROR_TENANTS_LIMIT = 10000
+HIGH_WATERMARK = 0.8
+DEMOTE_AFTER = 3
+MAX_DEMOTION = 6 * 3600
+QUOTA_PERIOD = 3600
+NOTIFIED_LIMIT = 100
+BOT_MEMORY_ESTIMATE = 32 * 1024
+BOT_CACHE_SIZE = max(CACHE_MEMORY_LIMIT // 2 // BOT_MEMORY_ESTIMATE, 1)
+RESPONSE_CACHE_SIZE = 10000
+RESPONSE_CACHE_WEIGHT = CACHE_MEMORY_LIMIT // 4
+MISSING = object()
+LANE_LIMITS = {
+    VERDICTS: (DISPATCH_QUEUE_SIZE, BLOCK),
+    REVIEWING: (DISPATCH_QUEUE_SIZE, COALESCE),
+}
+RETRY_POLICIES = {
+    'reset': RetryPolicy(attempts=3, base=1, cap=10, immediate=True),
+    'timeout': RetryPolicy(attempts=2, base=2, cap=20),
+    'server': RetryPolicy(attempts=4, base=2, cap=60),
+}
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
@@ -42,10 +139,23 @@ SEND_MESSAGE_SUCCESS = 'Сообщение успешно отправлено:
 SEND_MESSAGE_ERROR = 'Сбой при отправке сообщения: {}, exc_info=True'
 STATUS_NO_CHANGED = 'Статус домашней работы не изменился'
 PROGRAM_FAILURE = 'Сбой в работе программы: {}'
+PROGRAM_STOPPED = 'Работа бота завершена'
+STATUS_ESCALATED = 'Статус "{}" требует внимания: {}'
+INVALID_HOMEWORKS = 'Отложено некорректных домашних работ: {}. {}'
+UNKNOWN_EVENT_TENANT = 'Событие для неизвестного арендатора {}'
+TENANT_BOT_FAILED = 'Нет бота арендатора {}, ошибки не отправляются: {}'
+POLLS_SHED = (
+    'Очередь отправки заполнена, опрос отложен для {} арендаторов: {}'
+)
 
 tokens = ['PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']
 
 logger = logging.getLogger(__name__)
+validator = BatchValidator()
+status_registry = StatusRegistry(
+    HOMEWORK_VERDICTS, STATUS_CHANGED, UNEXPECTED_STATUS,
+    LRUCache(RENDERED_CACHE_SIZE, CACHE_MEMORY_LIMIT // 4, sys.getsizeof)
+)
 
 
 def check_tokens():
@@ -60,10 +170,11 @@ def check_tokens():
         raise ValueError(message)
 
 
-def send_message(bot, message):
-    """Отправка сообщения ботом."""
+@traced('send_message')
+def send_chat_message(bot, chat_id, message):
+    """Отправка сообщения ботом в указанный чат."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(chat_id, message)
         logger.debug(SEND_MESSAGE_SUCCESS.format(message))
         return True
     except Exception as error:
@@ -71,36 +182,112 @@ def send_message(bot, message):
         return False
 
 
+def pooled_bot(bot):
+    """Клиент Telegram вместо bot по настройке TELEGRAM_CLIENT.
+
+    При pooled TeleBot заменяется TelegramClient с тем же токеном.
+    """
+    if TELEGRAM_CLIENT == POOLED:
+        return TelegramClient(bot.token, TELEGRAM_API_URL, TELEGRAM_POOL_SIZE)
+    return bot
+
+
+def make_bot(token):
+    """Клиент Telegram для токена по настройке TELEGRAM_CLIENT."""
+    return pooled_bot(TeleBot(token))
+
+
+def close_bot(token, bot):
+    """Закрытие соединений клиента, вытесненного из кэша ботов.
+
+    TeleBot не закрывается: его close — метод Bot API.
+    """
+    if isinstance(bot, TelegramClient):
+        bot.close()
+
+
+def send_message(bot, message):
+    """Отправка сообщения ботом."""
+    return send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def notify(bot, tenant, message):
+    """Отправка сообщения в чат арендатора."""
+    if tenant.chat_id == TELEGRAM_CHAT_ID:
+        return send_message(bot, message)
+    return send_chat_message(bot, tenant.chat_id, message)
+
+
 def get_api_answer(timestamp):
     """Отправка запроса к эндпоинту."""
+    return request_statuses(oauth_headers(PRACTICUM_TOKEN), timestamp)
+
+
+class APIResponseError(ValueError):
+    """Ответ API с кодом, отличным от 200."""
+
+    def __init__(self, message, status_code=None):
+        """Ошибка с кодом ответа status_code."""
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def classify_error(error):
+    """Класс ошибки запроса для выбора политики повторов.
+
+    Разрыв соединения и тайм-аут различаются по исходному исключению
+    requests; ошибки авторизации и ключи code/error не повторяются.
+    """
+    cause = error.__cause__
+    if isinstance(cause, requests.Timeout):
+        return 'timeout'
+    if isinstance(cause, requests.ConnectionError):
+        return 'reset'
+    status_code = getattr(error, 'status_code', None)
+    if status_code and status_code >= 500:
+        return 'server'
+    return None
+
+
+def server_error(error):
+    """Ответ 5xx: сбой сервиса для автомата запросов."""
+    return classify_error(error) == 'server'
+
+
+@traced('get_api_answer')
+def request_statuses(headers, timestamp):
+    """Запрос статусов домашних работ с заданными заголовками."""
     params = {'from_date': timestamp}
-    request_parameters = dict(url=ENDPOINT, headers=HEADERS, params=params)
+    request_parameters = dict(url=ENDPOINT, headers=headers, params=params)
     try:
-        response = requests.get(**request_parameters)
+        response = requests.get(**request_parameters, timeout=REQUEST_TIMEOUT)
     except requests.RequestException as request_error:
         raise ConnectionError(
             REQUEST_ERROR.format(request_error, **request_parameters)
-        )
+        ) from request_error
     if response.status_code != requests.codes.ok:
-        raise ValueError(
+        raise APIResponseError(
             API_RESPONSE_ERROR.format(
                 response.status_code,
                 **request_parameters
-            )
+            ),
+            response.status_code
         )
-    data = response.json()
+    with tracer.span('parse_json', status_code=response.status_code):
+        data = response.json()
     for error_key in ['code', 'error']:
-        if error_key in data:
+        if isinstance(data, dict) and error_key in data:
             raise ValueError(
                 API_DATA_ERROR.format(
                     error_key,
-                    data[error_key],
+                    preview(data[error_key]),
                     **request_parameters
                 )
             )
     return data
 
 
+@traced('check_response')
 def check_response(response):
     """Проверка ответа от API."""
     if not isinstance(response, dict):
@@ -113,44 +300,590 @@ def check_response(response):
     return homeworks
 
 
+@traced('parse_status')
 def parse_status(homework):
     """Парсинг статуса домашней работы."""
     if 'homework_name' not in homework:
         raise KeyError(HOMEWORK_NAME_KEY_ERROR)
-    status = homework['status']
-    name = homework['homework_name']
-    if status in HOMEWORK_VERDICTS:
-        return STATUS_CHANGED.format(name, HOMEWORK_VERDICTS[status])
-    raise ValueError(UNEXPECTED_STATUS.format(status))
+    status = status_registry.get(homework['status'])
+    if status.known:
+        return status_registry.render(status, homework['homework_name'])
+    raise ValueError(UNEXPECTED_STATUS.format(status.name))
+
+
+class Runtime:
+    """Общее состояние бота между циклами опроса."""
+
+    def __init__(self, bot, states, sender=None, clock=system_clock):
+        """Состояние с ботом основного арендатора.
+
+        clock задаёт время и паузы всех компонентов цикла опроса;
+        модельные часы позволяют прогонять дни работы за секунды.
+        Боты, тексты уведомлений и ответы API держатся в LRU-кэшах,
+        вместе укладывающихся в CACHE_MEMORY_LIMIT.
+        """
+        self.bots = LRUCache(BOT_CACHE_SIZE, on_evict=close_bot)
+        self.bots[TELEGRAM_TOKEN] = bot
+        self.states = states
+        self.clock = clock
+        self.errors = LRUCache(ERROR_TENANTS_LIMIT)
+        self.flights = SingleFlight(LRUCache(
+            RESPONSE_CACHE_SIZE, RESPONSE_CACHE_WEIGHT,
+            lambda call: estimate_size(call.result)
+        ))
+        self.breaker = CircuitBreaker(
+            ENDPOINT, clock=clock.monotonic, counted=server_error
+        )
+        self.retrier = Retrier(
+            RETRY_POLICIES, classify_error, sleep=clock.sleep
+        )
+        self.fetch = self.retrier.metered(
+            self.breaker.wrap(recorder.wrap(request_statuses))
+        )
+        self.monitor = LoopMonitor(
+            RETRY_PERIOD, LIVENESS_TIMEOUT, clock=clock.time
+        )
+        self.dispatcher = Dispatcher(
+            sender or notify, digest_window=DIGEST_WINDOW,
+            clock=clock.monotonic, limits=LANE_LIMITS,
+            workers=TELEGRAM_POOL_SIZE if TELEGRAM_CLIENT == POOLED else 1
+        )
+        self.shed = 0
+        self.lock = threading.RLock()
+        self.push = False
+        self.analytics = ReviewAnalytics(REVIEW_SLA, REJECTION_SLA)
+        self.scheduler = FairScheduler(
+            POLL_BUDGET, DEMOTE_AFTER, RETRY_PERIOD, MAX_DEMOTION
+        )
+        self.poll_quota = self.quota(TENANT_POLL_QUOTA)
+        self.dispatcher.quota = self.quota(TENANT_MESSAGE_QUOTA)
+
+    def quota(self, limit):
+        """Квота на арендатора за QUOTA_PERIOD или None без ограничения."""
+        if not limit:
+            return None
+        return Quota(limit, QUOTA_PERIOD, self.clock.time)
+
+    def bot(self, tenant):
+        """Бот арендатора, один на токен Telegram.
+
+        Вытесненный из кэша бот создаётся заново при следующем обращении.
+        """
+        bot = self.bots.get(tenant.telegram_token, MISSING)
+        if bot is MISSING:
+            bot = self.bots[tenant.telegram_token] = make_bot(
+                tenant.telegram_token
+            )
+        return bot
+
+    def health(self):
+        """Сводка для проверок живости и готовности."""
+        return {
+            **self.monitor.report(),
+            'queues': self.dispatcher.depths(),
+            'backpressure': {
+                'pressure': self.dispatcher.pressure(),
+                'lanes': self.dispatcher.metrics(),
+                'shed_polls': self.shed,
+            },
+            'upstream': {
+                'breaker': self.breaker.state,
+                'failures': self.breaker.failures,
+                'retries': self.retrier.retries,
+                'retries_denied': self.retrier.denied,
+                'retry_budget': self.retrier.budget.tokens,
+            },
+            'analytics': self.analytics.report(),
+            'fairness': {
+                **self.scheduler.report(self.states),
+                'poll_quota': self.poll_quota and self.poll_quota.report(),
+                'message_quota': (
+                    self.dispatcher.quota and self.dispatcher.quota.report()
+                ),
+            },
+            'caches': {
+                'bots': self.bots.stats(),
+                'messages': status_registry.rendered.stats(),
+                'responses': self.flights.completed.stats(),
+            },
+            'tenants': {
+                key: {
+                    'last_success': state.get('last_success'),
+                    'errors': state.get('errors', 0),
+                }
+                for key, state in self.states.items()
+            },
+        }
+
+    def tenant_errors(self, tenant):
+        """Учёт ошибок арендатора."""
+        errors = self.errors.get(tenant.key)
+        if errors is None:
+            errors = ErrorAggregator()
+            self.errors.set(tenant.key, errors)
+        return errors
+
+
+def report_error(runtime, bot, tenant, error):
+    """Постановка ошибки в очередь с подавлением повторов.
+
+    Ошибки понижённого арендатора после сообщения о понижении пишутся
+    в журнал с уровнем DEBUG, чтобы не вытеснять ошибки остальных.
+    """
+    message = PROGRAM_FAILURE.format(error)
+    state = runtime.states.get(tenant.key, {})
+    quiet = state.get('errors', 0) > runtime.scheduler.demote_after
+    logger.log(logging.DEBUG if quiet else logging.ERROR, message)
+    errors = runtime.tenant_errors(tenant)
+
+    def forget_undelivered(delivered):
+        if not delivered:
+            errors.discard(error)
+
+    if errors.record(error, message, runtime.clock.time()):
+        runtime.dispatcher.submit(
+            ERRORS, bot, tenant, message, forget_undelivered
+        )
+
+
+def sent_callback(on_sent, homework):
+    """Обратный вызов доставки, передающий доставленную работу on_sent."""
+    def callback(delivered):
+        if delivered:
+            on_sent(homework)
+    return callback
+
+
+def enqueue_homeworks(
+    dispatcher, bot, tenant, homeworks, on_delivered, on_sent=None
+):
+    """Постановка уведомлений по работам в очередь, от старых к новым.
+
+    Статусы с политикой silent не отправляются, escalate дополнительно
+    логируются как ошибка; неизвестный статус не прерывает цикл.
+    on_sent(работа) вызывается по доставке уведомления о ней (для silent —
+    сразу), on_delivered — когда доставлены все.
+    """
+    messages = []
+    for homework in reversed(homeworks):
+        status = status_registry.get(homework['status'])
+        if status.policy == SILENT:
+            if on_sent:
+                on_sent(homework)
+            continue
+        message = status_registry.render(status, homework['homework_name'])
+        if status.policy == ESCALATE:
+            logger.error(STATUS_ESCALATED.format(status.name, message))
+        messages.append((status.lane, message, homework))
+    if not messages:
+        on_delivered()
+        return
+    batch = Batch(len(messages), on_delivered)
+    for lane, message, homework in messages:
+        callback = batch
+        if on_sent:
+            callback = chain(sent_callback(on_sent, homework), batch)
+        dispatcher.submit(lane, bot, tenant, message, callback)
+
+
+def next_poll_time(homeworks, now):
+    """Время следующего опроса по подсказкам статусов или None."""
+    intervals = [
+        status_registry.get(homework['status']).poll_interval
+        for homework in homeworks
+    ]
+    intervals = [interval for interval in intervals if interval]
+    return now + min(intervals) if intervals else None
+
+
+def notification_mark(homework):
+    """Ключ работы и отметка её статуса для отсечения повторов."""
+    key = str(homework.get('id', homework['homework_name']))
+    return key, f"{homework['status']}@{homework.get('date_updated', '')}"
+
+
+def remember_notified(notified, homeworks):
+    """Запоминание отправленных статусов, не больше NOTIFIED_LIMIT работ."""
+    for homework in homeworks:
+        key, mark = notification_mark(homework)
+        notified.pop(key, None)
+        notified[key] = mark
+    while len(notified) > NOTIFIED_LIMIT:
+        del notified[next(iter(notified))]
+
+
+def already_notified(notified, homework):
+    """Отправлялось ли уведомление об этом статусе работы."""
+    key, mark = notification_mark(homework)
+    return notified.get(key) == mark
+
+
+def process_homeworks(runtime, tenant, response, homeworks, now, advance=True):
+    """Разбор работ из ответа API или события и постановка уведомлений.
+
+    Уже отправленные статусы пропускаются, поэтому событие и следующий
+    опрос не дублируют уведомление. Статус запоминается по доставке
+    своего уведомления, поэтому после сбоя одного из них доставленные
+    не повторяются. С advance (ответ опроса) метка времени сдвигается,
+    когда доставлены все уведомления. Доставленные
+    статусы выгружаются в историю HISTORY_DIR.
+    """
+    if not homeworks:
+        return
+    state = runtime.states[tenant.key]
+    current_date = response.get('current_date', state['timestamp'])
+    valid, rejected = validator.validate(homeworks)
+    for homework in reversed(valid):
+        runtime.analytics.observe(
+            token_digest(tenant.practicum_token), homework, now
+        )
+    if valid:
+        state['status'] = valid[0]['status']
+    notified = state.setdefault('notified', {})
+    fresh = [
+        homework for homework in valid
+        if not already_notified(notified, homework)
+    ]
+
+    def on_sent(homework):
+        remember_notified(notified, [homework])
+        exporter.record(tenant.key, [homework], now)
+
+    def on_delivered():
+        if advance:
+            state['timestamp'] = current_date
+
+    enqueue_homeworks(
+        runtime.dispatcher, runtime.bot(tenant), tenant, fresh, on_delivered,
+        on_sent
+    )
+    if advance:
+        state['next_poll'] = next_poll_time(valid, now)
+    if rejected:
+        raise ValueError(INVALID_HOMEWORKS.format(
+            len(rejected), rejected[0].errors
+        ))
+
+
+def defer_retry(runtime, state, error, now):
+    """Повтор сбойного запроса арендатора в следующем цикле.
+
+    Вместо паузы посреди цикла (она задержала бы остальных арендаторов
+    и входящие события) опрос откладывается через next_poll по политике
+    RETRY_POLICIES. Номер попытки и прошлая задержка хранятся
+    в state['retry']. True — повтор запланирован, и об ошибке
+    не сообщается, пока повторы не исчерпаны.
+    """
+    attempt, previous = state.get('retry') or (0, 0.0)
+    delay = runtime.retrier.schedule(error, attempt, previous, 'poll_tenant')
+    if delay is None:
+        state.pop('retry', None)
+        return False
+    state['retry'] = [attempt + 1, delay]
+    state['next_poll'] = now + delay
+    return True
+
+
+def poll_tenant(runtime, tenant):
+    """Один цикл опроса API арендатора.
+
+    При приёме событий опрос только сверяет пропущенное, не чаще
+    RECONCILE_PERIOD. Ошибка любого шага, включая расшифровку токенов
+    арендатора из хранилища, относится только к этому арендатору.
+    """
+    state = runtime.states[tenant.key]
+    now = runtime.clock.time()
+    bot = MISSING
+    try:
+        bot = runtime.bot(tenant)
+        for digest in runtime.tenant_errors(tenant).digests(now):
+            runtime.dispatcher.submit(ERRORS, bot, tenant, digest)
+        response = runtime.flights.do(
+            (tenant.practicum_token, state['timestamp']),
+            runtime.fetch, tenant.headers, state['timestamp']
+        )
+        homeworks = check_response(response)
+        runtime.scheduler.succeeded(tenant, state)
+        state['errors'] = 0
+        state.pop('retry', None)
+        state['last_success'] = now
+        process_homeworks(runtime, tenant, response, homeworks, now)
+        if runtime.push:
+            state['next_poll'] = max(
+                state.get('next_poll') or 0, now + RECONCILE_PERIOD
+            )
+        logger.debug(STATUS_NO_CHANGED)
+    except Exception as error:
+        if defer_retry(runtime, state, error, now):
+            return
+        state['errors'] = state.get('errors', 0) + 1
+        runtime.scheduler.failed(tenant, state, now)
+        if bot is MISSING:
+            logger.error(TENANT_BOT_FAILED.format(tenant.key, error))
+        else:
+            report_error(runtime, bot, tenant, error)
+
+
+def handle_event(runtime, registry, event):
+    """Входящее событие о статусах арендатора: в общий конвейер."""
+    with runtime.lock:
+        tenant = registry.get(event['tenant'])
+        if tenant is None:
+            logger.warning(UNKNOWN_EVENT_TENANT.format(event['tenant']))
+            return
+        try:
+            process_homeworks(
+                runtime, tenant, event, check_response(event),
+                runtime.clock.time(), advance=False
+            )
+        except Exception as error:
+            report_error(runtime, runtime.bot(tenant), tenant, error)
+        runtime.dispatcher.drain(DISPATCH_BUDGET)
+
+
+def start_sources(handler):
+    """Запуск приёма событий по HTTP и из брокера, если они заданы."""
+    sources = []
+    if INGEST_PORT:
+        ingestor = Ingestor(handler)
+        webhook = WebhookServer(ingestor, INGEST_PORT, INGEST_SECRET)
+        ingestor.start()
+        webhook.start()
+        sources += [webhook, ingestor]
+    if BROKER_FILE:
+        consumer = BrokerConsumer(LocalBroker(BROKER_FILE), handler)
+        consumer.start()
+        sources.append(consumer)
+    return sources
+
+
+def start_ingestion(runtime, registry):
+    """Запуск приёма событий: своего и из очереди супервизора EVENT_QUEUE."""
+    handler = partial(handle_event, runtime, registry)
+    sources = start_sources(handler)
+    if EVENT_QUEUE is not None:
+        consumer = QueueConsumer(EVENT_QUEUE, handler)
+        consumer.start()
+        sources.append(consumer)
+    runtime.push = bool(sources)
+    return sources
+
+
+def start_digest_flusher(runtime):
+    """Запуск отправки сводок по окну в режиме DIGEST_WINDOW."""
+    if not DIGEST_WINDOW:
+        return []
+    flusher = DigestFlusher(runtime.dispatcher, runtime.lock, DISPATCH_BUDGET)
+    flusher.start()
+    return [flusher]
+
+
+def poll_tenants(runtime, registry):
+    """Цикл опроса всех арендаторов и отправки уведомлений.
+
+    Арендаторы с общим токеном Практикума и меткой времени получают
+    результат одного запроса к API. Арендаторы с неотправленными
+    сообщениями или с подсказкой опрашивать позже пропускаются,
+    остальные опрашиваются в порядке справедливой очереди в пределах
+    бюджета POLL_BUDGET и квоты TENANT_POLL_QUOTA.
+    В режиме сводок сообщения ждут окна DIGEST_WINDOW: по его окончании
+    их отправляет поток DigestFlusher. После каждого арендатора
+    вызываются PROGRESS_HOOKS (сигнал о работе посреди долгого цикла).
+    """
+    runtime.flights.reset()
+    now = runtime.clock.time()
+    ready = [
+        tenant for tenant in registry
+        if not runtime.dispatcher.has_pending(tenant)
+        and (runtime.states[tenant.key].get('next_poll') or 0) <= now
+    ]
+    shed = 0
+    for tenant in runtime.scheduler.order(ready, runtime.states):
+        if not relieve_pressure(runtime.dispatcher):
+            shed += 1
+            continue
+        quota = runtime.poll_quota
+        if quota and not quota.allow(tenant.key):
+            continue
+        runtime.scheduler.charge(runtime.states[tenant.key])
+        with tracer.span('poll_tenant', tenant=tenant.key):
+            poll_tenant(runtime, tenant)
+        for hook in PROGRESS_HOOKS:
+            hook(runtime)
+    runtime.dispatcher.drain(DISPATCH_BUDGET)
+    if shed:
+        runtime.shed += shed
+        logger.warning(POLLS_SHED.format(shed, runtime.dispatcher.depths()))
+
+
+def relieve_pressure(dispatcher):
+    """Можно ли опрашивать следующего арендатора.
+
+    Когда очередь отправки заполнена выше HIGH_WATERMARK, без бюджета
+    отправки она разгружается сразу; с бюджетом опрос откладывается
+    до следующего цикла, а метки времени арендаторов не сдвигаются.
+    """
+    if dispatcher.pressure() < HIGH_WATERMARK:
+        return True
+    if DISPATCH_BUDGET is None:
+        dispatcher.drain(flush=True)
+    return dispatcher.pressure() < HIGH_WATERMARK
+
+
+def capture_runtime(runtime):
+    """Снимок состояния для восстановления резервным процессом.
+
+    Метки времени, подсказки следующего опроса и отправленные статусы
+    арендаторов, память ошибок и сообщения очереди вне групп.
+    """
+    return {
+        'states': runtime.states,
+        'errors': {
+            key: errors.entries.items()
+            for key, errors in runtime.errors.items()
+        },
+        'outbox': {'messages': runtime.dispatcher.outbox()},
+    }
+
+
+def restore_runtime(runtime, registry, snapshot, loaded=None):
+    """Восстановление состояния из снимка для текущих арендаторов.
+
+    loaded — состояния из STATE_FILE: арендатор, которого нет в снимке
+    или чья метка времени в снимке старше, продолжает с них.
+    """
+    runtime.states = sync_states(
+        merge_states(snapshot.get('states', {}), loaded or {}), registry,
+        int(runtime.clock.time())
+    )
+    for key, entries in snapshot.get('errors', {}).items():
+        if key not in runtime.states:
+            continue
+        errors = ErrorAggregator()
+        for fingerprint, entry in entries:
+            errors.entries.set(fingerprint, entry)
+        runtime.errors.set(key, errors)
+    for lane, key, text in snapshot.get('outbox', {}).get('messages', []):
+        tenant = registry.get(key)
+        if tenant is not None:
+            runtime.dispatcher.submit(lane, runtime.bot(tenant), tenant, text)
+
+
+def open_snapshots(runtime, registry, loaded=None):
+    """Журнал снимков SNAPSHOT_FILE с восстановлением из него.
+
+    С долей SHARD процесс пишет свой журнал SNAPSHOT_FILE.номер,
+    а метки времени арендаторов берёт и из журналов других долей
+    (без записи в них): после изменения числа опросчиков перешедшие
+    арендаторы не опрашиваются с нуля.
+    """
+    if not SNAPSHOT_FILE:
+        return None
+    snapshots = SnapshotLog(shard_path(SNAPSHOT_FILE, SHARD))
+    snapshot = snapshots.load()
+    if SHARD is not None:
+        own = os.path.abspath(snapshots.path)
+        peers = [
+            SnapshotLog(path).load(repair=False) or {}
+            for path in shard_files(SNAPSHOT_FILE) if path != own
+        ]
+        snapshot = snapshot or {}
+        snapshot['states'] = merge_states(
+            snapshot.get('states', {}),
+            *(peer.get('states', {}) for peer in peers)
+        )
+    if snapshot:
+        restore_runtime(runtime, registry, snapshot, loaded)
+    return snapshots
+
+
+def save_snapshot(snapshots, runtime):
+    """Запись снимка, если журнал снимков включён."""
+    if snapshots:
+        snapshots.save(capture_runtime(runtime))
+
+
+def start_health_server(runtime):
+    """Запуск сервера проверок, если задан порт."""
+    if not HEALTH_PORT:
+        return None
+    server = HealthServer(runtime.health, HEALTH_PORT, HEALTH_HOST)
+    server.start()
+    return server
 
 
 def main():
     """Основная логика работы бота."""
     check_tokens()
+    if STATUSES_FILE:
+        status_registry.load(STATUSES_FILE)
     bot = TeleBot(TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    last_error_message = None
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                if send_message(bot, parse_status(homeworks[0])):
-                    timestamp = response.get('current_date', timestamp)
-                    last_error_message = None
-            logger.debug(STATUS_NO_CHANGED)
-        except Exception as error:
-            message = PROGRAM_FAILURE.format(error)
-            logger.error(message)
-            if message != last_error_message:
-                if send_message(bot, message):
-                    last_error_message = message
-        time.sleep(RETRY_PERIOD)
+    vault = TokenVault(VAULT_FILE, VAULT_KEY) if VAULT_FILE else None
+    registry = TenantRegistry(
+        Tenant(PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID),
+        TENANTS_FILE, vault, SHARD
+    )
+    store = StateStore(STATE_FILE, SHARD)
+    loaded = store.load()
+    runtime = Runtime(
+        pooled_bot(bot), sync_states(loaded, registry, int(time.time())),
+        SENDER
+    )
+    runtime.analytics.on_alert = partial(
+        runtime.dispatcher.submit, ERRORS, runtime.bot(registry.default),
+        registry.default
+    )
+    tracer.configure(TRACE_EXPORT)
+    recorder.configure(RECORD_FILE)
+    exporter.configure(HISTORY_DIR)
+    profiler = Profiler(PROFILE_CYCLES, PROFILE_FILE)
+    lifecycle = Lifecycle()
+    lifecycle.install()
+    snapshots = open_snapshots(runtime, registry, loaded)
+    health_server = start_health_server(runtime)
+    sources = start_ingestion(runtime, registry) + start_digest_flusher(
+        runtime
+    )
+    try:
+        while not lifecycle.stopping:
+            runtime.monitor.cycle_started()
+            with lifecycle.cycle(), profiler.cycle(), tracer.span('cycle'), \
+                    runtime.lock:
+                if lifecycle.take_reload() or registry.changed_on_disk():
+                    registry.reload()
+                    runtime.states = sync_states(
+                        runtime.states, registry, int(time.time())
+                    )
+                poll_tenants(runtime, registry)
+                store.save(runtime.states)
+                save_snapshot(snapshots, runtime)
+                for hook in CYCLE_HOOKS:
+                    hook(runtime)
+            runtime.monitor.cycle_finished()
+            if lifecycle.stopping or profiler.done or ONCE:
+                break
+            time.sleep(RETRY_PERIOD)
+    except ShutdownRequested:
+        pass
+    finally:
+        runtime.monitor.stopping = True
+        lifecycle.restore()
+        for source in sources:
+            source.stop()
+        runtime.dispatcher.drain(flush=True)
+        store.save(runtime.states)
+        save_snapshot(snapshots, runtime)
+        recorder.close()
+        exporter.close()
+        if health_server:
+            health_server.stop()
+        logger.info(PROGRAM_STOPPED)
 
 
-if __name__ == '__main__':
+def setup_logging(level=logging.DEBUG):
+    """Журнал в stdout и файл рядом с модулем."""
     logging.basicConfig(
-        level=logging.DEBUG,
+        level=level,
         format=(
             '%(asctime)s, %(levelname)s, %(message)s,'
             '%(name)s, %(funcName)s, %(lineno)d'
@@ -160,4 +893,46 @@ if __name__ == '__main__':
             logging.FileHandler(f'{__file__}.log')
         ]
     )
+
+
+def add_run_arguments(parser):
+    """Аргументы режима работы бота."""
+    parser.add_argument(
+        '--profile', type=int, default=0, metavar='N',
+        help='профилировать N циклов опроса и завершиться'
+    )
+    parser.add_argument(
+        '--profile-output', default=PROFILE_FILE,
+        help='файл профиля в формате cProfile/pstats'
+    )
+    parser.add_argument(
+        '--trace', default=TRACE_EXPORT,
+        help='выгрузка span: "-" для stdout или путь к файлу'
+    )
+    parser.add_argument(
+        '--record', default=RECORD_FILE,
+        help='запись ответов API для воспроизведения (.jsonl.gz)'
+    )
+    return parser
+
+
+def apply_run_arguments(args):
+    """Настройка режима работы по аргументам командной строки."""
+    global PROFILE_CYCLES, PROFILE_FILE, TRACE_EXPORT, RECORD_FILE
+    PROFILE_CYCLES = args.profile
+    PROFILE_FILE = args.profile_output
+    TRACE_EXPORT = args.trace
+    RECORD_FILE = args.record
+
+
+def parse_args():
+    """Разбор аргументов командной строки."""
+    return add_run_arguments(
+        argparse.ArgumentParser(description='Бот статусов домашних работ')
+    ).parse_args()
+
+
+if __name__ == '__main__':
+    apply_run_arguments(parse_args())
+    setup_logging()
     main()
@@ -0,0 +1,326 @@
+import hmac
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INBOX_SIZE = 1000
+BROKER_BATCH = 100
+BROKER_INTERVAL = 1
+MAX_BODY = 1024 * 1024
+REQUEST_TIMEOUT = 10
+
+BROKER_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL
+)
+'''
+
+WEBHOOK_STARTED = 'Приём событий по HTTP на порту {}'
+EVENT_FAILED = 'Не удалось обработать событие арендатора {}: {}'
+BROKER_EVENT_INVALID = 'Событие #{} брокера отброшено: {}'
+BODY_NOT_RECEIVED = 'Тело запроса не получено: {}'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_event(body):
+    """Событие из тела запроса: словарь с ключами tenant и homeworks."""
+    event = json.loads(body)
+    if not isinstance(event, dict) or not isinstance(event.get('tenant'), str):
+        raise ValueError('ожидается объект с ключом "tenant"')
+    return event
+
+
+def body_length(header):
+    """Длина тела из Content-Length; None — заголовок некорректен."""
+    try:
+        length = int(header or 0)
+    except ValueError:
+        return None
+    return length if length >= 0 else None
+
+
+class Ingestor:
+    """Обработка входящих событий о статусах в отдельном потоке.
+
+    Событие — ответ API одного арендатора ({"tenant": ключ,
+    "homeworks": [...], "current_date": ...}). Источники кладут события
+    в ограниченную очередь, поток-обработчик передаёт их handler
+    по одному; handler сам отвечает за синхронизацию с циклом опроса.
+    """
+
+    def __init__(self, handler, capacity=INBOX_SIZE):
+        """Обработчик событий handler(event)."""
+        self.handler = handler
+        self.inbox = queue.Queue(capacity)
+        self.processed = 0
+        self.thread = threading.Thread(
+            target=self.run, name='ingest', daemon=True
+        )
+
+    def submit(self, event, timeout=None):
+        """Постановка события; False, если очередь заполнена."""
+        try:
+            self.inbox.put(event, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def run(self):
+        """Обработка событий до сигнала остановки None."""
+        while True:
+            event = self.inbox.get()
+            if event is None:
+                return
+            try:
+                self.handler(event)
+            except Exception as error:
+                logger.error(EVENT_FAILED.format(event.get('tenant'), error))
+            self.processed += 1
+
+    def start(self):
+        """Запуск потока-обработчика."""
+        self.thread.start()
+
+    def stop(self):
+        """Остановка после обработки принятых событий."""
+        self.inbox.put(None)
+        self.thread.join()
+
+
+class WebhookServer:
+    """Приём событий POST-запросами на /events.
+
+    Запрос подписывается заголовком Authorization: Bearer <secret>;
+    тело читается только после проверки подписи и длины, чтение
+    ограничено timeout секундами. Ответ 202 — событие принято,
+    503 — очередь заполнена.
+    """
+
+    def __init__(
+            self, ingestor, port, secret, host='0.0.0.0',
+            timeout=REQUEST_TIMEOUT
+    ):
+        """Сервер на host:port; запускается методом start."""
+        self.ingestor = ingestor
+        self.secret = secret
+        self.timeout = timeout
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name='webhook', daemon=True
+        )
+
+    @property
+    def port(self):
+        """Фактический порт сервера."""
+        return self.server.server_address[1]
+
+    def authorized(self, header):
+        """Проверка заголовка Authorization."""
+        expected = f'Bearer {self.secret}'
+        return bool(self.secret) and hmac.compare_digest(
+            (header or '').encode(), expected.encode()
+        )
+
+    def admit(self, path, headers):
+        """Код отказа до чтения тела; None — тело можно читать."""
+        if path != '/events':
+            return HTTPStatus.NOT_FOUND
+        if not self.authorized(headers.get('Authorization')):
+            return HTTPStatus.UNAUTHORIZED
+        length = body_length(headers.get('Content-Length'))
+        if length is None:
+            return HTTPStatus.BAD_REQUEST
+        if length > MAX_BODY:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        return None
+
+    def accept(self, body):
+        """Код ответа на принятое тело запроса."""
+        try:
+            event = parse_event(body)
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST
+        if not self.ingestor.submit(event):
+            return HTTPStatus.SERVICE_UNAVAILABLE
+        return HTTPStatus.ACCEPTED
+
+    def make_handler(self):
+        """Класс обработчика запросов с доступом к серверу."""
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            timeout = webhook.timeout
+
+            def do_POST(self):
+                status = webhook.admit(self.path, self.headers)
+                if status is None:
+                    length = body_length(self.headers.get('Content-Length'))
+                    try:
+                        body = self.rfile.read(length)
+                    except OSError as error:
+                        logger.debug(BODY_NOT_RECEIVED.format(error))
+                        self.close_connection = True
+                        return
+                    status = webhook.accept(body)
+                self.close_connection = True
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
+
+    def start(self):
+        """Запуск сервера."""
+        self.thread.start()
+        logger.info(WEBHOOK_STARTED.format(self.port))
+
+    def stop(self):
+        """Остановка сервера."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LocalBroker:
+    """Локальная очередь сообщений в SQLite вместо внешнего брокера.
+
+    Сообщение удаляется только подтверждением ack, поэтому доставка —
+    «хотя бы один раз»; повтор уже отправленного статуса отсекается
+    при обработке.
+    """
+
+    def __init__(self, path):
+        """Очередь в файле path."""
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(BROKER_SCHEMA)
+
+    def publish(self, event):
+        """Публикация события."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO events (payload) VALUES (?)',
+                (json.dumps(event, ensure_ascii=False),)
+            )
+
+    def take(self, limit=BROKER_BATCH):
+        """Самые старые неподтверждённые события: пары (номер, тело)."""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT id, payload FROM events ORDER BY id LIMIT ?', (limit,)
+            ).fetchall()
+
+    def ack(self, ids):
+        """Подтверждение обработки событий."""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'DELETE FROM events WHERE id = ?', [(id,) for id in ids]
+            )
+
+    def close(self):
+        """Закрытие соединения с базой."""
+        self.connection.close()
+
+
+class BrokerConsumer:
+    """Поток обработки событий брокера.
+
+    События подтверждаются после обработки handler, так что при
+    остановке процесса посреди пачки они будут прочитаны снова.
+    """
+
+    def __init__(self, broker, handler, interval=BROKER_INTERVAL):
+        """Чтение broker каждые interval секунд."""
+        self.broker = broker
+        self.handler = handler
+        self.interval = interval
+        self.processed = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name='broker', daemon=True
+        )
+
+    def poll(self):
+        """Обработка одной пачки событий; число обработанных."""
+        taken = []
+        for number, payload in self.broker.take():
+            try:
+                self.handler(parse_event(payload))
+            except Exception as error:
+                logger.error(BROKER_EVENT_INVALID.format(number, error))
+            taken.append(number)
+        self.broker.ack(taken)
+        self.processed += len(taken)
+        return len(taken)
+
+    def run(self):
+        """Чтение брокера до остановки."""
+        while not self.stopped.is_set():
+            if not self.poll():
+                self.stopped.wait(self.interval)
+
+    def start(self):
+        """Запуск потока."""
+        self.thread.start()
+
+    def stop(self):
+        """Остановка потока и закрытие брокера."""
+        self.stopped.set()
+        self.thread.join()
+        self.broker.close()
+
+
+class QueueConsumer:
+    """Поток обработки событий из очереди другого процесса.
+
+    В режиме супервизора события принимает супервизор и передаёт
+    в очередь опросчика, которому принадлежит арендатор.
+    """
+
+    def __init__(self, events, handler, interval=BROKER_INTERVAL):
+        """Чтение очереди events с проверкой остановки каждые interval с."""
+        self.events = events
+        self.handler = handler
+        self.interval = interval
+        self.processed = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name='events', daemon=True
+        )
+
+    def poll(self):
+        """Обработка одного события; False, если очередь пуста."""
+        try:
+            event = self.events.get(timeout=self.interval)
+        except queue.Empty:
+            return False
+        try:
+            self.handler(event)
+        except Exception as error:
+            logger.error(EVENT_FAILED.format(event.get('tenant'), error))
+        self.processed += 1
+        return True
+
+    def run(self):
+        """Чтение очереди до остановки."""
+        while not self.stopped.is_set():
+            self.poll()
+
+    def start(self):
+        """Запуск потока."""
+        self.thread.start()
+
+    def stop(self):
+        """Остановка потока."""
+        self.stopped.set()
+        self.thread.join()
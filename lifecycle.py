@@ -0,0 +1,73 @@
+import logging
+import signal
+from contextlib import contextmanager
+
+SHUTDOWN_REQUESTED = 'Получен сигнал {}, завершение работы'
+RELOAD_REQUESTED = 'Получен сигнал {}, перечитывание конфигурации'
+
+logger = logging.getLogger(__name__)
+
+
+class ShutdownRequested(Exception):
+    """Остановка процесса по сигналу во время ожидания."""
+
+
+class Lifecycle:
+    """Обработка сигналов остановки и перечитывания конфигурации.
+
+    SIGTERM/SIGINT во время цикла опроса только выставляют флаг, и цикл
+    доводится до конца; во время ожидания прерывают сон сразу.
+    SIGHUP выставляет флаг перечитывания конфигурации.
+    """
+
+    STOP_SIGNALS = ('SIGTERM', 'SIGINT')
+    RELOAD_SIGNALS = ('SIGHUP',)
+
+    def __init__(self):
+        """Флаги сброшены, обработчики не установлены."""
+        self.stopping = False
+        self.reload_requested = False
+        self.busy = False
+        self.previous_handlers = {}
+
+    def install(self):
+        """Установка обработчиков сигналов."""
+        handlers = [(name, self.on_stop) for name in self.STOP_SIGNALS]
+        handlers += [(name, self.on_reload) for name in self.RELOAD_SIGNALS]
+        for name, handler in handlers:
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            self.previous_handlers[signum] = signal.signal(signum, handler)
+
+    def restore(self):
+        """Возврат прежних обработчиков сигналов."""
+        for signum, handler in self.previous_handlers.items():
+            signal.signal(signum, handler)
+        self.previous_handlers = {}
+
+    @contextmanager
+    def cycle(self):
+        """Участок работы, который сигнал остановки не прерывает."""
+        self.busy = True
+        try:
+            yield
+        finally:
+            self.busy = False
+
+    def take_reload(self):
+        """Сбросить и вернуть флаг перечитывания конфигурации."""
+        requested, self.reload_requested = self.reload_requested, False
+        return requested
+
+    def on_stop(self, signum, frame):
+        """Обработчик сигналов остановки."""
+        logger.info(SHUTDOWN_REQUESTED.format(signal.Signals(signum).name))
+        self.stopping = True
+        if not self.busy:
+            raise ShutdownRequested()
+
+    def on_reload(self, signum, frame):
+        """Обработчик сигнала перечитывания конфигурации."""
+        logger.info(RELOAD_REQUESTED.format(signal.Signals(signum).name))
+        self.reload_requested = True
@@ -0,0 +1,104 @@
+import gzip
+import json
+import re
+import threading
+import time
+
+SANITIZED_FIELDS = ('reviewer_comment',)
+TOKEN_PATTERN = re.compile(r'OAuth [^\s\'"]+')
+TOKEN_REPLACEMENT = 'OAuth ***'
+
+
+def sanitize(data):
+    """Копия ответа API без свободного текста ревьюеров."""
+    if not isinstance(data, dict) or not isinstance(
+        data.get('homeworks'), list
+    ):
+        return data
+    homeworks = []
+    for homework in data['homeworks']:
+        if isinstance(homework, dict):
+            homework = {
+                key: '*' * len(value)
+                if key in SANITIZED_FIELDS and isinstance(value, str)
+                else value
+                for key, value in homework.items()
+            }
+        homeworks.append(homework)
+    return {**data, 'homeworks': homeworks}
+
+
+class Recorder:
+    """Запись ответов API и их длительности в сжатый JSON Lines.
+
+    Запись: t — секунды от начала записи, d — длительность запроса,
+    f — from_date, r — ответ API или e — [тип, текст] ошибки.
+    Токены в текстах ошибок и комментарии ревьюеров затираются.
+    """
+
+    def __init__(self):
+        """Запись выключена до configure."""
+        self.file = None
+        self.started = None
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Включена ли запись."""
+        return self.file is not None
+
+    def configure(self, path):
+        """Включение записи в файл path."""
+        self.close()
+        if path:
+            self.file = gzip.open(path, 'at', encoding='utf-8')
+            self.started = time.monotonic()
+
+    def wrap(self, fetch):
+        """Функция запроса (headers, timestamp) с записью результатов."""
+        def recorded(headers, timestamp):
+            if not self.enabled:
+                return fetch(headers, timestamp)
+            started = time.monotonic()
+            try:
+                data = fetch(headers, timestamp)
+            except Exception as error:
+                self.write(started, timestamp, error=error)
+                raise
+            self.write(started, timestamp, data=data)
+            return data
+        recorded.__name__ = fetch.__name__
+        return recorded
+
+    def write(self, started, timestamp, data=None, error=None):
+        """Запись одного ответа."""
+        record = {
+            't': round(started - self.started, 6),
+            'd': round(time.monotonic() - started, 6),
+            'f': timestamp,
+        }
+        if error is None:
+            record['r'] = sanitize(data)
+        else:
+            record['e'] = [
+                type(error).__name__,
+                TOKEN_PATTERN.sub(TOKEN_REPLACEMENT, str(error))
+            ]
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            self.file.write(line + '\n')
+
+    def close(self):
+        """Завершение записи."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+recorder = Recorder()
+
+
+def read_records(path):
+    """Записи из файла в порядке записи."""
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
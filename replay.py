@@ -0,0 +1,99 @@
+import argparse
+import builtins
+import time
+from collections import Counter
+
+import homework
+from recording import read_records
+from state import new_state
+from tenants import Tenant
+
+REPLAY_TENANT = Tenant('replay', 'replay', 'replay')
+
+REPLAY_SUMMARY = (
+    'Ответов: {responses}, ошибок: {errors}, сообщений: {messages}, '
+    'время обработки: {elapsed:.3f} с, записано: {recorded:.3f} с'
+)
+
+
+def recorded_error(record):
+    """Исключение, восстановленное по записи ошибки."""
+    name, message = record['e']
+    error_class = getattr(builtins, name, None) or getattr(
+        homework, name, None
+    )
+    if not (isinstance(error_class, type)
+            and issubclass(error_class, Exception)):
+        error_class = RuntimeError
+    return error_class(message)
+
+
+class Player:
+    """Функция запроса, отдающая записанный ответ вместо API."""
+
+    def __init__(self):
+        """Проигрыватель без текущей записи."""
+        self.record = None
+
+    def __call__(self, headers, timestamp):
+        """Записанный ответ или исключение."""
+        if 'e' in self.record:
+            raise recorded_error(self.record)
+        return self.record['r']
+
+
+def replay(records, speed=0, sender=None, sleep=time.sleep):
+    """Прогон записанных ответов через проверку, разбор и отправку.
+
+    speed — ускорение относительно записи; 0 — без пауз.
+    Без sender сообщения только подсчитываются.
+    """
+    stats = Counter()
+
+    def count_message(bot, tenant, text):
+        stats['messages'] += 1
+        return sender(bot, tenant, text) if sender else True
+
+    player = Player()
+    runtime = homework.Runtime(
+        None, {REPLAY_TENANT.key: new_state(0)}, count_message
+    )
+    runtime.bots[REPLAY_TENANT.telegram_token] = None
+    runtime.fetch = player
+    previous = records[0]['t'] if records else 0
+    elapsed = 0
+    for record in records:
+        if speed:
+            sleep(max(record['t'] - previous, 0) / speed)
+        previous = record['t']
+        player.record = record
+        stats['errors' if 'e' in record else 'responses'] += 1
+        started = time.perf_counter()
+        runtime.flights.reset()
+        homework.poll_tenant(runtime, REPLAY_TENANT)
+        runtime.dispatcher.drain(flush=True)
+        elapsed += time.perf_counter() - started
+    stats['elapsed'] = elapsed
+    stats['recorded'] = sum(record['d'] for record in records)
+    return stats
+
+
+def parse_args():
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Воспроизведение записанных ответов API'
+    )
+    parser.add_argument('path', help='файл записи (.jsonl.gz)')
+    parser.add_argument(
+        '--speed', type=float, default=0,
+        help='ускорение относительно записи, 0 — без пауз'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    summary = replay(read_records(args.path), args.speed)
+    print(REPLAY_SUMMARY.format(**{
+        'responses': 0, 'errors': 0, 'messages': 0, **summary
+    }))
@@ -0,0 +1,135 @@
+import logging
+import random
+import time
+from collections import namedtuple
+
+BUDGET_RATIO = 0.2
+BUDGET_LIMIT = 10
+
+RETRYING = 'Повтор {} запроса {} через {:.2f} с ({}): {}'
+BUDGET_EXHAUSTED = 'Бюджет повторов исчерпан, запрос {} не повторяется: {}'
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy(namedtuple(
+    'RetryPolicy', ('attempts', 'base', 'cap', 'immediate'),
+    defaults=(0, 0, 0, False)
+)):
+    """Политика повторов класса ошибок.
+
+    attempts — число повторов; задержки — декоррелированный джиттер
+    между base и cap секунд; immediate — первый повтор без задержки.
+    """
+
+    __slots__ = ()
+
+    def delay(self, attempt, previous, rng=random):
+        """Задержка перед повтором номер attempt (с нуля)."""
+        if attempt == 0 and self.immediate:
+            return 0.0
+        upper = max(previous * 3, self.base)
+        return min(self.cap, rng.uniform(self.base, upper))
+
+
+NO_RETRY = RetryPolicy()
+
+
+class RetryBudget:
+    """Общий бюджет повторов против лавинного роста нагрузки.
+
+    Каждый запрос пополняет бюджет на ratio, каждый повтор списывает
+    единицу; запас ограничен limit. Так повторы не превышают примерно
+    доли ratio от запросов, даже если сервис лежит для всех сразу.
+    """
+
+    def __init__(self, ratio=BUDGET_RATIO, limit=BUDGET_LIMIT):
+        """Полный бюджет на limit повторов."""
+        self.ratio = ratio
+        self.limit = limit
+        self.tokens = float(limit)
+
+    def deposit(self):
+        """Пополнение за выполненный запрос."""
+        self.tokens = min(self.tokens + self.ratio, self.limit)
+
+    def withdraw(self):
+        """Списание за повтор; False, если бюджет исчерпан."""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Retrier:
+    """Повтор запросов по политике, выбранной по классу ошибки.
+
+    classify возвращает имя класса ошибки или None, если ошибку
+    повторять нельзя; policies сопоставляет классам политики.
+    """
+
+    def __init__(
+        self, policies, classify, budget=None, sleep=time.sleep,
+        rng=random
+    ):
+        """Повторитель с общим бюджетом budget."""
+        self.policies = policies
+        self.classify = classify
+        self.budget = budget or RetryBudget()
+        self.sleep = sleep
+        self.rng = rng
+        self.retries = 0
+        self.denied = 0
+
+    def schedule(self, error, attempt, previous, name):
+        """Задержка перед повтором номер attempt после error.
+
+        None — повторять нельзя: класс ошибки без повторов, попытки
+        исчерпаны или закончился бюджет. previous — прошлая задержка.
+        """
+        kind = self.classify(error)
+        policy = self.policies.get(kind, NO_RETRY)
+        if attempt >= policy.attempts:
+            return None
+        if not self.budget.withdraw():
+            self.denied += 1
+            logger.warning(BUDGET_EXHAUSTED.format(name, error))
+            return None
+        delay = policy.delay(attempt, previous, self.rng)
+        self.retries += 1
+        logger.warning(RETRYING.format(attempt + 1, name, delay, kind, error))
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """Вызов func с повторами."""
+        attempt = 0
+        delay = 0.0
+        self.budget.deposit()
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                delay = self.schedule(error, attempt, delay, func.__name__)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.sleep(delay)
+
+    def metered(self, func):
+        """Функция без повторов на месте, пополняющая бюджет.
+
+        Повтор планирует вызывающий по schedule, не останавливая
+        остальную работу на время задержки.
+        """
+        def counted(*args, **kwargs):
+            self.budget.deposit()
+            return func(*args, **kwargs)
+        counted.__name__ = func.__name__
+        return counted
+
+    def wrap(self, func):
+        """Функция, вызываемая с повторами."""
+        def retrying(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        retrying.__name__ = func.__name__
+        return retrying
@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import struct
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+from tenants import shard_of
+
+HEADER = struct.Struct('<QQ')
+RECORD = struct.Struct('<IB3xQqdI4x')
+VERSION = struct.Struct('<I')
+VERSION_MASK = 0xFFFFFFFF
+DELETED = 2 ** 64 - 1
+READ_RETRIES = 10000
+STATUS_CODES = {None: 0, 'reviewing': 1, 'approved': 2, 'rejected': 3}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+OTHER_STATUS = 255
+
+TABLE_FULL = 'Таблица состояния арендаторов заполнена: {} записей'
+PUBLISH_FAILED = 'Не записано в общую таблицу состояний арендаторов: {}. {}'
+TORN_RECORD = 'Запись {} общей таблицы не дописана, пропускается'
+
+logger = logging.getLogger(__name__)
+
+TenantRecord = namedtuple(
+    'TenantRecord', ('tenant_id', 'cursor', 'status', 'next_due', 'errors')
+)
+
+
+def tenant_id(key):
+    """64-битный идентификатор арендатора по ключу.
+
+    0 (пустая запись) и DELETED (удалённая) не выдаются.
+    """
+    digest = hashlib.sha256(key.encode()).digest()
+    return int.from_bytes(digest[:8], 'little') % DELETED or 1
+
+
+def status_code(status):
+    """Код статуса для записи в таблицу."""
+    return STATUS_CODES.get(status, OTHER_STATUS)
+
+
+class TenantTable:
+    """Таблица состояния арендаторов в разделяемой памяти.
+
+    Это зеркало для наблюдения: опросчики держат полное состояние
+    у себя (в нём же отметки отправленных статусов) и после каждого
+    цикла копируют сюда сводку, а супервизор читает её для отчёта
+    о состоянии без запросов к процессам. Источником данных для опроса
+    таблица не служит.
+
+    Записи фиксированной длины (40 байт): счётчик версии, код статуса,
+    идентификатор, метка времени запроса, время следующего опроса,
+    число ошибок подряд. Поиск — открытая адресация по идентификатору,
+    поэтому процессам не нужен отдельный индекс.
+
+    Таблица делится на shards равных областей по capacity // shards
+    записей, арендатор живёт в области своего опросчика (shard_of).
+    Поэтому каждую область, включая занятие и освобождение записей,
+    пишет один процесс, и блокировки не нужны. Удалённая запись
+    помечается идентификатором DELETED и занимается заново. Читатели
+    по счётчику версии повторяют чтение, попавшее на запись.
+    """
+
+    def __init__(self, capacity=None, name=None, shards=1, shard=None):
+        """Новая таблица на capacity записей или подключение к name.
+
+        shard — номер области, которую пишет подключившийся процесс.
+        """
+        if name is None:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=HEADER.size + capacity * RECORD.size
+            )
+            HEADER.pack_into(self.memory.buf, 0, capacity, shards)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.capacity, self.shards = HEADER.unpack_from(self.memory.buf, 0)
+        self.size = self.capacity // self.shards
+        self.shard = shard
+        self.buffer = self.memory.buf
+
+    @property
+    def name(self):
+        """Имя блока разделяемой памяти для подключения."""
+        return self.memory.name
+
+    def offset(self, slot):
+        """Смещение записи в буфере."""
+        return HEADER.size + slot * RECORD.size
+
+    def region(self, shard):
+        """Номера записей области shard."""
+        return range(shard * self.size, (shard + 1) * self.size)
+
+    def find(self, key, insert=False):
+        """Номер записи арендатора или None.
+
+        С insert возвращается свободная или удалённая запись для нового
+        арендатора; если в области места нет — MemoryError.
+        """
+        identifier = tenant_id(key)
+        slots = self.region(shard_of(key, self.shards))
+        start = identifier % self.size
+        free = None
+        for step in range(self.size):
+            slot = slots[(start + step) % self.size]
+            stored = RECORD.unpack_from(self.buffer, self.offset(slot))[2]
+            if stored == identifier:
+                return slot
+            if stored == DELETED and free is None:
+                free = slot
+            if stored == 0:
+                free = slot if free is None else free
+                break
+        if insert and free is None:
+            raise MemoryError(TABLE_FULL.format(self.size))
+        return free if insert else None
+
+    def write_slot(self, slot, *fields):
+        """Запись полей под нечётной версией.
+
+        Версия после записи всегда чётная, даже если предыдущий
+        писатель был остановлен посреди записи.
+        """
+        offset = self.offset(slot)
+        version = RECORD.unpack_from(self.buffer, offset)[0]
+        writing = ((version + 1) | 1) & VERSION_MASK
+        VERSION.pack_into(self.buffer, offset, writing)
+        RECORD.pack_into(self.buffer, offset, writing, *fields)
+        VERSION.pack_into(self.buffer, offset, (writing + 1) & VERSION_MASK)
+
+    def write(self, key, cursor, status, next_due, errors):
+        """Запись состояния арендатора."""
+        self.write_slot(
+            self.find(key, insert=True), status_code(status), tenant_id(key),
+            int(cursor), float(next_due), errors
+        )
+
+    def remove(self, key):
+        """Освобождение записи арендатора."""
+        slot = self.find(key)
+        if slot is not None:
+            self.write_slot(slot, 0, DELETED, 0, 0.0, 0)
+
+    def retain(self, keys):
+        """Освобождение записей своей области, кроме арендаторов keys."""
+        kept = {tenant_id(key) for key in keys}
+        removed = 0
+        for slot in self.region(self.shard or 0):
+            record = self.read_slot(slot)
+            if record is None or record.tenant_id in (0, DELETED):
+                continue
+            if record.tenant_id not in kept:
+                self.write_slot(slot, 0, DELETED, 0, 0.0, 0)
+                removed += 1
+        return removed
+
+    def read(self, key):
+        """Состояние арендатора или None."""
+        slot = self.find(key)
+        return None if slot is None else self.read_slot(slot)
+
+    def read_slot(self, slot, retries=READ_RETRIES):
+        """Согласованное чтение записи.
+
+        Запись, которая остаётся недописанной все retries попыток
+        (писатель остановлен посреди записи), читается как None.
+        """
+        offset = self.offset(slot)
+        for _ in range(retries):
+            version, code, identifier, cursor, next_due, errors = (
+                RECORD.unpack_from(self.buffer, offset)
+            )
+            if version % 2 == 0 and version == (
+                VERSION.unpack_from(self.buffer, offset)[0]
+            ):
+                return TenantRecord(
+                    identifier, cursor, STATUS_NAMES.get(code, code),
+                    next_due, errors
+                )
+        logger.warning(TORN_RECORD.format(slot))
+        return None
+
+    def __iter__(self):
+        """Перебор заполненных записей."""
+        for slot in range(self.capacity):
+            record = self.read_slot(slot)
+            if record is not None and record.tenant_id not in (0, DELETED):
+                yield record
+
+    def close(self):
+        """Отключение от таблицы."""
+        self.buffer = None
+        self.memory.close()
+
+    def unlink(self):
+        """Удаление таблицы; вызывает создавший её процесс."""
+        self.memory.unlink()
+
+
+def publish(table, states):
+    """Запись состояний арендаторов процесса в таблицу.
+
+    Записи арендаторов, которых больше нет в states, освобождаются.
+    Переполнение области не прерывает цикл опроса: не поместившиеся
+    арендаторы пропускаются с записью в журнал.
+    """
+    table.retain(states)
+    skipped, overflow = 0, None
+    for key, state in states.items():
+        try:
+            table.write(
+                key, state['timestamp'], state.get('status'),
+                state.get('next_poll') or 0, state.get('errors', 0)
+            )
+        except MemoryError as error:
+            skipped, overflow = skipped + 1, error
+    if overflow is not None:
+        logger.error(PUBLISH_FAILED.format(skipped, overflow))
@@ -0,0 +1,210 @@
+import argparse
+import bisect
+import logging
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+import homework
+from clock import SimulatedClock
+from state import new_state
+from tenants import Tenant
+
+SIMULATION_START = 1700000000
+DAY = 86400
+SUBMIT_EVERY = 2 * DAY
+REVIEW_TIME = 6 * 3600
+TAKE_TIME = 3600
+
+SIMULATION_SUMMARY = (
+    'Арендаторов: {tenants}, модельных суток: {days}, циклов: {cycles}\n'
+    'Запросов к API: {calls}, смен статуса: {changes}, '
+    'сообщений: {messages}, запросов на смену статуса: '
+    '{calls_per_change:.1f}\n'
+    'Задержка доставки, с: медиана {latency_p50:.0f}, '
+    '95% {latency_p95:.0f}, максимум {latency_max:.0f}\n'
+    'Время проверки, ч: медиана {reviewing_p50:.1f}, '
+    '95% {reviewing_p95:.1f}\n'
+    'Арендаторов с отозванным токеном: {failing}, запросов от них: '
+    '{failing_calls}, понижено: {demoted}\n'
+    'Время прогона: {elapsed:.2f} с'
+)
+
+
+def iso_time(timestamp):
+    """Время в формате поля date_updated API."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+class StatusFeed:
+    """Модельный API: смены статусов работ по расписанию.
+
+    Каждый арендатор сдаёт работы в среднем раз в SUBMIT_EVERY секунд;
+    работа берётся на проверку и получает вердикт через случайные
+    промежутки. Ответ содержит работы, изменившиеся после from_date.
+    """
+
+    def __init__(self, tenants, start, end, clock, seed=0, revoked=()):
+        """Расписание смен статусов для tenants на [start, end).
+
+        Запросы с токенами из revoked получают ответ 401.
+        """
+        self.clock = clock
+        self.revoked = set(revoked)
+        self.revoked_calls = 0
+        self.calls = 0
+        self.events = {}
+        self.changes = {}
+        rng = random.Random(seed)
+        for tenant in tenants:
+            self.events[tenant.practicum_token] = self.schedule(
+                tenant, start, end, rng
+            )
+
+    def schedule(self, tenant, start, end, rng):
+        """События (время, номер, имя, статус) одного арендатора."""
+        events = []
+        submitted = start + rng.expovariate(1 / SUBMIT_EVERY)
+        number = 0
+        while submitted < end:
+            number += 1
+            name = f'hw{number}.zip'
+            taken = submitted + rng.expovariate(1 / TAKE_TIME)
+            reviewed = taken + rng.expovariate(1 / REVIEW_TIME)
+            verdict = rng.choice(('approved', 'rejected'))
+            for moment, status in ((taken, 'reviewing'), (reviewed, verdict)):
+                moment = int(moment)
+                if moment < end:
+                    events.append((moment, number, name, status))
+                    text = homework.status_registry.get(status).render(name)
+                    self.changes[(tenant.chat_id, text)] = moment
+            submitted = reviewed + rng.expovariate(1 / SUBMIT_EVERY)
+        events.sort()
+        return events
+
+    def __call__(self, headers, timestamp):
+        """Ответ API на момент модельного времени."""
+        self.calls += 1
+        token = headers['Authorization'].split()[-1]
+        if token in self.revoked:
+            self.revoked_calls += 1
+            raise homework.APIResponseError('401', HTTPStatus.UNAUTHORIZED)
+        events = self.events[token]
+        now = int(self.clock.time())
+        first = bisect.bisect_right(events, (timestamp, float('inf')))
+        last = bisect.bisect_right(events, (now, float('inf')))
+        latest = {}
+        for moment, number, name, status in events[first:last]:
+            latest[number] = {
+                'id': number,
+                'homework_name': name,
+                'status': status,
+                'date_updated': iso_time(moment),
+            }
+        return {
+            'homeworks': list(reversed(latest.values())),
+            'current_date': now,
+        }
+
+
+def percentile(values, share):
+    """Значение, не превышаемое долей share значений."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def simulate(
+    tenants=1000, days=1, seed=0, start=SIMULATION_START, failing=0,
+    budget=None
+):
+    """Прогон цикла опроса в модельном времени.
+
+    Возвращает число запросов к API на одну смену статуса и задержки
+    доставки уведомлений относительно смены статуса. У failing
+    арендаторов токен отозван; budget ограничивает опросы за цикл.
+    """
+    clock = SimulatedClock(start)
+    end = start + days * DAY
+    registry = [
+        Tenant(f'token{index}', 'bot', str(index)) for index in range(tenants)
+    ]
+    feed = StatusFeed(
+        registry, start, end, clock, seed,
+        [tenant.practicum_token for tenant in registry[:failing]]
+    )
+    latencies = []
+
+    def deliver(bot, tenant, text):
+        changed = feed.changes.get((tenant.chat_id, text))
+        if changed is not None:
+            latencies.append(clock.time() - changed)
+        return True
+
+    runtime = homework.Runtime(
+        None, {tenant.key: new_state(start) for tenant in registry},
+        deliver, clock
+    )
+    runtime.bots['bot'] = None
+    runtime.fetch = feed
+    runtime.scheduler.budget = budget
+    stats = Counter()
+    started = time.perf_counter()
+    while clock.time() < end:
+        homework.poll_tenants(runtime, registry)
+        stats['cycles'] += 1
+        clock.sleep(homework.RETRY_PERIOD)
+    stats.update(
+        tenants=tenants,
+        days=days,
+        calls=feed.calls,
+        changes=len(feed.changes),
+        failing=failing,
+        failing_calls=feed.revoked_calls,
+        demoted=runtime.scheduler.report(runtime.states)['demoted'],
+        messages=len(latencies),
+        elapsed=time.perf_counter() - started,
+    )
+    stats['calls_per_change'] = feed.calls / max(len(feed.changes), 1)
+    stats['latency_p50'] = statistics.median(latencies) if latencies else 0
+    stats['latency_p95'] = percentile(latencies, 0.95)
+    stats['latency_max'] = max(latencies, default=0)
+    report = runtime.analytics.report()
+    for name in ('reviewing_p50', 'reviewing_p95'):
+        stats[name] = (report[name] or 0) / 3600
+    return stats
+
+
+def parse_args():
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Прогон цикла опроса в модельном времени'
+    )
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--failing', type=int, default=0,
+        help='арендаторов с отозванным токеном'
+    )
+    parser.add_argument(
+        '--budget', type=int, default=None, help='опросов за цикл'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.disable(logging.CRITICAL)
+    args = parse_args()
+    print(SIMULATION_SUMMARY.format(
+        **simulate(
+            args.tenants, args.days, args.seed, failing=args.failing,
+            budget=args.budget
+        )
+    ))
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import struct
+import zlib
+
+CHECKPOINT_EVERY = 100
+RECORD_HEADER = struct.Struct('>II')
+
+SNAPSHOT_RESTORED = (
+    'Состояние восстановлено из {}: контрольная точка #{}, '
+    'записей журнала {}'
+)
+SNAPSHOT_LOAD_ERROR = 'Не удалось прочитать снимок {}: {}'
+LOG_TRUNCATED = 'Журнал {} оборван после записи #{}, хвост отброшен'
+CHECKPOINT_WRITTEN = 'Контрольная точка #{} записана в {}'
+
+logger = logging.getLogger(__name__)
+
+
+def encode(snapshot):
+    """Разделы снимка со значениями в JSON.
+
+    Кортежи становятся списками; ключи словарей — строками.
+    """
+    return {
+        section: {
+            key: json.dumps(value, ensure_ascii=False, sort_keys=True)
+            for key, value in items.items()
+        }
+        for section, items in snapshot.items()
+    }
+
+
+def decode(sections):
+    """Снимок из разделов со значениями в JSON."""
+    return {
+        section: {key: json.loads(value) for key, value in items.items()}
+        for section, items in sections.items()
+    }
+
+
+def dump(data):
+    """Байты записи журнала или контрольной точки."""
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+def changes(written, encoded):
+    """Изменившиеся и удалённые ключи по разделам."""
+    changed, removed = {}, {}
+    for section in written.keys() | encoded.keys():
+        old, new = written.get(section, {}), encoded.get(section, {})
+        updated = {
+            key: value for key, value in new.items() if old.get(key) != value
+        }
+        deleted = [key for key in old if key not in new]
+        if updated:
+            changed[section] = updated
+        if deleted:
+            removed[section] = deleted
+    return changed, removed
+
+
+class SnapshotLog:
+    """Двоичные снимки состояния: контрольная точка и журнал изменений.
+
+    Снимок — словарь разделов {раздел: {ключ: значение}} из данных,
+    представимых в JSON: чужие журналы только разбираются, а не
+    исполняются, как при pickle. save дописывает
+    в журнал только изменившиеся и удалённые ключи; первый save после
+    запуска и каждый checkpoint_every-й сжимают полный снимок
+    в контрольную точку path и начинают журнал path.log заново.
+    Записи журнала снабжены контрольной суммой, и оборванный при сбое
+    хвост отбрасывается при загрузке.
+    """
+
+    def __init__(self, path, checkpoint_every=CHECKPOINT_EVERY):
+        """Снимки в файлах path и path.log."""
+        self.path = path
+        self.log_path = f'{path}.log'
+        self.checkpoint_every = checkpoint_every
+        self.sequence = 0
+        self.records = None
+        self.written = {}
+
+    def load(self, repair=True):
+        """Последний сохранённый снимок или None, если его нет.
+
+        Без repair оборванный хвост журнала не отрезается на диске —
+        для чтения чужих журналов.
+        """
+        sections, checkpoint = {}, 0
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'rb') as file:
+                    data = json.loads(zlib.decompress(file.read()))
+                sections, checkpoint = data['sections'], data['sequence']
+            records = [
+                record for record in self.read_log(repair)
+                if record['sequence'] > checkpoint
+            ]
+            sequence = checkpoint
+            for record in records:
+                for section, items in record['changed'].items():
+                    sections.setdefault(section, {}).update(items)
+                for section, keys in record['removed'].items():
+                    for key in keys:
+                        sections.get(section, {}).pop(key, None)
+                sequence = record['sequence']
+            snapshot = decode(sections)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError,
+                zlib.error) as error:
+            logger.error(SNAPSHOT_LOAD_ERROR.format(self.path, error))
+            return None
+        self.sequence = sequence
+        if not self.sequence:
+            return None
+        self.written = sections
+        logger.info(SNAPSHOT_RESTORED.format(
+            self.path, checkpoint, len(records)
+        ))
+        return snapshot
+
+    def read_log(self, repair=True):
+        """Целые записи журнала; с repair оборванный хвост отрезается."""
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path, 'rb') as file:
+            data = file.read()
+        records, offset = [], 0
+        while offset < len(data):
+            start = offset + RECORD_HEADER.size
+            if start > len(data):
+                break
+            length, checksum = RECORD_HEADER.unpack_from(data, offset)
+            body = data[start:start + length]
+            if len(body) < length or zlib.crc32(body) != checksum:
+                break
+            records.append(json.loads(body))
+            offset = start + length
+        if offset < len(data) and repair:
+            logger.warning(LOG_TRUNCATED.format(
+                self.log_path, records[-1]['sequence'] if records else 0
+            ))
+            with open(self.log_path, 'r+b') as file:
+                file.truncate(offset)
+        return records
+
+    def save(self, snapshot):
+        """Запись изменений снимка в журнал или контрольную точку."""
+        encoded = encode(snapshot)
+        if self.records is None or self.records >= self.checkpoint_every:
+            self.checkpoint(encoded)
+            return
+        changed, removed = changes(self.written, encoded)
+        if not (changed or removed):
+            return
+        self.sequence += 1
+        body = dump({
+            'sequence': self.sequence, 'changed': changed, 'removed': removed
+        })
+        with open(self.log_path, 'ab') as file:
+            file.write(RECORD_HEADER.pack(len(body), zlib.crc32(body)))
+            file.write(body)
+            file.flush()
+            os.fsync(file.fileno())
+        self.records += 1
+        self.written = encoded
+
+    def checkpoint(self, encoded):
+        """Атомарная запись полного снимка и очистка журнала."""
+        self.sequence += 1
+        data = zlib.compress(dump(
+            {'sequence': self.sequence, 'sections': encoded}
+        ))
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        open(self.log_path, 'wb').close()
+        self.records = 0
+        self.written = encoded
+        logger.debug(CHECKPOINT_WRITTEN.format(self.sequence, self.path))
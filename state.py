@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import re
+
+STATE_LOAD_ERROR = 'Не удалось прочитать состояние из {}: {}'
+STATE_SAVED = 'Состояние сохранено в {}'
+
+logger = logging.getLogger(__name__)
+
+
+def new_state(timestamp):
+    """Начальное состояние арендатора."""
+    return {'timestamp': timestamp}
+
+
+def shard_path(path, shard):
+    """Файл доли shard = (номер, всего): path.номер; без доли — path."""
+    if not path or shard is None:
+        return path
+    return f'{path}.{shard[0]}'
+
+
+def shard_files(path):
+    """Существующие файлы path и path.N всех долей."""
+    directory, name = os.path.split(os.path.abspath(path))
+    pattern = re.compile(re.escape(name) + r'(\.\d+)?')
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, entry) for entry in os.listdir(directory)
+        if pattern.fullmatch(entry)
+    )
+
+
+def merge_states(*sources):
+    """Состояния нескольких источников с самой поздней меткой времени.
+
+    При равных метках остаётся состояние из более раннего источника.
+    """
+    merged = {}
+    for states in sources:
+        for key, state in states.items():
+            known = merged.get(key)
+            if known is None or (
+                state.get('timestamp', 0) > known.get('timestamp', 0)
+            ):
+                merged[key] = state
+    return merged
+
+
+def load_states(path):
+    """Состояние из файла path; без файла или при ошибке — пустое."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError) as error:
+        logger.error(STATE_LOAD_ERROR.format(path, error))
+        return {}
+
+
+class StateStore:
+    """Хранение состояния арендаторов в JSON-файле.
+
+    С долей shard процесс пишет свой файл path.номер, а читает файлы
+    всех долей: после изменения числа опросчиков арендатор продолжает
+    с последней метки времени, кто бы его ни опрашивал раньше.
+    """
+
+    def __init__(self, path=None, shard=None):
+        """Хранилище в файле path; без пути состояние не пишется."""
+        self.base = path
+        self.shard = shard
+        self.path = shard_path(path, shard)
+
+    def load(self):
+        """Загрузка состояния; без файла возвращается пустой словарь."""
+        if self.shard is None or not self.path:
+            return load_states(self.path)
+        paths = [self.path] + [
+            path for path in shard_files(self.base)
+            if path != os.path.abspath(self.path)
+        ]
+        return merge_states(*map(load_states, paths))
+
+    def save(self, states):
+        """Атомарная запись состояния через временный файл."""
+        if not self.path:
+            return
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(states, file, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        logger.debug(STATE_SAVED.format(self.path))
+
+
+def sync_states(states, tenants, timestamp):
+    """Состояния текущих арендаторов: новые с нуля, удалённые убираются."""
+    return {
+        tenant.key: states.get(tenant.key) or new_state(timestamp)
+        for tenant in tenants
+    }
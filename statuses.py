@@ -0,0 +1,169 @@
+import json
+import logging
+from collections import namedtuple
+
+from caches import LRUCache
+from dispatch import ERRORS, LANE_NAMES, REVIEWING, VERDICTS
+from validation import preview
+
+NOTIFY, SILENT, ESCALATE = 'notify', 'silent', 'escalate'
+POLICIES = (NOTIFY, SILENT, ESCALATE)
+DEFAULT_LANES = {'approved': VERDICTS, 'rejected': VERDICTS}
+RENDERED_CACHE_SIZE = 10000
+
+STATUS_CONFIG_ERROR = 'Некорректное описание статуса "{}": {}'
+WRONG_VERDICT = 'verdict должен быть строкой, получено {}'
+WRONG_POLL_INTERVAL = (
+    'poll_interval должен быть положительным числом секунд, получено {}'
+)
+WRONG_LANE = 'неизвестная полоса {}'
+WRONG_OPTIONS = 'ожидался объект с полями статуса, получено {}'
+STATUSES_LOADED = 'Загружено описаний статусов: {}'
+
+logger = logging.getLogger(__name__)
+
+
+class Status(namedtuple('Status', (
+    'name', 'verdict', 'known', 'policy', 'lane', 'poll_interval',
+    'prefix', 'suffix'
+))):
+    """Описание статуса с заранее собранным текстом уведомления."""
+
+    __slots__ = ()
+
+    def render(self, homework_name):
+        """Текст уведомления для работы без форматирования шаблона.
+
+        Строка собирается одним выделением памяти, без промежуточной
+        копии названия.
+        """
+        return ''.join((self.prefix, homework_name, self.suffix))
+
+
+class StatusRegistry:
+    """Реестр статусов домашних работ.
+
+    Для каждого статуса заранее собирается текст уведомления вокруг
+    названия работы, поэтому поиск — одно обращение к словарю. Неизвестный
+    статус не вызывает исключения и обрабатывается по политике escalate.
+    Готовые тексты держатся в ограниченном кэше rendered: уведомления
+    об одной работе для разных чатов ссылаются на одну строку.
+    """
+
+    def __init__(self, verdicts, template, unknown_template, rendered=None):
+        """Реестр со стандартными вердиктами."""
+        self.template = template
+        self.unknown_template = unknown_template
+        self.rendered = (
+            LRUCache(RENDERED_CACHE_SIZE) if rendered is None else rendered
+        )
+        self.statuses = {}
+        for name, verdict in verdicts.items():
+            self.register(name, verdict)
+
+    def register(
+        self, name, verdict, policy=NOTIFY, lane=None, poll_interval=None
+    ):
+        """Добавление или замена статуса.
+
+        Типы полей проверяются здесь, чтобы ошибка в описании
+        обнаруживалась при загрузке, а не при каждом опросе.
+        """
+        if policy not in POLICIES:
+            raise ValueError(STATUS_CONFIG_ERROR.format(name, policy))
+        if not isinstance(verdict, str):
+            raise ValueError(STATUS_CONFIG_ERROR.format(
+                name, WRONG_VERDICT.format(preview(verdict))
+            ))
+        if poll_interval is not None and (
+            isinstance(poll_interval, bool)
+            or not isinstance(poll_interval, (int, float))
+            or not poll_interval > 0
+        ):
+            raise ValueError(STATUS_CONFIG_ERROR.format(
+                name, WRONG_POLL_INTERVAL.format(preview(poll_interval))
+            ))
+        lane = self.lane_index(name, lane)
+        prefix, suffix = self.split_template(self.template, verdict)
+        self.statuses[name] = Status(
+            name, verdict, True, policy, lane, poll_interval, prefix, suffix
+        )
+
+    @staticmethod
+    def lane_index(name, lane):
+        """Номер полосы по имени или номеру; по умолчанию — по статусу."""
+        if lane is None:
+            return DEFAULT_LANES.get(name, REVIEWING)
+        if isinstance(lane, str) and lane in LANE_NAMES:
+            return LANE_NAMES.index(lane)
+        if type(lane) is int and 0 <= lane < len(LANE_NAMES):
+            return lane
+        raise ValueError(STATUS_CONFIG_ERROR.format(
+            name, WRONG_LANE.format(preview(lane))
+        ))
+
+    @staticmethod
+    def split_template(template, verdict):
+        """Части шаблона до и после названия работы."""
+        prefix, rest = template.split('{}', 1)
+        return prefix, rest.replace('{}', verdict, 1)
+
+    def get(self, name):
+        """Описание статуса; для неизвестного — с политикой escalate.
+
+        Имя неизвестного статуса из ответа API может быть любого типа
+        и размера, в описание попадает его короткое представление.
+        """
+        status = self.statuses.get(name) if isinstance(name, str) else None
+        if status is not None:
+            return status
+        name = preview(name)
+        message = self.unknown_template.format(name)
+        return Status(
+            name, message, False, ESCALATE, ERRORS, None, '', ': ' + message
+        )
+
+    def render(self, status, homework_name):
+        """Текст уведомления из кэша или собранный заново."""
+        key = (status, homework_name)
+        text = self.rendered.get(key)
+        if text is None:
+            text = status.render(homework_name)
+            self.rendered.set(key, text)
+        return text
+
+    def update(self, config):
+        """Статусы из словаря вида {статус: {verdict, policy, lane, ...}}.
+
+        Описание применяется целиком или не применяется совсем.
+        """
+        previous = dict(self.statuses)
+        try:
+            for name, options in config.items():
+                self.update_status(name, options)
+        except ValueError:
+            self.statuses = previous
+            raise
+        logger.info(STATUSES_LOADED.format(len(self.statuses)))
+
+    def update_status(self, name, options):
+        """Замена полей одного статуса поверх известного описания."""
+        if not isinstance(options, dict):
+            raise ValueError(STATUS_CONFIG_ERROR.format(
+                name, WRONG_OPTIONS.format(preview(options))
+            ))
+        known = self.statuses.get(name)
+        merged = dict(
+            verdict=known.verdict, policy=known.policy, lane=known.lane,
+            poll_interval=known.poll_interval
+        ) if known else {}
+        merged.update(options)
+        try:
+            self.register(name, **merged)
+        except TypeError as error:
+            raise ValueError(STATUS_CONFIG_ERROR.format(name, error))
+
+    def load(self, path):
+        """Загрузка статусов из JSON-файла."""
+        with open(path, encoding='utf-8') as file:
+            self.update(json.load(file))
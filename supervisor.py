@@ -0,0 +1,451 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+
+import homework
+from caches import LRUCache
+from health import HealthServer
+from lifecycle import Lifecycle, ShutdownRequested
+from shared_state import TenantTable, publish
+from tenants import shard_of
+
+POLLERS = int(os.getenv('SUPERVISOR_POLLERS', 0)) or os.cpu_count() or 1
+SHARED_STATE_CAPACITY = int(os.getenv('SHARED_STATE_CAPACITY', 65536))
+NOTIFIER_QUEUE_SIZE = int(os.getenv('NOTIFIER_QUEUE_SIZE', 1000))
+EVENT_QUEUE_SIZE = 1000
+ROUTE_TIMEOUT = 5
+WATCH_PERIOD = 1
+HEALTH_LOG_PERIOD = 60
+REPLY_TIMEOUT = 60
+STOP_TIMEOUT = 30
+RESTART_BACKOFF = 1
+RESTART_BACKOFF_MAX = 300
+STABLE_PERIOD = 60
+HEARTBEAT_PERIOD = 10
+
+CHILD_STARTED = 'Процесс {} запущен, pid {}'
+CHILD_EXITED = 'Процесс {} завершился с кодом {}, перезапуск через {} с'
+CHILD_STUCK = 'Процесс {} не завершал цикл дольше {} с, остановка'
+REPLY_TIMEOUT_ERROR = 'Нет ответа от процесса отправки за {} с'
+QUEUE_FULL_ERROR = 'Очередь процесса отправки заполнена дольше {} с'
+HEALTH_SUMMARY = 'Состояние процессов: {}'
+ROUTE_QUEUE_FULL = (
+    'Очередь событий опросчика {} заполнена дольше {} с, '
+    'событие арендатора {} отброшено'
+)
+RELOAD_FORWARDED = 'Перечитывание конфигурации передано опросчикам: {}'
+
+logger = logging.getLogger(__name__)
+
+
+class QueueSender:
+    """Отправка сообщений через процесс-отправитель.
+
+    Вызывается диспетчером опросчика так же, как notify, и ждёт
+    результат доставки. Очередь к отправителю ограничена: опросчик
+    ждёт места не дольше тайм-аута. Ответы, пришедшие после тайм-аута,
+    по номеру запроса отбрасываются. Номер включает pid процесса:
+    очередь ответов переживает перезапуск опросчика, и поздний ответ
+    прежнему процессу не совпадёт с запросом нового.
+    """
+
+    def __init__(
+        self, index, requests, replies, timeout=REPLY_TIMEOUT, nonce=None
+    ):
+        """Отправитель опросчика index."""
+        self.index = index
+        self.requests = requests
+        self.replies = replies
+        self.timeout = timeout
+        self.nonce = os.getpid() if nonce is None else nonce
+        self.sequence = itertools.count()
+
+    def __call__(self, bot, tenant, text):
+        """Передача сообщения и ожидание результата доставки."""
+        number = (self.nonce, next(self.sequence))
+        deadline = time.monotonic() + self.timeout
+        try:
+            self.requests.put(
+                (self.index, number, tenant.telegram_token, tenant.chat_id,
+                 text),
+                timeout=self.timeout
+            )
+        except queue.Full:
+            logger.error(QUEUE_FULL_ERROR.format(self.timeout))
+            return False
+        while True:
+            try:
+                reply_number, delivered = self.replies.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except queue.Empty:
+                logger.error(REPLY_TIMEOUT_ERROR.format(self.timeout))
+                return False
+            if reply_number == number:
+                return delivered
+
+
+class EventRouter:
+    """Передача входящего события опросчику, которому принадлежит арендатор.
+
+    Вызывается приёмом событий супервизора вместо handle_event.
+    """
+
+    def __init__(self, queues, timeout=ROUTE_TIMEOUT):
+        """Очереди событий опросчиков по номеру доли."""
+        self.queues = queues
+        self.timeout = timeout
+
+    def __call__(self, event):
+        """Постановка события в очередь опросчика-владельца."""
+        index = shard_of(event['tenant'], len(self.queues))
+        try:
+            self.queues[index].put(event, timeout=self.timeout)
+        except queue.Full:
+            logger.error(ROUTE_QUEUE_FULL.format(
+                index, self.timeout, event['tenant']
+            ))
+
+
+class Heartbeat:
+    """Сигналы о работе опросчика для супервизора.
+
+    beat отправляется после каждого цикла, progress — по ходу цикла
+    после опроса арендатора, но не чаще period секунд: долгий цикл
+    большой доли не принимается за зависание.
+    """
+
+    def __init__(self, name, health, period=HEARTBEAT_PERIOD):
+        """Сигналы процесса name в очередь health."""
+        self.name = name
+        self.health = health
+        self.period = period
+        self.sent = time.monotonic()
+
+    def beat(self, runtime):
+        """Сигнал с числом арендаторов опросчика."""
+        self.sent = time.monotonic()
+        self.health.put((self.name, time.time(), len(runtime.states)))
+
+    def progress(self, runtime):
+        """Сигнал посреди цикла, если с прошлого прошло period секунд."""
+        if time.monotonic() - self.sent >= self.period:
+            self.beat(runtime)
+
+
+def notifier_main(requests, replies, health):
+    """Процесс отправки сообщений в Telegram для всех опросчиков.
+
+    Останавливается сообщением None после завершения опросчиков,
+    чтобы успеть отправить их последние уведомления. Боты держатся
+    в LRU-кэше на BOT_CACHE_SIZE токенов, соединения вытесненных
+    закрываются.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    bots = LRUCache(homework.BOT_CACHE_SIZE, on_evict=homework.close_bot)
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        index, number, token, chat_id, text = item
+        bot = bots.get(token)
+        if bot is None:
+            bot = bots[token] = homework.make_bot(token)
+        delivered = homework.send_chat_message(bot, chat_id, text)
+        replies[index].put((number, delivered))
+        health.put(('notifier', time.time(), None))
+
+
+def poller_main(
+    index, count, requests, replies, health, table_name, events=None
+):
+    """Процесс опроса своей доли арендаторов.
+
+    После каждого цикла состояние арендаторов пишется в общую таблицу.
+    Входящие события своих арендаторов приходят из очереди events.
+    Файлы состояния и снимков у доли свои (STATE_FILE.номер), читаются
+    файлы всех долей.
+    """
+    name = f'poller-{index}'
+    table = TenantTable(name=table_name, shard=index)
+    homework.SHARD = (index, count)
+    homework.HEALTH_PORT = None
+    homework.INGEST_PORT = None
+    homework.BROKER_FILE = None
+    homework.EVENT_QUEUE = events
+    homework.SENDER = QueueSender(index, requests, replies)
+    homework.CYCLE_HOOKS.append(
+        lambda runtime: publish(table, runtime.states)
+    )
+    heartbeat = Heartbeat(name, health)
+    homework.CYCLE_HOOKS.append(heartbeat.beat)
+    homework.PROGRESS_HOOKS.append(heartbeat.progress)
+    if homework.HISTORY_DIR:
+        homework.HISTORY_DIR = os.path.join(homework.HISTORY_DIR, name)
+    homework.main()
+
+
+class Child:
+    """Дочерний процесс с перезапуском по экспоненциальной задержке."""
+
+    def __init__(self, name, target, args):
+        """Описание процесса; запускается методом start."""
+        self.name = name
+        self.target = target
+        self.args = args
+        self.process = None
+        self.started = 0
+        self.restarts = 0
+        self.backoff = 0
+        self.next_start = 0
+
+    @property
+    def alive(self):
+        """Работает ли процесс."""
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, context, now):
+        """Запуск процесса."""
+        self.process = context.Process(
+            target=self.target, args=self.args, name=self.name
+        )
+        self.process.start()
+        self.started = now
+        logger.info(CHILD_STARTED.format(self.name, self.process.pid))
+
+    def schedule_restart(self, now):
+        """Время перезапуска: задержка растёт, пока процесс падает быстро."""
+        if now - self.started >= STABLE_PERIOD:
+            self.backoff = 0
+        self.backoff = min(
+            self.backoff * 2 or RESTART_BACKOFF, RESTART_BACKOFF_MAX
+        )
+        self.next_start = now + self.backoff
+        self.restarts += 1
+        logger.error(CHILD_EXITED.format(
+            self.name, self.process.exitcode, self.backoff
+        ))
+        self.process = None
+
+
+class Supervisor:
+    """Запуск и наблюдение за опросчиками и процессом отправки.
+
+    Приём событий (INGEST_PORT, BROKER_FILE) работает в супервизоре,
+    события передаются опросчикам по доле арендатора.
+    """
+
+    def __init__(
+        self, pollers=POLLERS, context=None, capacity=SHARED_STATE_CAPACITY,
+        queue_size=NOTIFIER_QUEUE_SIZE
+    ):
+        """Процесс отправки, pollers опросчиков и таблица состояния."""
+        self.context = context or multiprocessing.get_context()
+        self.table = TenantTable(capacity, shards=pollers)
+        self.requests = self.context.Queue(queue_size)
+        self.replies = [self.context.Queue() for _ in range(pollers)]
+        self.health = self.context.Queue()
+        self.events = None
+        if homework.INGEST_PORT or homework.BROKER_FILE:
+            self.events = [
+                self.context.Queue(EVENT_QUEUE_SIZE) for _ in range(pollers)
+            ]
+            for events in self.events:
+                events.cancel_join_thread()
+        self.notifier = Child(
+            'notifier', notifier_main,
+            (self.requests, self.replies, self.health)
+        )
+        self.pollers = [
+            Child(
+                f'poller-{index}', poller_main,
+                (index, pollers, self.requests, self.replies[index],
+                 self.health, self.table.name,
+                 self.events and self.events[index])
+            )
+            for index in range(pollers)
+        ]
+        self.heartbeats = {}
+        self.seen = {}
+        self.health_logged = 0
+        self.watched = time.time()
+        self.stopping = False
+
+    @property
+    def children(self):
+        """Все дочерние процессы."""
+        return [self.notifier, *self.pollers]
+
+    def stuck(self, child, now):
+        """Опросчик не присылал сигнал о работе дольше LIVENESS_TIMEOUT.
+
+        Отсчёт идёт от последнего сигнала, но не раньше запуска процесса.
+        Сигналы приходят и посреди цикла (Heartbeat.progress), поэтому
+        останавливается только опросчик, зависший на одном арендаторе.
+        """
+        last = max(self.seen.get(child.name, 0), child.started)
+        return now - last > homework.LIVENESS_TIMEOUT
+
+    def check_children(self, now):
+        """Перезапуск завершившихся и зависших процессов.
+
+        Зависший опросчик останавливается SIGKILL: SIGTERM посреди
+        цикла он только отмечает и ждёт конца цикла. Новый процесс
+        запускается, когда истекла задержка.
+        """
+        for child in self.pollers:
+            if child.alive and self.stuck(child, now):
+                logger.error(CHILD_STUCK.format(
+                    child.name, homework.LIVENESS_TIMEOUT
+                ))
+                child.process.kill()
+                child.process.join(STOP_TIMEOUT)
+        for child in self.children:
+            if child.alive:
+                continue
+            if child.process is not None:
+                child.schedule_restart(now)
+            if now >= child.next_start:
+                child.start(self.context, now)
+
+    def collect_health(self):
+        """Приём сигналов о работе от дочерних процессов."""
+        while True:
+            try:
+                name, timestamp, tenants = self.health.get_nowait()
+            except queue.Empty:
+                return
+            self.heartbeats[name] = {'time': timestamp, 'tenants': tenants}
+            self.seen[name] = time.monotonic()
+
+    def health_report(self):
+        """Сводное состояние дочерних процессов и арендаторов."""
+        report = {
+            child.name: {
+                'alive': child.alive,
+                'pid': child.process.pid if child.process else None,
+                'restarts': child.restarts,
+                **self.heartbeats.get(child.name, {}),
+            }
+            for child in self.children
+        }
+        records = list(self.table)
+        report['tenants'] = {
+            'total': len(records),
+            'failing': sum(1 for record in records if record.errors),
+        }
+        return report
+
+    def probe(self):
+        """Сводка для сервера проверок.
+
+        Жив — цикл наблюдения не завис; готов — все процессы работают
+        и опросчики недавно завершали цикл.
+        """
+        report = self.health_report()
+        now = time.time()
+        fresh = all(
+            now - self.heartbeats.get(child.name, {}).get('time', 0)
+            <= homework.LIVENESS_TIMEOUT
+            for child in self.pollers
+        )
+        live = now - self.watched <= homework.LIVENESS_TIMEOUT
+        report['live'] = live
+        report['ready'] = (
+            live and fresh and not self.stopping
+            and all(child.alive for child in self.children)
+        )
+        return report
+
+    def log_health(self, now):
+        """Периодическая запись сводного состояния в лог."""
+        if now - self.health_logged >= HEALTH_LOG_PERIOD:
+            self.health_logged = now
+            logger.info(HEALTH_SUMMARY.format(self.health_report()))
+
+    def forward_reload(self):
+        """Передача SIGHUP работающим опросчикам."""
+        names = []
+        for child in self.pollers:
+            if child.alive:
+                os.kill(child.process.pid, signal.SIGHUP)
+                names.append(child.name)
+        logger.info(RELOAD_FORWARDED.format(', '.join(names)))
+
+    def start_ingestion(self):
+        """Запуск приёма событий с передачей опросчикам."""
+        if self.events is None:
+            return []
+        return homework.start_sources(EventRouter(self.events))
+
+    def stop(self):
+        """Остановка: опросчики доводят цикл, затем отправитель."""
+        for child in self.pollers:
+            if child.alive:
+                child.process.terminate()
+        for child in self.pollers:
+            if child.process is not None:
+                child.process.join(STOP_TIMEOUT)
+        try:
+            self.requests.put(None, timeout=STOP_TIMEOUT)
+        except queue.Full:
+            pass
+        if self.notifier.process is not None:
+            self.notifier.process.join(STOP_TIMEOUT)
+        for child in self.children:
+            if child.alive:
+                child.process.kill()
+        self.table.close()
+        self.table.unlink()
+
+    def run(self):
+        """Наблюдение за процессами до сигнала остановки."""
+        lifecycle = Lifecycle()
+        lifecycle.install()
+        health_server = None
+        if homework.HEALTH_PORT:
+            health_server = HealthServer(
+                self.probe, homework.HEALTH_PORT, homework.HEALTH_HOST
+            )
+            health_server.start()
+        sources = self.start_ingestion()
+        try:
+            while not lifecycle.stopping:
+                with lifecycle.cycle():
+                    now = time.monotonic()
+                    if lifecycle.take_reload():
+                        self.forward_reload()
+                    self.check_children(now)
+                    self.collect_health()
+                    self.log_health(now)
+                    self.watched = time.time()
+                time.sleep(WATCH_PERIOD)
+        except ShutdownRequested:
+            pass
+        finally:
+            self.stopping = True
+            lifecycle.restore()
+            for source in sources:
+                source.stop()
+            self.stop()
+            if health_server:
+                health_server.stop()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format=(
+            '%(asctime)s, %(levelname)s, %(processName)s, %(message)s,'
+            '%(name)s, %(funcName)s, %(lineno)d'
+        ),
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    homework.check_tokens()
+    Supervisor().run()
@@ -0,0 +1,179 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from collections import namedtuple
+
+TENANT_FIELDS = ('practicum_token', 'telegram_token', 'chat_id')
+
+TENANTS_FILE_ERROR = 'Не удалось прочитать файл арендаторов {}: {}'
+TENANT_FIELDS_ERROR = 'У арендатора отсутствуют поля: {}'
+TENANTS_TYPE_ERROR = 'Ожидался список арендаторов, получен {}'
+TENANT_TYPE_ERROR = 'Арендатор должен быть объектом, получен {}'
+TENANT_ROW_ERROR = 'Строка {}: {}'
+TENANTS_RELOADED = 'Конфигурация арендаторов перечитана: {} шт.'
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(key, count):
+    """Номер процесса-опросчика, обслуживающего арендатора."""
+    return int(hashlib.sha256(key.encode()).hexdigest()[:8], 16) % count
+
+
+def token_digest(token):
+    """Хеш токена для ключей, в которых токен не должен храниться."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def tenant_key(chat_id, practicum_token):
+    """Стабильный ключ арендатора без токена в открытом виде."""
+    return f'{chat_id}:{token_digest(practicum_token)[:12]}'
+
+
+def oauth_headers(practicum_token):
+    """Заголовки запроса к API Практикума."""
+    return {'Authorization': f'OAuth {practicum_token}'}
+
+
+class Tenant(namedtuple('Tenant', TENANT_FIELDS)):
+    """Арендатор: пара токенов и чат для уведомлений."""
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Стабильный ключ арендатора без токена в открытом виде."""
+        return tenant_key(self.chat_id, self.practicum_token)
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API Практикума."""
+        return oauth_headers(self.practicum_token)
+
+
+def tenant_from_record(record):
+    """Арендатор из словаря с полями TENANT_FIELDS."""
+    if not isinstance(record, dict):
+        raise ValueError(TENANT_TYPE_ERROR.format(type(record).__name__))
+    missing = [name for name in TENANT_FIELDS if not record.get(name)]
+    if missing:
+        raise ValueError(TENANT_FIELDS_ERROR.format(missing))
+    return Tenant(*(str(record[name]).strip() for name in TENANT_FIELDS))
+
+
+def read_tenants(path):
+    """Чтение списка арендаторов из JSON-файла."""
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    if not isinstance(records, list):
+        raise ValueError(TENANTS_TYPE_ERROR.format(type(records).__name__))
+    return [tenant_from_record(record) for record in records]
+
+
+def read_tenants_csv(path):
+    """Чтение арендаторов из CSV с заголовком TENANT_FIELDS.
+
+    Ошибка в любой строке прерывает чтение целиком.
+    """
+    with open(path, encoding='utf-8', newline='') as file:
+        tenants = []
+        for line, record in enumerate(csv.DictReader(file), start=2):
+            try:
+                tenants.append(tenant_from_record(record))
+            except ValueError as error:
+                raise ValueError(TENANT_ROW_ERROR.format(line, error))
+    return tenants
+
+
+class TenantRegistry:
+    """Список арендаторов с перечитыванием конфигурации на лету.
+
+    Арендаторы собираются из основного (переменные окружения), JSON-файла
+    и хранилища токенов; токены из хранилища при этом не расшифровываются.
+    С shard=(номер, всего) в реестре остаются только арендаторы
+    этого процесса-опросчика.
+    """
+
+    def __init__(self, default=None, path=None, vault=None, shard=None):
+        """Реестр с основным арендатором и источниками."""
+        self.default = default
+        self.path = path
+        self.vault = vault
+        self.shard = shard
+        self.mtimes = None
+        self.tenants = self.own([default] if default else [])
+        self.index = {tenant.key: tenant for tenant in self.tenants}
+        self.reload()
+
+    def own(self, tenants):
+        """Арендаторы, относящиеся к своему процессу."""
+        if not self.shard:
+            return tenants
+        index, count = self.shard
+        return [
+            tenant for tenant in tenants
+            if shard_of(tenant.key, count) == index
+        ]
+
+    def __iter__(self):
+        """Перебор арендаторов."""
+        return iter(self.tenants)
+
+    def __len__(self):
+        """Число арендаторов."""
+        return len(self.tenants)
+
+    def get(self, key):
+        """Арендатор по ключу или None."""
+        return self.index.get(key)
+
+    def sources(self):
+        """Файлы, из которых читаются арендаторы."""
+        vault_path = self.vault.path if self.vault else None
+        return [path for path in (self.path, vault_path) if path]
+
+    def read_mtimes(self):
+        """Время изменения источников."""
+        return tuple(os.stat(path).st_mtime for path in self.sources())
+
+    def changed_on_disk(self):
+        """Изменились ли источники с момента чтения."""
+        if not self.sources():
+            return False
+        try:
+            return self.read_mtimes() != self.mtimes
+        except OSError:
+            return False
+
+    def reload(self):
+        """Перечитать источники; при ошибке остаётся прежний список.
+
+        Время изменения запоминается и при ошибке, чтобы тот же
+        испорченный файл не перечитывался каждый цикл.
+        """
+        if not self.sources():
+            return False
+        mtimes = self.mtimes
+        try:
+            mtimes = self.read_mtimes()
+            loaded = read_tenants(self.path) if self.path else []
+            if self.vault:
+                loaded.extend(self.vault.tenants())
+        except (OSError, ValueError, TypeError, sqlite3.Error) as error:
+            logger.error(TENANTS_FILE_ERROR.format(self.sources(), error))
+            self.mtimes = mtimes
+            return False
+        tenants = [self.default] if self.default else []
+        seen = {tenant.key for tenant in tenants}
+        for tenant in loaded:
+            if tenant.key not in seen:
+                seen.add(tenant.key)
+                tenants.append(tenant)
+        self.tenants = self.own(tenants)
+        self.index = {tenant.key: tenant for tenant in self.tenants}
+        self.mtimes = mtimes
+        logger.info(TENANTS_RELOADED.format(len(self.tenants)))
+        return True
@@ -0,0 +1,88 @@
+import random
+
+from analytics import HOUR, LogHistogram, ReviewAnalytics, parse_date
+
+START = 1700000000
+
+
+def review(analytics, number, taken, duration, verdict='approved'):
+    analytics.observe('token', {'id': number, 'status': 'reviewing'}, taken)
+    analytics.observe(
+        'token', {'id': number, 'status': verdict}, taken + duration
+    )
+
+
+class TestLogHistogram:
+
+    def test_quantiles_within_accuracy(self):
+        rng = random.Random(0)
+        values = sorted(rng.uniform(60, 10 * HOUR) for _ in range(5000))
+        histogram = LogHistogram(accuracy=0.02)
+        for value in values:
+            histogram.add(value)
+        for share in (0.5, 0.95):
+            exact = values[int(share * (len(values) - 1))]
+            assert abs(histogram.quantile(share) - exact) <= 0.03 * exact
+
+    def test_empty(self):
+        assert LogHistogram().quantile(0.5) is None
+
+
+class TestReviewAnalytics:
+
+    def test_parse_date(self):
+        assert parse_date('2023-11-14T22:13:20Z') == START
+        assert parse_date(None) is None
+
+    def test_rolling_window(self):
+        analytics = ReviewAnalytics(slots=2, slot_seconds=HOUR)
+        review(analytics, 1, START, 60, 'rejected')
+        review(analytics, 2, START + 10, 120)
+        report = analytics.report()
+        assert report['verdicts'] == 2
+        assert report['rejection_rate'] == 0.5
+        assert 55 <= report['reviewing_p50'] <= 125
+        review(analytics, 3, START + 3 * HOUR, 600)
+        report = analytics.report()
+        assert report['verdicts'] == 1
+        assert report['rejection_rate'] == 0
+
+    def test_repeated_status_counted_once(self):
+        analytics = ReviewAnalytics()
+        homework = {
+            'id': 1, 'status': 'approved',
+            'date_updated': '2023-11-14T22:13:20Z',
+        }
+        for _ in range(3):
+            analytics.observe('token', homework)
+        assert analytics.report()['verdicts'] == 1
+
+    def test_sla_alert_fires_once_and_restores(self):
+        alerts = []
+        analytics = ReviewAnalytics(
+            review_sla=HOUR, min_samples=10, on_alert=alerts.append
+        )
+        for number in range(10):
+            review(analytics, number, START + number, 2 * HOUR)
+        for number in range(10, 20):
+            review(analytics, number, START + number, 2 * HOUR)
+        assert len(alerts) == 1
+        assert analytics.report()['alerts'] == ['review_latency']
+        for number in range(20, 500):
+            review(analytics, number, START + number, 60)
+        assert len(alerts) == 2
+        assert analytics.report()['alerts'] == []
+
+    def test_poll_keys_hold_no_tokens(self, homework_module):
+        tenant = homework_module.Tenant('secret-token', 'bot', '1')
+        runtime = homework_module.Runtime(
+            None, {tenant.key: {'timestamp': 0}}, lambda *args: True
+        )
+        runtime.bots['bot'] = None
+        homework_module.process_homeworks(
+            runtime, tenant, {}, [{
+                'id': 1, 'homework_name': 'hw.zip', 'status': 'reviewing'
+            }], START
+        )
+        keys = [key for key, _ in runtime.analytics.seen.items()]
+        assert keys and 'secret-token' not in repr(keys)
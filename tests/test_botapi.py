@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from botapi import AsyncTelegramClient, TelegramClient, TelegramError
+from botapi import parse_reply
+from fake_telegram import FakeTelegramServer
+from tenants import Tenant
+
+
+@pytest.fixture
+def server():
+    server = FakeTelegramServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+class TestParseReply:
+
+    def test_result(self):
+        assert parse_reply(200, b'{"ok": true, "result": 1}') == 1
+
+    def test_retry_after(self):
+        with pytest.raises(TelegramError) as error:
+            parse_reply(429, (
+                b'{"ok": false, "error_code": 429, "description": "slow",'
+                b' "parameters": {"retry_after": 7}}'
+            ))
+        assert (error.value.error_code, error.value.retry_after) == (429, 7)
+
+    @pytest.mark.parametrize('body', [b'', b'<html>', b'[]', b'"ok"'])
+    def test_not_bot_api_reply(self, body):
+        with pytest.raises(TelegramError) as error:
+            parse_reply(502, body)
+        assert error.value.error_code == 502
+        assert error.value.retry_after is None
+
+
+class TestTelegramClient:
+
+    def test_connection_is_reused(self, server):
+        client = TelegramClient('1:token', server.url)
+        for index in range(5):
+            client.send_message('42', f'hw{index}')
+        client.close()
+        assert server.messages[-1] == ('42', 'hw4')
+        assert server.connections == 1
+
+    def test_waits_retry_after(self, server):
+        server.flood, server.retry_after = 2, 3
+        slept = []
+        client = TelegramClient('1:token', server.url, sleep=slept.append)
+        assert client.send_message('42', 'text')['message_id'] == 1
+        assert slept == [3, 3]
+        assert client.flood_waits == 2
+
+    def test_long_retry_after_blocks_sending(self, server):
+        server.flood, server.retry_after = 1, 60
+        client = TelegramClient('1:token', server.url, clock=lambda: 0)
+        with pytest.raises(TelegramError):
+            client.send_message('42', 'text')
+        with pytest.raises(TelegramError) as error:
+            client.send_message('42', 'text')
+        assert error.value.retry_after == 60
+        assert server.requests == 1
+
+    def test_api_error(self, server):
+        client = TelegramClient('1:token', server.url)
+        with pytest.raises(TelegramError) as error:
+            client.call('getMe')
+        assert error.value.error_code == 404
+
+    def test_send_many_keeps_chat_order(self, server):
+        client = TelegramClient('1:token', server.url, pool_size=4)
+        messages = [(str(index % 3), f'hw{index}') for index in range(12)]
+        results = client.send_many(messages)
+        assert [result['text'] for result in results] == [
+            text for _, text in messages
+        ]
+        for chat in '012':
+            assert [m for m in server.messages if m[0] == chat] == [
+                m for m in messages if m[0] == chat
+            ]
+        assert server.connections <= 4
+
+    def test_send_many_returns_errors(self, server):
+        server.flood, server.retry_after = 1, 60
+        client = TelegramClient('1:token', server.url)
+        results = client.send_many([('1', 'a'), ('1', 'b')])
+        assert all(isinstance(result, TelegramError) for result in results)
+
+
+class TestAsyncTelegramClient:
+
+    def test_send_many(self, server):
+        client = AsyncTelegramClient('1:token', server.url, pool_size=3)
+        messages = [(str(index % 2), f'hw{index}') for index in range(6)]
+        results = asyncio.run(client.send_many(messages))
+        client.close()
+        assert [result['text'] for result in results] == [
+            text for _, text in messages
+        ]
+        assert [m for m in server.messages if m[0] == '0'] == messages[::2]
+        assert not client.chats
+
+
+class TestPooledClientBehindSendMessage:
+
+    def test_runtime_uses_pooled_client(
+            self, server, monkeypatch, homework_module
+    ):
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CLIENT', 'pooled')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_API_URL', server.url)
+        runtime = homework_module.Runtime(None, {})
+        bot = runtime.bot(Tenant('token', '1:bot', '42'))
+        assert isinstance(bot, TelegramClient)
+        assert homework_module.send_chat_message(bot, '42', 'text')
+        assert server.messages == [('42', 'text')]
+
+    def test_send_failure_is_reported(self, server, homework_module):
+        server.flood, server.retry_after = 1, 60
+        bot = TelegramClient('1:bot', server.url)
+        assert not homework_module.send_chat_message(bot, '42', 'text')
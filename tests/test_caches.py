@@ -0,0 +1,106 @@
+from caches import LRUCache, TTLCache, estimate_size
+from coalescing import SingleFlight
+from statuses import StatusRegistry
+from tenants import Tenant
+
+
+class TestLRUCache:
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert 'b' not in cache
+        assert cache.get('a') == 1
+        assert cache.stats()['evictions'] == 1
+
+    def test_evicted_entries_reported(self):
+        evicted = []
+        cache = LRUCache(1, on_evict=lambda *item: evicted.append(item))
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.pop('b')
+        assert evicted == [('a', 1)]
+
+    def test_weight_limit(self):
+        cache = LRUCache(100, maxweight=10, weigh=len)
+        cache.set('a', 'x' * 4)
+        cache.set('b', 'x' * 4)
+        cache.set('c', 'x' * 4)
+        assert 'a' not in cache
+        assert cache.weight == 8
+        cache.pop('b')
+        assert cache.weight == 4
+
+    def test_oversized_entry_is_kept_alone(self):
+        cache = LRUCache(100, maxweight=10, weigh=len)
+        cache.set('a', 'x')
+        cache.set('b', 'x' * 20)
+        assert cache.items() == [('b', 'x' * 20)]
+
+    def test_hit_rate(self):
+        cache = LRUCache(10)
+        assert cache.stats()['hit_rate'] is None
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('a')
+        cache.get('b')
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses']) == (2, 1)
+        assert stats['hit_rate'] == 2 / 3
+
+    def test_empty_cache_is_falsy_but_usable(self):
+        cache = LRUCache(1)
+        assert not cache
+        assert SingleFlight(cache).completed is cache
+
+    def test_ttl_weight(self):
+        now = [0]
+        cache = TTLCache(10, 5, lambda: now[0], maxweight=3, weigh=len)
+        cache.set('a', 'xx')
+        assert cache.weight == 2
+        now[0] = 5
+        assert cache.get('a') is None
+        assert cache.weight == 0
+
+
+class TestEstimateSize:
+
+    def test_counts_nested_values(self):
+        response = {'homeworks': [{'homework_name': 'x' * 1000}]}
+        assert estimate_size(response) > 1000
+
+
+class TestBoundedCaches:
+
+    def test_rendered_messages_are_shared(self):
+        registry = StatusRegistry({'approved': 'Ок'}, '{} {}', '{}')
+        status = registry.get('approved')
+        first = registry.render(status, 'hw.zip')
+        second = registry.render(status, 'hw.zip')
+        assert first is second
+        assert registry.rendered.hits == 1
+
+    def test_completed_calls_are_bounded(self):
+        flights = SingleFlight(LRUCache(2))
+        for key in range(5):
+            flights.do(key, lambda: {'homeworks': []})
+        assert len(flights.completed) == 2
+        assert not flights.calls
+
+    def test_bots_are_evicted_and_recreated(self, homework_module):
+        runtime = homework_module.Runtime(None, {})
+        runtime.bots = LRUCache(2)
+        bots = [
+            runtime.bot(Tenant('token', f'{index}:bot', '1'))
+            for index in range(3)
+        ]
+        assert len(runtime.bots) == 2
+        again = runtime.bot(Tenant('token', '0:bot', '1'))
+        assert again is not bots[0]
+        assert runtime.bot(Tenant('token', '2:bot', '1')) is bots[2]
+        caches = runtime.health()['caches']
+        assert caches['bots']['evictions'] == 2
+        assert caches['bots']['hits'] == 1
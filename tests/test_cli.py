@@ -0,0 +1,109 @@
+import inspect
+import time
+
+import pytest
+import requests
+
+import cli
+import tests.check_utils as check_utils
+from vault import TokenVault, generate_key
+
+HEADER = 'practicum_token,telegram_token,chat_id\n'
+
+
+@pytest.fixture
+def vault_args(tmp_path):
+    return ['--vault', str(tmp_path / 'vault.db'), '--key', generate_key()]
+
+
+def write_csv(tmp_path, rows):
+    path = tmp_path / 'tenants.csv'
+    path.write_text(HEADER + ''.join(f'{row}\n' for row in rows))
+    return str(path)
+
+
+class TestImport:
+
+    def test_bulk_import(self, tmp_path, vault_args):
+        path = write_csv(tmp_path, ['p1,1:a,10', 'p2,2:b,20'])
+        assert cli.main(['import', path, *vault_args]) == 0
+        vault = TokenVault(vault_args[1], vault_args[3])
+        assert sorted(tenant.chat_id for tenant in vault.tenants()) == [
+            '10', '20'
+        ]
+        vault.close()
+
+    def test_invalid_row_aborts_import(self, tmp_path, vault_args, capsys):
+        path = write_csv(tmp_path, ['p1,1:a,10', 'p2,2:b,'])
+        assert cli.main(['import', path, *vault_args]) == 1
+        assert 'Строка 3' in capsys.readouterr().out
+        vault = TokenVault(vault_args[1], vault_args[3])
+        assert vault.tenants() == []
+        vault.close()
+
+
+class TestOnce:
+
+    def test_single_cycle_dry_run(
+            self, monkeypatch, capsys, random_timestamp, homework_module,
+            data_with_new_hw_status
+    ):
+        for name, value in (
+            ('PRACTICUM_TOKEN', 'sometoken'),
+            ('TELEGRAM_TOKEN', '1234:abcdefg'),
+            ('TELEGRAM_CHAT_ID', '12345'),
+            ('ONCE', True),
+            ('SENDER', cli.dry_run_sender),
+            ('STATE_FILE', None),
+        ):
+            monkeypatch.setattr(homework_module, name, value)
+        monkeypatch.setattr(
+            homework_module, 'TeleBot', check_utils.MockTelegramBot
+        )
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: check_utils.MockResponseGET(
+                data=data_with_new_hw_status
+            )
+        )
+
+        def no_sleep(seconds):
+            raise AssertionError('sleep in once mode')
+
+        monkeypatch.setattr(time, 'sleep', no_sleep)
+        inspect.unwrap(homework_module.main)()
+        output = capsys.readouterr().out
+        assert output.startswith('[12345] ')
+        assert homework_module.HOMEWORK_VERDICTS['approved'] in output
+
+    def test_dry_run_disables_side_effects(
+            self, monkeypatch, tmp_path, homework_module
+    ):
+        for name, value in (
+            ('STATE_FILE', str(tmp_path / 'state.json')),
+            ('INGEST_PORT', 8081),
+            ('BROKER_FILE', str(tmp_path / 'broker.db')),
+        ):
+            monkeypatch.setattr(homework_module, name, value)
+        for name in cli.DRY_RUN_DISABLED + (
+            'SENDER', 'ONCE', 'PROFILE_CYCLES', 'PROFILE_FILE', 'TRACE_EXPORT'
+        ):
+            monkeypatch.setattr(
+                homework_module, name, getattr(homework_module, name)
+            )
+        monkeypatch.setattr(
+            homework_module, 'setup_logging', lambda level: None
+        )
+        settings = {}
+
+        def fake_main():
+            settings.update(
+                (name, getattr(homework_module, name))
+                for name in cli.DRY_RUN_DISABLED
+            )
+
+        monkeypatch.setattr(homework_module, 'main', fake_main)
+        cli.main([
+            'once', '--dry-run', '--record', str(tmp_path / 'rec.jsonl')
+        ])
+        assert settings == dict.fromkeys(cli.DRY_RUN_DISABLED)
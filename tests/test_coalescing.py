@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+import requests
+
+import tests.check_utils as check_utils
+from coalescing import SingleFlight
+from state import new_state
+from tenants import Tenant
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_result(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            release.wait(1)
+            return {'homeworks': []}
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(flights.do('key', slow_call))
+        )
+        leader.start()
+        started.wait(1)
+        follower = threading.Thread(
+            target=lambda: results.append(flights.do('key', slow_call))
+        )
+        follower.start()
+        while not flights.hits:
+            pass
+        release.set()
+        leader.join(1)
+        follower.join(1)
+        assert len(calls) == 1
+        assert results[0] is results[1]
+
+    def test_error_is_shared_until_reset(self):
+        flights = SingleFlight()
+        calls = []
+
+        def failing_call():
+            calls.append(1)
+            raise ConnectionError('reset')
+
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                flights.do('key', failing_call)
+        flights.reset()
+        with pytest.raises(ConnectionError):
+            flights.do('key', failing_call)
+        assert len(calls) == 2
+
+
+class TestPollTenantsCoalescing:
+
+    def test_one_request_per_token(
+            self, monkeypatch, random_timestamp, homework_module
+    ):
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs['params'])
+            return check_utils.MockResponseGET(
+                random_timestamp=random_timestamp
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        tenants = [Tenant('shared', 'bot', str(chat)) for chat in range(3)]
+        tenants.append(Tenant('other', 'bot', '3'))
+        runtime = homework_module.Runtime(
+            check_utils.MockTelegramBot(),
+            {tenant.key: new_state(100) for tenant in tenants}
+        )
+        runtime.bots['bot'] = check_utils.MockTelegramBot()
+        homework_module.poll_tenants(runtime, tenants)
+        assert len(calls) == 2
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from digest import TELEGRAM_MESSAGE_LIMIT, DigestFlusher, split_digest
+from dispatch import ERRORS, REVIEWING, VERDICTS, Dispatcher, Outgoing
+from state import new_state
+from tenants import Tenant
+
+TENANT = Tenant('token', 'bot', '1')
+OTHER = Tenant('token', 'bot', '2')
+
+
+def outgoing(text):
+    return Outgoing(None, TENANT, text, None, 0)
+
+
+class TestSplitDigest:
+
+    def test_chunks_fit_telegram_limit(self):
+        items = [outgoing('x' * 1000) for _ in range(10)]
+        chunks = split_digest(items)
+        assert all(len(text) <= TELEGRAM_MESSAGE_LIMIT for text, _ in chunks)
+        assert sum(len(members) for _, members in chunks) == 10
+        assert len(chunks) == 3
+
+    def test_long_message_is_cut(self):
+        item = outgoing('y' * (TELEGRAM_MESSAGE_LIMIT + 10))
+        chunks = split_digest([item])
+        assert [len(text) for text, _ in chunks] == [
+            TELEGRAM_MESSAGE_LIMIT, 10
+        ]
+        assert all(members == [item] for _, members in chunks)
+
+
+class TestDigestDispatcher:
+
+    def make_dispatcher(self, sent, now):
+        return Dispatcher(
+            lambda bot, tenant, text: sent.append((tenant.chat_id, text))
+            or True,
+            digest_window=30, clock=lambda: now[0]
+        )
+
+    def test_messages_held_for_window_and_merged_per_chat(self):
+        sent, now = [], [0]
+        dispatcher = self.make_dispatcher(sent, now)
+        delivered = []
+        dispatcher.submit(REVIEWING, None, TENANT, 'b', delivered.append)
+        dispatcher.submit(VERDICTS, None, TENANT, 'a', delivered.append)
+        dispatcher.submit(ERRORS, None, OTHER, 'c')
+        assert dispatcher.drain() == 0
+        now[0] = 30
+        assert dispatcher.drain() == 2
+        assert sent == [('1', 'a\n\nb'), ('2', 'c')]
+        assert delivered == [True, True]
+        assert len(dispatcher) == 0
+
+    def test_flush_ignores_window(self):
+        sent, now = [], [0]
+        dispatcher = self.make_dispatcher(sent, now)
+        dispatcher.submit(VERDICTS, None, TENANT, 'a')
+        assert dispatcher.drain(flush=True) == 1
+        assert not dispatcher.has_pending(TENANT)
+
+    def test_next_flush(self):
+        sent, now = [], [0]
+        dispatcher = self.make_dispatcher(sent, now)
+        assert dispatcher.next_flush() is None
+        dispatcher.submit(VERDICTS, None, TENANT, 'a')
+        now[0] = 10
+        dispatcher.submit(VERDICTS, None, OTHER, 'b')
+        assert dispatcher.next_flush() == 20
+        now[0] = 40
+        assert dispatcher.next_flush() == 0
+        assert Dispatcher(None).next_flush() is None
+
+
+class TestDigestFlusher:
+
+    def test_sends_after_window_without_poll_cycle(self):
+        sent = threading.Event()
+        dispatcher = Dispatcher(
+            lambda bot, tenant, text: sent.set() or True, digest_window=0.2
+        )
+        lock = threading.RLock()
+        flusher = DigestFlusher(dispatcher, lock)
+        flusher.start()
+        try:
+            time.sleep(0.05)
+            started = time.monotonic()
+            with lock:
+                dispatcher.submit(VERDICTS, None, TENANT, 'a')
+            assert sent.wait(1.5)
+            assert time.monotonic() - started >= 0.2
+        finally:
+            flusher.stop()
+        assert len(dispatcher) == 0
+
+    def test_poll_cycle_keeps_window(
+            self, monkeypatch, homework_module
+    ):
+        monkeypatch.setattr(homework_module, 'DIGEST_WINDOW', 60)
+        sent = []
+        runtime = homework_module.Runtime(
+            None, {TENANT.key: new_state(0)},
+            lambda bot, tenant, text: sent.append(text) or True
+        )
+        runtime.bots['bot'] = None
+        runtime.fetch = lambda headers, timestamp: {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 1,
+        }
+        homework_module.poll_tenants(runtime, [TENANT])
+        assert sent == []
+        assert runtime.dispatcher.has_pending(TENANT)
+        assert 0 < runtime.dispatcher.next_flush() <= 60
@@ -0,0 +1,204 @@
+import threading
+
+import requests
+
+import tests.check_utils as check_utils
+from dispatch import (
+    BLOCK, COALESCE, ERRORS, REVIEWING, VERDICTS, Batch, Dispatcher
+)
+from state import new_state
+from tenants import Tenant
+
+TENANT = Tenant('token', 'bot', '1')
+
+
+class TestDispatcher:
+
+    def test_lanes_sent_by_priority(self):
+        sent = []
+        dispatcher = Dispatcher(
+            lambda bot, tenant, text: sent.append(text) or True
+        )
+        dispatcher.submit(ERRORS, None, TENANT, 'error')
+        dispatcher.submit(REVIEWING, None, TENANT, 'reviewing')
+        dispatcher.submit(VERDICTS, None, TENANT, 'approved')
+        assert dispatcher.has_pending(TENANT)
+        assert dispatcher.drain(budget=2) == 2
+        assert sent == ['approved', 'reviewing']
+        assert dispatcher.depths() == {
+            'verdicts': 0, 'reviewing': 0, 'errors': 1
+        }
+        dispatcher.drain()
+        assert not dispatcher.has_pending(TENANT)
+
+    def test_error_lane_drops_oldest(self):
+        results = []
+        dispatcher = Dispatcher(lambda *args: True, error_lane_size=2)
+        for text in ('first', 'second', 'third'):
+            dispatcher.submit(ERRORS, None, TENANT, text, results.append)
+        assert dispatcher.dropped == 1
+        assert results == [False]
+        assert [item.text for item in dispatcher.lanes[ERRORS]] == [
+            'second', 'third'
+        ]
+
+    def test_batch_completes_only_when_all_delivered(self):
+        completed = []
+        batch = Batch(2, lambda: completed.append(True))
+        batch(True)
+        assert not completed
+        batch(True)
+        assert completed
+        failed = Batch(2, lambda: completed.append(False))
+        failed(False)
+        failed(True)
+        assert completed == [True]
+
+
+class TestConcurrentDrain:
+
+    def test_chats_sent_concurrently_in_order(self):
+        other = Tenant('token', 'bot', '2')
+        barrier = threading.Barrier(2, timeout=1)
+        sent, finished = [], []
+
+        def sender(bot, tenant, text):
+            if text.endswith('1'):
+                barrier.wait()
+            sent.append(text)
+            return True
+
+        dispatcher = Dispatcher(sender, workers=2)
+        for tenant in (TENANT, other):
+            for number in (1, 2):
+                text = f'{tenant.chat_id}-{number}'
+                dispatcher.submit(
+                    VERDICTS, None, tenant, text,
+                    lambda delivered, text=text: finished.append(
+                        (text, threading.current_thread())
+                    )
+                )
+        assert dispatcher.drain() == 4
+        assert sent.index('1-1') < sent.index('1-2')
+        assert sent.index('2-1') < sent.index('2-2')
+        assert finished == [
+            (text, threading.current_thread())
+            for text in ('1-1', '1-2', '2-1', '2-2')
+        ]
+        assert not dispatcher.has_pending(TENANT)
+
+
+class TestBackpressure:
+
+    def test_block_rejects_when_full(self):
+        results = []
+        dispatcher = Dispatcher(
+            lambda *args: True, limits={VERDICTS: (1, BLOCK)}
+        )
+        assert dispatcher.submit(VERDICTS, None, TENANT, 'a', results.append)
+        assert not dispatcher.submit(
+            VERDICTS, None, TENANT, 'b', results.append
+        )
+        assert results == [False]
+        assert dispatcher.pressure() == 1
+        dispatcher.drain()
+        assert results == [False, True]
+        assert not dispatcher.has_pending(TENANT)
+        assert dispatcher.metrics()['verdicts']['high_watermark'] == 1
+
+    def test_error_lane_does_not_add_pressure(self):
+        dispatcher = Dispatcher(
+            lambda *args: True, error_lane_size=2,
+            limits={VERDICTS: (4, BLOCK)}
+        )
+        for text in ('a', 'b', 'c'):
+            dispatcher.submit(ERRORS, None, TENANT, text)
+        assert dispatcher.pressure() == 0
+        dispatcher.submit(VERDICTS, None, TENANT, 'verdict')
+        assert dispatcher.pressure() == 0.25
+
+    def test_coalesce_per_chat(self):
+        sent, results = [], []
+        dispatcher = Dispatcher(
+            lambda bot, tenant, text: sent.append(text) or True,
+            limits={REVIEWING: (2, COALESCE)}
+        )
+        other = Tenant('token', 'bot', '2')
+        for tenant, text in ((TENANT, 'a'), (other, 'b'), (TENANT, 'c')):
+            dispatcher.submit(
+                REVIEWING, None, tenant, text, results.append
+            )
+        assert len(dispatcher) == 2
+        assert dispatcher.metrics()['reviewing']['coalesced'] == 1
+        dispatcher.drain()
+        assert sent == ['a\n\nc', 'b']
+        assert results == [True, True, True]
+        assert not dispatcher.pending
+
+    def test_polls_shed_when_lane_full(
+            self, monkeypatch, random_timestamp, homework_module
+    ):
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs['params'])
+            return check_utils.MockResponseGET(
+                random_timestamp=random_timestamp
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        monkeypatch.setattr(homework_module, 'DISPATCH_BUDGET', 1)
+        monkeypatch.setattr(
+            homework_module, 'LANE_LIMITS', {VERDICTS: (2, BLOCK)}
+        )
+        tenants = [Tenant(f'token{i}', 'bot', str(i)) for i in range(3)]
+        runtime = homework_module.Runtime(
+            check_utils.MockTelegramBot(),
+            {tenant.key: new_state(100) for tenant in tenants}
+        )
+        runtime.bots['bot'] = check_utils.MockTelegramBot()
+        for text in ('a', 'b'):
+            assert runtime.dispatcher.submit(VERDICTS, None, TENANT, text)
+        assert runtime.dispatcher.pressure() == 1
+        homework_module.poll_tenants(runtime, tenants)
+        assert calls == []
+        assert runtime.shed == 3
+
+
+class TestPartialDelivery:
+
+    def test_delivered_messages_not_resent(
+            self, monkeypatch, random_timestamp, homework_module
+    ):
+        data = {
+            'homeworks': [
+                {'id': index, 'homework_name': f'hw{index}.zip',
+                 'status': 'approved'}
+                for index in (3, 2, 1)
+            ],
+            'current_date': random_timestamp,
+        }
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            check_utils.MockResponseGET(data=data)
+        ))
+        sent, failures = [], ['hw3.zip']
+
+        def sender(bot, tenant, text):
+            failed = [name for name in failures if name in text]
+            for name in failed:
+                failures.remove(name)
+            sent.append(text)
+            return not failed
+
+        runtime = homework_module.Runtime(
+            None, {TENANT.key: new_state(100)}, sender
+        )
+        runtime.bots['bot'] = None
+        homework_module.poll_tenants(runtime, [TENANT])
+        assert len(sent) == 3
+        assert runtime.states[TENANT.key]['timestamp'] == 100
+        runtime.states[TENANT.key]['next_poll'] = None
+        homework_module.poll_tenants(runtime, [TENANT])
+        assert len(sent) == 4
+        assert 'hw3.zip' in sent[-1]
+        assert runtime.states[TENANT.key]['timestamp'] == random_timestamp
@@ -0,0 +1,59 @@
+from caches import LRUCache
+from errors import ErrorAggregator, fingerprint
+
+
+def raise_value_error(text):
+    raise ValueError(text)
+
+
+def catch(text):
+    try:
+        raise_value_error(text)
+    except ValueError as error:
+        return error
+
+
+class TestErrorAggregator:
+
+    def test_fingerprint_ignores_message_text(self):
+        assert fingerprint(catch('first')) == fingerprint(catch('second'))
+        assert 'raise_value_error' in fingerprint(catch('first'))
+
+    def test_repeats_suppressed_until_digest(self):
+        errors = ErrorAggregator(window=60)
+        assert errors.record(catch('a'), 'message a', now=0) == 'message a'
+        assert errors.record(catch('b'), 'message b', now=10) is None
+        assert errors.record(catch('c'), 'message c', now=20) is None
+        assert errors.digests(now=30) == []
+        digests = errors.digests(now=61)
+        assert len(digests) == 1
+        assert ' 2 ' in digests[0]
+        assert digests[0].startswith('message c')
+        assert 'raise_value_error' not in digests[0]
+        assert errors.record(catch('d'), 'message d', now=62) == 'message d'
+
+    def test_discard_allows_resend(self):
+        errors = ErrorAggregator(window=60)
+        error = catch('a')
+        errors.record(error, 'message', now=0)
+        errors.discard(error)
+        assert errors.record(error, 'message', now=1) == 'message'
+
+    def test_fingerprints_bounded(self):
+        errors = ErrorAggregator(max_fingerprints=2)
+        for exception_class in (ValueError, KeyError, TypeError):
+            errors.record(exception_class(), 'message', now=0)
+        assert len(errors.entries) == 2
+
+
+class TestLRUCache:
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert 'b' not in cache
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
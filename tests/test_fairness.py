@@ -0,0 +1,170 @@
+import logging
+from collections import Counter
+
+from dispatch import REVIEWING, Dispatcher
+from fairness import MIN_WEIGHT, FairScheduler, Quota, tenant_weight
+from state import new_state
+from tenants import Tenant
+
+HEALTHY = [Tenant(f'token{index}', 'bot', str(index)) for index in range(3)]
+FAILING = Tenant('revoked', 'bot', '9')
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_states(tenants):
+    return {tenant.key: new_state(0) for tenant in tenants}
+
+
+class TestFairScheduler:
+
+    def test_weight(self):
+        assert tenant_weight({}) == 1
+        assert tenant_weight({'errors': 2}) == 1
+        assert tenant_weight({'errors': 3}) == 0.5
+        assert tenant_weight({'errors': 4}) == 0.25
+        assert tenant_weight({'errors': 100}) == MIN_WEIGHT
+
+    def test_budget_shared_equally(self):
+        tenants = HEALTHY + [Tenant('token3', 'bot', '3')]
+        states = make_states(tenants)
+        scheduler = FairScheduler(budget=2)
+        polls = Counter()
+        for _ in range(10):
+            for tenant in scheduler.order(tenants, states):
+                scheduler.charge(states[tenant.key])
+                polls[tenant] += 1
+        assert set(polls.values()) == {5}
+        assert scheduler.deferred == 20
+
+    def test_failing_tenant_gets_smaller_share(self):
+        tenants = HEALTHY + [FAILING]
+        states = make_states(tenants)
+        states[FAILING.key]['errors'] = 5
+        scheduler = FairScheduler(budget=2)
+        polls = Counter()
+        for _ in range(40):
+            for tenant in scheduler.order(tenants, states):
+                scheduler.charge(states[tenant.key])
+                polls[tenant] += 1
+        assert polls[FAILING] * 4 <= polls[HEALTHY[0]]
+
+    def test_order_keeps_registry_order_on_ties(self):
+        states = make_states(HEALTHY)
+        assert FairScheduler().order(HEALTHY, states) == HEALTHY
+
+    def test_new_tenant_does_not_jump_queue(self):
+        states = make_states(HEALTHY)
+        scheduler = FairScheduler(budget=1)
+        for _ in range(9):
+            for tenant in scheduler.order(HEALTHY, states):
+                scheduler.charge(states[tenant.key])
+        states[FAILING.key] = new_state(0)
+        scheduler.order(HEALTHY + [FAILING], states)
+        assert states[FAILING.key]['vtime'] == scheduler.virtual
+
+    def test_demotion_backoff_and_restore(self, caplog):
+        scheduler = FairScheduler(backoff=10, max_backoff=40)
+        state = new_state(0)
+        delays = []
+        with caplog.at_level(logging.INFO):
+            for errors in range(1, 7):
+                state['errors'] = errors
+                state['next_poll'] = None
+                scheduler.failed(FAILING, state, 100)
+                delays.append(state['next_poll'] and state['next_poll'] - 100)
+            assert delays == [None, None, 10, 20, 40, 40]
+            assert scheduler.demoted(state)
+            state['vtime'] = 1000.0
+            scheduler.succeeded(FAILING, state)
+        assert state['vtime'] == scheduler.virtual + 1
+        messages = [record.message for record in caplog.records]
+        assert sum('понижен' in message for message in messages) == 1
+        assert 'снова опрашивается' in messages[-1]
+
+
+class TestQuota:
+
+    def test_fixed_window(self):
+        clock = FakeClock()
+        quota = Quota(2, 60, clock)
+        assert quota.allow('a') and quota.allow('a')
+        assert not quota.allow('a')
+        assert quota.allow('b')
+        clock.now = 60
+        assert quota.allow('a')
+        assert quota.report()['denied'] == 1
+
+    def test_dispatcher_defers_over_quota_in_order(self):
+        clock = FakeClock()
+        sent = []
+        dispatcher = Dispatcher(
+            lambda bot, tenant, text: sent.append(text) or True,
+            quota=Quota(2, 60, clock)
+        )
+        noisy, quiet = HEALTHY[:2]
+        for index in range(4):
+            dispatcher.submit(REVIEWING, None, noisy, f'noisy{index}')
+        dispatcher.submit(REVIEWING, None, quiet, 'quiet')
+        assert dispatcher.drain() == 3
+        assert sent == ['noisy0', 'noisy1', 'quiet']
+        assert dispatcher.has_pending(noisy)
+        clock.now = 60
+        dispatcher.drain()
+        assert sent[3:] == ['noisy2', 'noisy3']
+
+
+class TestPollTenantsFairness:
+
+    def make_runtime(self, homework_module, tenants, sent):
+        runtime = homework_module.Runtime(
+            None, make_states(tenants),
+            lambda bot, tenant, text: sent.append(text) or True
+        )
+        runtime.bots['bot'] = None
+        return runtime
+
+    def test_revoked_token_is_demoted(self, homework_module, caplog):
+        sent = []
+        runtime = self.make_runtime(homework_module, [FAILING], sent)
+        calls = []
+
+        def fetch(*args):
+            calls.append(args)
+            raise homework_module.APIResponseError('401', 401)
+
+        runtime.fetch = fetch
+        state = runtime.states[FAILING.key]
+        with caplog.at_level(logging.DEBUG):
+            for _ in range(5):
+                state['next_poll'] = None
+                homework_module.poll_tenants(runtime, [FAILING])
+        levels = [
+            record.levelno for record in caplog.records
+            if 'Сбой в работе программы' in record.message
+        ]
+        assert levels == [logging.ERROR] * 3 + [logging.DEBUG] * 2
+        assert state['next_poll'] > runtime.clock.time()
+        homework_module.poll_tenants(runtime, [FAILING])
+        assert len(calls) == 5
+        assert runtime.health()['fairness']['demoted'] == 1
+
+    def test_poll_quota(self, homework_module, monkeypatch):
+        monkeypatch.setattr(homework_module, 'TENANT_POLL_QUOTA', 1)
+        sent = []
+        runtime = self.make_runtime(homework_module, HEALTHY, sent)
+        calls = []
+        runtime.fetch = lambda headers, timestamp: calls.append(headers) or {
+            'homeworks': [], 'current_date': timestamp
+        }
+        for _ in range(3):
+            homework_module.poll_tenants(runtime, HEALTHY)
+        assert len(calls) == len(HEALTHY)
+        assert runtime.health()['fairness']['poll_quota']['denied'] == 6
@@ -0,0 +1,194 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+import pytest
+from hypothesis import HealthCheck, given, settings
+from hypothesis import strategies as st
+
+import validation
+from analytics import parse_date
+from validation import PREVIEW_LIMIT, BatchValidator, preview
+
+FUZZ = settings(
+    max_examples=25, deadline=timedelta(milliseconds=200), database=None,
+    suppress_health_check=[
+        HealthCheck.too_slow, HealthCheck.data_too_large,
+        HealthCheck.function_scoped_fixture,
+    ]
+)
+HUGE = 10 ** 5
+SMALL_ALLOCATION = 64 * 1024
+TIME_CAP = 0.5
+
+scalars = (
+    st.none() | st.booleans() | st.integers() | st.floats()
+    | st.text(max_size=50) | st.binary(max_size=20)
+)
+values = st.recursive(
+    scalars,
+    lambda children: (
+        st.lists(children, max_size=5)
+        | st.dictionaries(st.text(max_size=10), children, max_size=5)
+    ),
+    max_leaves=20,
+)
+homeworks = st.fixed_dictionaries({}, optional={
+    'homework_name': st.text(max_size=100) | values,
+    'status': st.sampled_from(['approved', 'reviewing', 'rejected']) | values,
+    'id': st.integers() | values,
+    'date_updated': st.text(max_size=30) | values,
+}) | values
+
+
+def nested(depth):
+    payload = []
+    for _ in range(depth):
+        payload = [payload]
+    return payload
+
+
+def measure(func, *args):
+    """Время и пик выделенной памяти одного вызова.
+
+    Время под tracemalloc и на загруженной машине нестабильно, поэтому
+    проверяется только грубый потолок TIME_CAP, а стоимость — по памяти.
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        func(*args)
+    except (KeyError, TypeError, ValueError):
+        pass
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+ADVERSARIAL = {
+    'deep': nested(HUGE),
+    'huge_list': list(range(HUGE)),
+    'huge_string': 'x' * HUGE * 100,
+    'huge_dict': {str(index): index for index in range(HUGE)},
+    'bytes': b'\xff' * HUGE * 10,
+}
+
+
+class TestCheckResponseFuzz:
+
+    @FUZZ
+    @given(response=values | st.fixed_dictionaries({'homeworks': values}))
+    def test_returns_homeworks_or_raises(self, response, homework_module):
+        try:
+            result = homework_module.check_response(response)
+        except (KeyError, TypeError):
+            return
+        assert result is response['homeworks']
+        assert isinstance(result, list)
+
+    @pytest.mark.parametrize('name', ADVERSARIAL)
+    def test_constant_cost_on_huge_payloads(self, name, homework_module):
+        for response in (
+            ADVERSARIAL[name], {'homeworks': ADVERSARIAL[name]}
+        ):
+            elapsed, peak = measure(homework_module.check_response, response)
+            assert elapsed < TIME_CAP
+            assert peak < SMALL_ALLOCATION
+
+
+class TestParseStatusFuzz:
+
+    @FUZZ
+    @given(homework=st.dictionaries(st.text(max_size=20), values) | homeworks)
+    def test_returns_text_or_raises(self, homework, homework_module):
+        if not isinstance(homework, dict):
+            return
+        try:
+            message = homework_module.parse_status(homework)
+        except (KeyError, TypeError, ValueError) as error:
+            assert len(str(error)) < 2 * PREVIEW_LIMIT
+            return
+        assert isinstance(message, str)
+
+    @pytest.mark.parametrize('name', ADVERSARIAL)
+    def test_unknown_huge_status_is_cheap(self, name, homework_module):
+        homework = {'homework_name': 'hw.zip', 'status': ADVERSARIAL[name]}
+        elapsed, peak = measure(homework_module.parse_status, homework)
+        assert elapsed < TIME_CAP
+        assert peak < SMALL_ALLOCATION
+
+    def test_huge_name_costs_linear_memory(self, homework_module):
+        name = ADVERSARIAL['huge_string']
+        homework = {'homework_name': name, 'status': 'approved'}
+        elapsed, peak = measure(homework_module.parse_status, homework)
+        assert elapsed < TIME_CAP
+        assert peak < 3 * len(name)
+
+
+class TestValidationFuzz:
+
+    @FUZZ
+    @given(items=st.lists(homeworks, max_size=20))
+    def test_partitions_any_items(self, items):
+        result = BatchValidator().validate(items)
+        assert len(result.valid) + len(result.rejected) == len(items)
+        for homework in result.valid:
+            assert isinstance(homework['homework_name'], str)
+            assert isinstance(homework['status'], str)
+        for rejected in result.rejected:
+            assert rejected.errors
+            assert all(
+                len(error) < 2 * PREVIEW_LIMIT for error in rejected.errors
+            )
+
+    def test_linear_in_batch_size(self, monkeypatch):
+        validator = BatchValidator(quarantine_size=10)
+        bad = {'homework_name': 1, 'status': ['x'] * 1000, 'id': 'x' * 1000}
+        calls = []
+        repr1 = validation.previews.repr1
+        monkeypatch.setattr(
+            validation.previews, 'repr1',
+            lambda *args: calls.append(1) or repr1(*args)
+        )
+        counts = []
+        for size in (500, 2000):
+            calls.clear()
+            validator.validate([bad] * size)
+            counts.append(len(calls))
+        assert counts[0] > 0
+        assert counts[1] == 4 * counts[0]
+
+    def test_quarantine_does_not_retain_huge_items(self):
+        validator = BatchValidator(quarantine_size=10)
+        validator.validate([{'status': ADVERSARIAL['huge_string']}] * 10)
+        for rejected in validator.quarantine:
+            assert len(repr(rejected.item)) < 2 * PREVIEW_LIMIT
+
+
+class TestPreviewFuzz:
+
+    @FUZZ
+    @given(value=values)
+    def test_bounded(self, value):
+        assert len(preview(value)) < 2 * PREVIEW_LIMIT
+
+    @pytest.mark.parametrize('name', ADVERSARIAL)
+    def test_cheap_on_huge_values(self, name):
+        elapsed, peak = measure(preview, ADVERSARIAL[name])
+        assert elapsed < TIME_CAP
+        assert peak < SMALL_ALLOCATION
+
+
+class TestParseDateFuzz:
+
+    @FUZZ
+    @given(value=values)
+    def test_timestamp_or_none(self, value):
+        result = parse_date(value)
+        assert result is None or isinstance(result, float)
+
+    def test_huge_string_is_rejected_cheaply(self):
+        elapsed, peak = measure(parse_date, ADVERSARIAL['huge_string'])
+        assert elapsed < TIME_CAP
+        assert peak < SMALL_ALLOCATION
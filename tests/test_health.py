@@ -0,0 +1,120 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from breaker import UpstreamUnavailable
+from health import LOCALHOST, HealthServer, LoopMonitor
+
+
+class FakeClock:
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def fetch(port, path):
+    url = f'http://127.0.0.1:{port}{path}'
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_probes_after_cooldown(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('api', threshold=2, cooldown=10, clock=clock)
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise ConnectionError('down')
+
+        guarded = breaker.wrap(failing)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                guarded()
+        assert breaker.state == OPEN
+        with pytest.raises(UpstreamUnavailable):
+            guarded()
+        assert len(calls) == 2
+        clock.now = 10
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(ConnectionError):
+            guarded()
+        assert breaker.state == OPEN
+
+    def test_success_closes(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('api', threshold=1, cooldown=1, clock=clock)
+        breaker.failure()
+        clock.now = 1
+        assert breaker.wrap(lambda: 'ok')() == 'ok'
+        assert breaker.state == CLOSED
+        assert breaker.failures == 0
+
+    def test_other_errors_not_counted(self):
+        breaker = CircuitBreaker('api', threshold=1)
+
+        def invalid():
+            raise ValueError('bad data')
+
+        with pytest.raises(ValueError):
+            breaker.wrap(invalid)()
+        assert breaker.state == CLOSED
+
+
+class TestLoopMonitor:
+
+    def test_ready_after_first_cycle(self):
+        clock = FakeClock(100)
+        monitor = LoopMonitor(10, 30, clock)
+        assert monitor.live and not monitor.ready
+        monitor.cycle_started()
+        monitor.cycle_finished()
+        assert monitor.ready
+        monitor.stopping = True
+        assert not monitor.ready
+
+    def test_lag_and_stall(self):
+        clock = FakeClock(0)
+        monitor = LoopMonitor(10, 30, clock)
+        monitor.cycle_started()
+        clock.now = 2
+        monitor.cycle_finished()
+        clock.now = 17
+        monitor.cycle_started()
+        assert monitor.lag == 5
+        clock.now = 48
+        assert not monitor.live
+        assert not monitor.ready
+
+
+class TestHealthServer:
+
+    def test_endpoints(self):
+        report = {'live': True, 'ready': False, 'cycles': 0}
+        server = HealthServer(lambda: report, 0, host='127.0.0.1')
+        server.start()
+        try:
+            assert fetch(server.port, '/healthz')[0] == 200
+            assert fetch(server.port, '/readyz')[0] == 503
+            assert fetch(server.port, '/status') == (200, report)
+            assert fetch(server.port, '/missing')[0] == 404
+        finally:
+            server.stop()
+
+    def test_listens_on_localhost_by_default(self):
+        server = HealthServer(lambda: {}, 0)
+        try:
+            assert server.server.server_address[0] == LOCALHOST
+        finally:
+            server.server.server_close()
@@ -0,0 +1,153 @@
+import os
+
+import pytest
+import requests
+
+import cli
+from history import (
+    CSV, PARQUET, Event, HistoryExporter, exporter, history_files, scan
+)
+from state import new_state
+from tenants import Tenant
+from tests import check_utils
+
+DAY = 24 * 3600
+MONDAY = 1704067200
+
+
+def homework(index, status='approved'):
+    return {
+        'id': index, 'homework_name': f'hw{index}.zip', 'status': status,
+        'date_updated': '2024-01-01T00:00:00Z',
+    }
+
+
+def fill(directory, days=3, per_day=10, **options):
+    writer = HistoryExporter(**options)
+    writer.configure(str(directory), CSV)
+    for day in range(days):
+        for index in range(per_day):
+            writer.record(
+                'tenant', [homework(index)], MONDAY + day * DAY + index * 60
+            )
+    writer.close()
+    return writer
+
+
+class TestHistoryExporter:
+
+    def test_roundtrip(self, tmp_path):
+        writer = HistoryExporter()
+        writer.configure(str(tmp_path), CSV)
+        odd = {
+            'homework_name': 'a, "b"\nc.zip', 'status': 'reviewing',
+            'lesson_name': 'Урок',
+        }
+        writer.record('tenant', [homework(1), odd], MONDAY)
+        writer.close()
+        assert list(scan(str(tmp_path))) == [
+            Event(MONDAY, 'tenant', 1, 'hw1.zip', None, 'approved', MONDAY),
+            Event(
+                MONDAY, 'tenant', None, odd['homework_name'], 'Урок',
+                'reviewing', None
+            ),
+        ]
+
+    def test_rolled_by_day(self, tmp_path):
+        fill(tmp_path)
+        assert sorted(os.listdir(tmp_path)) == [
+            '2024-01-01.csv.gz', '2024-01-02.csv.gz', '2024-01-03.csv.gz'
+        ]
+
+    def test_chunks_by_rows(self, tmp_path):
+        writer = fill(tmp_path, days=1, per_day=10, chunk_rows=3)
+        assert writer.chunks == 4
+        assert len(list(scan(str(tmp_path)))) == 10
+
+    def test_chunks_by_age(self, tmp_path):
+        writer = fill(tmp_path, days=1, per_day=10, chunk_age=120)
+        assert writer.chunks == 4
+
+    def test_range_scan(self, tmp_path):
+        fill(tmp_path, chunk_rows=4)
+        start, end = MONDAY + DAY + 300, MONDAY + 2 * DAY + 120
+        times = [event.time for event in scan(str(tmp_path), start, end)]
+        assert times == (
+            [MONDAY + DAY + index * 60 for index in range(5, 10)]
+            + [MONDAY + 2 * DAY, MONDAY + 2 * DAY + 60]
+        )
+        assert len(history_files(str(tmp_path), start, end)) == 2
+
+    def test_torn_tail_is_dropped(self, tmp_path):
+        fill(tmp_path, days=1, chunk_rows=5)
+        path = tmp_path / '2024-01-01.csv.gz'
+        data = path.read_bytes()
+        path.write_bytes(data + data[:20])
+        assert len(list(scan(str(tmp_path)))) == 10
+
+    def test_nested_directories_and_tenant_filter(self, tmp_path):
+        for name in ('poller-0', 'poller-1'):
+            writer = HistoryExporter()
+            writer.configure(str(tmp_path / name), CSV)
+            writer.record(name, [homework(1)], MONDAY)
+            writer.close()
+        assert len(list(scan(str(tmp_path)))) == 2
+        assert [
+            event.tenant for event in scan(str(tmp_path), tenant='poller-1')
+        ] == ['poller-1']
+
+    def test_write_error_does_not_raise(self, tmp_path):
+        writer = HistoryExporter(chunk_rows=1)
+        writer.configure(str(tmp_path), CSV)
+        writer.directory = str(tmp_path / 'missing')
+        writer.record('tenant', [homework(1)], MONDAY)
+        assert writer.chunks == 0
+
+    def test_parquet(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        writer = HistoryExporter()
+        writer.configure(str(tmp_path), PARQUET)
+        writer.record('tenant', [homework(1)], MONDAY)
+        writer.close()
+        assert [event.id for event in scan(str(tmp_path))] == [1]
+
+
+class TestHistoryIntegration:
+
+    def test_delivered_statuses_exported(
+            self, tmp_path, monkeypatch, random_timestamp, homework_module
+    ):
+        data = {
+            'homeworks': [homework(2), homework(1, 'reviewing')],
+            'current_date': random_timestamp,
+        }
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            check_utils.MockResponseGET(data=data)
+        ))
+        tenant = Tenant('token', 'bot', '1')
+        runtime = homework_module.Runtime(
+            None, {tenant.key: new_state(100)},
+            lambda bot, tenant, text: True
+        )
+        runtime.bots['bot'] = None
+        exporter.configure(str(tmp_path))
+        try:
+            homework_module.poll_tenants(runtime, [tenant])
+            homework_module.poll_tenants(runtime, [tenant])
+        finally:
+            exporter.close()
+        events = list(scan(str(tmp_path)))
+        assert [(event.id, event.status) for event in events] == [
+            (2, 'approved'), (1, 'reviewing')
+        ]
+        assert {event.tenant for event in events} == {tenant.key}
+
+    def test_cli_range_scan(self, tmp_path, capsys):
+        fill(tmp_path)
+        assert cli.main([
+            'history', '--dir', str(tmp_path), '--since', '2024-01-02',
+            '--until', '2024-01-02T00:05:00'
+        ]) == 0
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].startswith('time,tenant,id')
+        assert len(lines) == 6
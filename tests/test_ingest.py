@@ -0,0 +1,183 @@
+import http.client
+import json
+import queue
+import time
+import urllib.error
+import urllib.request
+
+import requests
+
+import tests.check_utils as check_utils
+from ingest import (
+    BrokerConsumer, Ingestor, LocalBroker, QueueConsumer, WebhookServer
+)
+from state import new_state
+from tenants import Tenant, TenantRegistry
+
+TENANT = Tenant('token', 'bot', '1')
+HOMEWORK = {
+    'id': 1,
+    'homework_name': 'hw.zip',
+    'status': 'approved',
+    'date_updated': '2024-01-01T10:00:00Z',
+}
+EVENT = {'tenant': TENANT.key, 'homeworks': [HOMEWORK], 'current_date': 500}
+
+
+def post(port, body, secret='secret'):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}/events', data=body, method='POST',
+        headers={'Authorization': f'Bearer {secret}'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def post_raw(port, headers):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+    try:
+        connection.putrequest('POST', '/events')
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def make_runtime(homework_module, sent):
+    runtime = homework_module.Runtime(
+        None, {TENANT.key: new_state(100)},
+        lambda bot, tenant, text: sent.append(text) or True
+    )
+    runtime.bots['bot'] = None
+    return runtime
+
+
+class TestWebhook:
+
+    def test_events_accepted_and_processed(self):
+        events = []
+        ingestor = Ingestor(events.append)
+        server = WebhookServer(ingestor, 0, 'secret', host='127.0.0.1')
+        ingestor.start()
+        server.start()
+        try:
+            body = json.dumps(EVENT).encode()
+            assert post(server.port, body, secret='wrong') == 401
+            assert post(server.port, b'not json') == 400
+            assert post(server.port, body) == 202
+        finally:
+            server.stop()
+            ingestor.stop()
+        assert events == [EVENT]
+
+    def test_headers_checked_before_body(self):
+        events = []
+        server = WebhookServer(
+            Ingestor(events.append), 0, 'secret', host='127.0.0.1'
+        )
+        server.start()
+        auth = {'Authorization': 'Bearer secret'}
+        try:
+            assert post_raw(server.port, {
+                'Authorization': 'Bearer wrong', 'Content-Length': '100'
+            }) == 401
+            for length in ('-1', 'abc'):
+                assert post_raw(
+                    server.port, {**auth, 'Content-Length': length}
+                ) == 400
+            assert post_raw(
+                server.port, {**auth, 'Content-Length': '2000000'}
+            ) == 413
+        finally:
+            server.stop()
+        assert events == []
+
+    def test_stalled_body_times_out(self):
+        server = WebhookServer(
+            Ingestor(list), 0, 'secret', host='127.0.0.1', timeout=0.1
+        )
+        server.start()
+        connection = http.client.HTTPConnection(
+            '127.0.0.1', server.port, timeout=1
+        )
+        try:
+            connection.putrequest('POST', '/events')
+            connection.putheader('Authorization', 'Bearer secret')
+            connection.putheader('Content-Length', '100')
+            connection.endheaders()
+            started = time.monotonic()
+            assert connection.sock.recv(1) == b''
+            assert time.monotonic() - started < 1
+        finally:
+            connection.close()
+            server.stop()
+
+
+class TestLocalBroker:
+
+    def test_events_acknowledged_after_handling(self, tmp_path):
+        broker = LocalBroker(str(tmp_path / 'broker.db'))
+        broker.publish(EVENT)
+        broker.publish({'no tenant': True})
+        handled = []
+        consumer = BrokerConsumer(broker, handled.append)
+        assert consumer.poll() == 2
+        assert handled == [EVENT]
+        assert broker.take() == []
+        broker.close()
+
+
+class TestQueueConsumer:
+
+    def test_events_handled_until_stopped(self):
+        events, handled = queue.Queue(), []
+        consumer = QueueConsumer(events, handled.append, interval=0.01)
+        events.put(EVENT)
+        events.put({'tenant': 'broken'})
+        consumer.handler = lambda event: handled.append(event['homeworks'])
+        assert consumer.poll()
+        assert consumer.poll()
+        assert not consumer.poll()
+        assert handled == [EVENT['homeworks']]
+        assert consumer.processed == 2
+        consumer.start()
+        consumer.stop()
+        assert not consumer.thread.is_alive()
+
+
+class TestPushPipeline:
+
+    def test_event_notifies_once(self, monkeypatch, homework_module):
+        sent = []
+        runtime = make_runtime(homework_module, sent)
+        registry = TenantRegistry(TENANT)
+        homework_module.handle_event(runtime, registry, EVENT)
+        assert len(sent) == 1
+        state = runtime.states[TENANT.key]
+        assert state['timestamp'] == 100
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: check_utils.MockResponseGET(
+                data={'homeworks': [HOMEWORK], 'current_date': 600}
+            )
+        )
+        runtime.push = True
+        homework_module.poll_tenants(runtime, registry)
+        assert len(sent) == 1
+        assert state['timestamp'] == 600
+        assert state['next_poll'] >= (
+            state['last_success'] + homework_module.RECONCILE_PERIOD
+        )
+
+    def test_unknown_tenant_ignored(self, homework_module):
+        sent = []
+        runtime = make_runtime(homework_module, sent)
+        homework_module.handle_event(
+            runtime, TenantRegistry(TENANT), {**EVENT, 'tenant': 'other'}
+        )
+        assert sent == []
@@ -0,0 +1,67 @@
+import pytest
+
+from benchmarks import make_records
+from recording import Recorder, read_records
+from replay import replay
+
+
+def fake_fetch(headers, timestamp):
+    if timestamp == 2:
+        raise ConnectionError(
+            "reset, headers={'Authorization': 'OAuth secret'}"
+        )
+    return {
+        'homeworks': [{
+            'homework_name': 'hw.zip',
+            'status': 'approved',
+            'date_updated': f'2024-01-0{timestamp}T10:00:00Z',
+            'reviewer_comment': 'Личный комментарий',
+        }],
+        'current_date': timestamp + 1,
+    }
+
+
+class TestRecordReplay:
+
+    def test_records_are_sanitized(self, tmp_path):
+        path = str(tmp_path / 'record.jsonl.gz')
+        recorder = Recorder()
+        recorder.configure(path)
+        fetch = recorder.wrap(fake_fetch)
+        fetch({}, 1)
+        with pytest.raises(ConnectionError):
+            fetch({}, 2)
+        recorder.close()
+        first, second = read_records(path)
+        assert first['f'] == 1
+        assert first['r']['homeworks'][0]['reviewer_comment'] == '*' * 18
+        assert second['e'][0] == 'ConnectionError'
+        assert 'secret' not in second['e'][1]
+        assert second['t'] >= first['t']
+
+    def test_replay_through_pipeline(self, tmp_path):
+        path = str(tmp_path / 'record.jsonl.gz')
+        recorder = Recorder()
+        recorder.configure(path)
+        fetch = recorder.wrap(fake_fetch)
+        for timestamp in (1, 2, 3):
+            try:
+                fetch({}, timestamp)
+            except ConnectionError:
+                pass
+        recorder.close()
+        sent = []
+        stats = replay(
+            read_records(path),
+            sender=lambda bot, tenant, text: sent.append(text) or True
+        )
+        assert stats['responses'] == 2
+        assert stats['errors'] == 1
+        assert stats['messages'] == len(sent) == 3
+        assert 'Личный' not in ''.join(sent)
+
+    def test_accelerated_replay_waits(self):
+        records = make_records(3, error_share=0)
+        pauses = []
+        replay(records, speed=600, sleep=pauses.append)
+        assert pauses == [0, 1, 1]
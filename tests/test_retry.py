@@ -0,0 +1,171 @@
+import random
+
+import pytest
+import requests
+
+import homework
+from breaker import OPEN
+from retry import RetryBudget, RetryPolicy, Retrier
+from state import new_state
+from tenants import Tenant
+
+
+class FlakyCall:
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.__name__ = 'flaky'
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+def make_retrier(policies, budget=None):
+    sleeps = []
+    retrier = Retrier(
+        policies, lambda error: type(error).__name__, budget,
+        sleep=sleeps.append, rng=random.Random(1)
+    )
+    return retrier, sleeps
+
+
+class TestRetryPolicy:
+
+    def test_delays_within_bounds(self):
+        policy = RetryPolicy(attempts=10, base=1, cap=8)
+        delay = 0
+        for attempt in range(10):
+            delay = policy.delay(attempt, delay, random.Random(attempt))
+            assert 1 <= delay <= 8
+
+    def test_immediate_first_retry(self):
+        policy = RetryPolicy(attempts=2, base=1, cap=8, immediate=True)
+        assert policy.delay(0, 0) == 0
+        assert policy.delay(1, 0) == 1
+
+
+class TestRetrier:
+
+    def test_recovers_after_reset(self):
+        retrier, sleeps = make_retrier(
+            {'ConnectionError': RetryPolicy(3, 1, 10, immediate=True)}
+        )
+        call = FlakyCall([ConnectionError('reset')])
+        assert retrier.call(call) == 'ok'
+        assert call.calls == 2
+        assert sleeps == [0.0]
+
+    def test_not_retried_without_policy(self):
+        retrier, sleeps = make_retrier({})
+        call = FlakyCall([ValueError('401')])
+        with pytest.raises(ValueError):
+            retrier.call(call)
+        assert call.calls == 1
+        assert sleeps == []
+
+    def test_attempts_limited(self):
+        retrier, sleeps = make_retrier(
+            {'ConnectionError': RetryPolicy(2, 1, 10)}
+        )
+        call = FlakyCall([ConnectionError()] * 5)
+        with pytest.raises(ConnectionError):
+            retrier.call(call)
+        assert call.calls == 3
+
+    def test_budget_shared(self):
+        budget = RetryBudget(ratio=0, limit=1)
+        retrier, _ = make_retrier(
+            {'ConnectionError': RetryPolicy(5, 0, 0)}, budget
+        )
+        call = FlakyCall([ConnectionError()] * 5)
+        with pytest.raises(ConnectionError):
+            retrier.call(call)
+        assert call.calls == 2
+        assert retrier.denied == 1
+
+
+class TestDeferredRetries:
+
+    def make_runtime(self, sent):
+        tenant = Tenant('token', 'bot', '1')
+        runtime = homework.Runtime(
+            None, {tenant.key: new_state(0)},
+            lambda bot, tenant, text: sent.append(text) or True
+        )
+        runtime.bots['bot'] = None
+        runtime.clock.sleep = lambda delay: pytest.fail('sleep in cycle')
+        return runtime, tenant
+
+    def test_server_error_retried_in_later_cycle(self, monkeypatch):
+        response = requests.Response()
+        response.status_code = 503
+        monkeypatch.setattr(requests, 'get', lambda *args, **kw: response)
+        sent = []
+        runtime, tenant = self.make_runtime(sent)
+        state = runtime.states[tenant.key]
+        attempts = homework.RETRY_POLICIES['server'].attempts
+        for attempt in range(attempts):
+            homework.poll_tenants(runtime, [tenant])
+            assert state['retry'][0] == attempt + 1
+            assert state['next_poll'] > runtime.clock.time()
+            state['next_poll'] = None
+        assert sent == []
+        homework.poll_tenants(runtime, [tenant])
+        assert 'retry' not in state
+        assert state['errors'] == 1
+        assert len(sent) == 1
+
+    def test_breaker_counts_server_errors(self, monkeypatch):
+        response = requests.Response()
+        response.status_code = 503
+        calls = []
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kw: calls.append(1) or response
+        )
+        runtime, tenant = self.make_runtime([])
+        for _ in range(10):
+            runtime.states[tenant.key]['next_poll'] = None
+            homework.poll_tenants(runtime, [tenant])
+        assert runtime.breaker.state == OPEN
+        assert len(calls) == 5
+
+    def test_client_error_not_counted_by_breaker(self, monkeypatch):
+        response = requests.Response()
+        response.status_code = 401
+        monkeypatch.setattr(requests, 'get', lambda *args, **kw: response)
+        runtime, tenant = self.make_runtime([])
+        for _ in range(10):
+            homework.poll_tenants(runtime, [tenant])
+        assert runtime.breaker.failures == 0
+
+
+class TestClassifyError:
+
+    @pytest.mark.parametrize('raised, expected', [
+        (requests.ConnectionError('reset'), 'reset'),
+        (requests.Timeout('slow'), 'timeout'),
+    ])
+    def test_request_errors(self, monkeypatch, raised, expected):
+        def get(*args, **kwargs):
+            raise raised
+
+        monkeypatch.setattr(requests, 'get', get)
+        with pytest.raises(ConnectionError) as error:
+            homework.request_statuses({}, 0)
+        assert homework.classify_error(error.value) == expected
+
+    @pytest.mark.parametrize('status_code, expected', [
+        (503, 'server'), (401, None),
+    ])
+    def test_status_codes(self, monkeypatch, status_code, expected):
+        response = requests.Response()
+        response.status_code = status_code
+        monkeypatch.setattr(requests, 'get', lambda *args, **kw: response)
+        with pytest.raises(ValueError) as error:
+            homework.request_statuses({}, 0)
+        assert homework.classify_error(error.value) == expected
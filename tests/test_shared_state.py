@@ -0,0 +1,115 @@
+import multiprocessing
+
+import pytest
+
+from shared_state import RECORD, VERSION, TenantTable, publish
+from state import new_state
+from tenants import shard_of
+
+
+@pytest.fixture
+def table():
+    table = TenantTable(8)
+    yield table
+    table.close()
+    table.unlink()
+
+
+def write_from_child(name):
+    table = TenantTable(name=name)
+    table.write('child', 42, 'approved', 100.5, 0)
+    table.close()
+
+
+class TestTenantTable:
+
+    def test_record_is_compact(self):
+        assert RECORD.size == 40
+
+    def test_write_and_read(self, table):
+        assert table.read('a') is None
+        table.write('a', 10, 'reviewing', 5.0, 2)
+        table.write('a', 11, 'unknown', 6.0, 0)
+        record = table.read('a')
+        assert (record.cursor, record.status, record.next_due) == (
+            11, 255, 6.0
+        )
+        assert len(list(table)) == 1
+
+    def test_visible_across_processes(self, table):
+        process = multiprocessing.Process(
+            target=write_from_child, args=(table.name,)
+        )
+        process.start()
+        process.join(1)
+        reader = TenantTable(name=table.name)
+        record = reader.read('child')
+        reader.close()
+        assert (record.cursor, record.status, record.errors) == (
+            42, 'approved', 0
+        )
+
+    def test_full_table(self, table):
+        for index in range(8):
+            table.write(str(index), index, None, 0, 0)
+        with pytest.raises(MemoryError):
+            table.write('extra', 0, None, 0, 0)
+        assert table.read('extra') is None
+
+    def test_removed_record_is_reused(self, table):
+        for index in range(8):
+            table.write(str(index), index, None, 0, 0)
+        table.remove('3')
+        assert table.read('3') is None
+        assert len(list(table)) == 7
+        table.write('extra', 1, None, 0, 0)
+        assert table.read('extra').cursor == 1
+        assert all(table.read(str(index)) for index in range(8) if index != 3)
+
+    def test_shards_write_own_regions(self):
+        table = TenantTable(8, shards=2)
+        try:
+            keys = [str(index) for index in range(20)]
+            own = [key for key in keys if shard_of(key, 2) == 1][:4]
+            for key in own:
+                table.write(key, 1, None, 0, 0)
+            slots = {table.find(key) for key in own}
+            assert slots == set(table.region(1))
+            other = next(key for key in keys if shard_of(key, 2) == 0)
+            table.write(other, 2, None, 0, 0)
+            extra = [key for key in keys if shard_of(key, 2) == 1][4]
+            with pytest.raises(MemoryError):
+                table.write(extra, 0, None, 0, 0)
+        finally:
+            table.close()
+            table.unlink()
+
+    def test_torn_record_is_skipped_and_repaired(self, table):
+        table.write('a', 1, None, 0, 0)
+        offset = table.offset(table.find('a'))
+        version = VERSION.unpack_from(table.buffer, offset)[0]
+        VERSION.pack_into(table.buffer, offset, version + 1)
+        assert table.read_slot(table.find('a'), retries=3) is None
+        table.write('a', 2, None, 0, 0)
+        assert table.read('a').cursor == 2
+
+    def test_publish_states(self, table):
+        state = new_state(7)
+        state.update(status='rejected', errors=3)
+        publish(table, {'key': state})
+        record = table.read('key')
+        assert (record.cursor, record.status, record.errors) == (
+            7, 'rejected', 3
+        )
+
+    def test_publish_frees_removed_tenants(self, table):
+        publish(table, {str(index): new_state(index) for index in range(8)})
+        publish(table, {'0': new_state(0), 'new': new_state(5)})
+        assert len(list(table)) == 2
+        assert table.read('1') is None
+        assert table.read('new').cursor == 5
+
+    def test_publish_overflow_is_logged(self, table, caplog):
+        publish(table, {str(index): new_state(index) for index in range(12)})
+        assert len(list(table)) == 8
+        assert 'Не записано' in caplog.text
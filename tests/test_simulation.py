@@ -0,0 +1,27 @@
+from clock import SimulatedClock
+from simulation import simulate
+
+
+class TestSimulatedClock:
+
+    def test_sleep_advances_time(self):
+        clock = SimulatedClock(100)
+        clock.sleep(600)
+        assert clock.time() == clock.monotonic() == 700
+        assert clock.slept == 600
+
+
+class TestSimulation:
+
+    def test_days_of_polling(self, homework_module):
+        stats = simulate(tenants=20, days=3, seed=1)
+        assert stats['cycles'] == 3 * 144
+        assert stats['calls'] == 20 * stats['cycles']
+        assert 0 < stats['messages'] <= stats['changes']
+        assert stats['latency_max'] <= homework_module.RETRY_PERIOD
+
+    def test_deterministic(self):
+        first = simulate(tenants=5, days=1, seed=7)
+        second = simulate(tenants=5, days=1, seed=7)
+        del first['elapsed'], second['elapsed']
+        assert first == second
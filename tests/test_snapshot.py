@@ -0,0 +1,168 @@
+import os
+import pickle
+import zlib
+
+from dispatch import ERRORS, LANE_NAMES, VERDICTS, Batch
+from snapshot import RECORD_HEADER, SnapshotLog
+from state import new_state
+from tenants import Tenant, TenantRegistry
+
+TENANT = Tenant('token', 'bot', '1')
+
+
+class Payload:
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return open, (self.marker, 'w')
+
+
+def make_snapshot(count):
+    return {'states': {
+        str(index): {'timestamp': index, 'notified': {'1': 'approved@'}}
+        for index in range(count)
+    }}
+
+
+class TestSnapshotLog:
+
+    def test_first_save_is_checkpoint_then_log(self, tmp_path):
+        path = str(tmp_path / 'snapshot')
+        log = SnapshotLog(path)
+        snapshot = make_snapshot(1000)
+        log.save(snapshot)
+        assert os.path.getsize(f'{path}.log') == 0
+        snapshot['states']['5']['timestamp'] = 500
+        del snapshot['states']['6']
+        log.save(snapshot)
+        assert 0 < os.path.getsize(f'{path}.log') < 200
+        assert SnapshotLog(path).load() == snapshot
+
+    def test_unchanged_snapshot_is_not_logged(self, tmp_path):
+        path = str(tmp_path / 'snapshot')
+        log = SnapshotLog(path)
+        log.save(make_snapshot(3))
+        log.save(make_snapshot(3))
+        assert os.path.getsize(f'{path}.log') == 0
+
+    def test_checkpoint_every(self, tmp_path):
+        path = str(tmp_path / 'snapshot')
+        log = SnapshotLog(path, checkpoint_every=2)
+        snapshot = make_snapshot(3)
+        for timestamp in range(4):
+            snapshot['states']['0']['timestamp'] = timestamp
+            log.save(snapshot)
+        assert os.path.getsize(f'{path}.log') == 0
+        assert SnapshotLog(path).load() == snapshot
+
+    def test_torn_tail_is_dropped(self, tmp_path):
+        path = str(tmp_path / 'snapshot')
+        log = SnapshotLog(path)
+        snapshot = make_snapshot(3)
+        log.save(snapshot)
+        snapshot['states']['0']['timestamp'] = 7
+        log.save(snapshot)
+        size = os.path.getsize(f'{path}.log')
+        with open(f'{path}.log', 'ab') as file:
+            file.write(b'\x00\x00\x01\x00garbage')
+        restored = SnapshotLog(path)
+        assert restored.load() == snapshot
+        assert os.path.getsize(f'{path}.log') == size
+        snapshot['states']['1']['timestamp'] = 8
+        restored.save(snapshot)
+        assert SnapshotLog(path).load() == snapshot
+
+    def test_stale_log_after_checkpoint_is_ignored(self, tmp_path):
+        path = str(tmp_path / 'snapshot')
+        log = SnapshotLog(path)
+        snapshot = make_snapshot(1)
+        log.save(snapshot)
+        snapshot['states']['0']['timestamp'] = 1
+        log.save(snapshot)
+        with open(f'{path}.log', 'rb') as file:
+            stale = file.read()
+        snapshot['states']['0']['timestamp'] = 2
+        log.records = log.checkpoint_every
+        log.save(snapshot)
+        with open(f'{path}.log', 'wb') as file:
+            file.write(stale)
+        assert SnapshotLog(path).load()['states']['0']['timestamp'] == 2
+
+    def test_missing_or_broken_snapshot(self, tmp_path):
+        path = tmp_path / 'snapshot'
+        assert SnapshotLog(str(path)).load() is None
+        path.write_bytes(b'not a snapshot')
+        assert SnapshotLog(str(path)).load() is None
+
+    def test_pickled_data_not_executed(self, tmp_path):
+        path = tmp_path / 'snapshot'
+        marker = tmp_path / 'executed'
+        body = pickle.dumps(Payload(str(marker)))
+        path.write_bytes(zlib.compress(body))
+        assert SnapshotLog(str(path)).load(repair=False) is None
+        path.unlink()
+        (tmp_path / 'snapshot.log').write_bytes(
+            RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+        )
+        assert SnapshotLog(str(path)).load(repair=False) is None
+        assert not marker.exists()
+
+
+class TestFailover:
+
+    def test_standby_resumes_without_repolling(
+            self, tmp_path, monkeypatch, homework_module
+    ):
+        monkeypatch.setattr(
+            homework_module, 'SNAPSHOT_FILE', str(tmp_path / 'snapshot')
+        )
+        registry = TenantRegistry(TENANT)
+        primary = homework_module.Runtime(None, {TENANT.key: new_state(100)})
+        primary.bots['bot'] = None
+        state = primary.states[TENANT.key]
+        state.update(timestamp=500, next_poll=10 ** 10, notified={'1': 'a@'})
+        homework_module.report_error(
+            primary, None, TENANT, ValueError('boom')
+        )
+        primary.dispatcher.submit(
+            VERDICTS, None, TENANT, 'status', Batch(1, lambda: None)
+        )
+        snapshots = homework_module.open_snapshots(primary, registry)
+        homework_module.save_snapshot(snapshots, primary)
+
+        calls, sent = [], []
+        standby = homework_module.Runtime(
+            None, {TENANT.key: new_state(0)},
+            lambda bot, tenant, text: sent.append(text) or True
+        )
+        standby.bots['bot'] = None
+        standby.fetch = lambda *args: calls.append(args)
+        homework_module.open_snapshots(standby, registry)
+        assert standby.states == primary.states
+        assert standby.dispatcher.depths()[LANE_NAMES[ERRORS]] == 1
+        assert standby.tenant_errors(TENANT).entries.items() == (
+            primary.tenant_errors(TENANT).entries.items()
+        )
+        homework_module.poll_tenants(standby, registry)
+        assert calls == []
+        assert sent == [homework_module.PROGRAM_FAILURE.format('boom')]
+
+    def test_reshard_keeps_moved_tenants(
+            self, tmp_path, monkeypatch, homework_module
+    ):
+        path = str(tmp_path / 'snapshot')
+        monkeypatch.setattr(homework_module, 'SNAPSHOT_FILE', path)
+        SnapshotLog(f'{path}.5').save(
+            {'states': {TENANT.key: {'timestamp': 500, 'notified': {}}}}
+        )
+        with open(f'{path}.5.log', 'ab') as file:
+            file.write(b'torn')
+        monkeypatch.setattr(homework_module, 'SHARD', (0, 1))
+        runtime = homework_module.Runtime(None, {TENANT.key: new_state(900)})
+        snapshots = homework_module.open_snapshots(
+            runtime, TenantRegistry(TENANT), {TENANT.key: new_state(100)}
+        )
+        assert snapshots.path == f'{path}.0'
+        assert runtime.states[TENANT.key]['timestamp'] == 500
+        assert os.path.getsize(f'{path}.5.log') == 4
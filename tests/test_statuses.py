@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from dispatch import ERRORS, REVIEWING, VERDICTS, Dispatcher
+from statuses import ESCALATE, SILENT, StatusRegistry
+from tenants import Tenant
+
+VERDICTS_TEXT = {
+    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+    'reviewing': 'Работа взята на проверку ревьюером.',
+}
+TEMPLATE = 'Изменился статус проверки работы "{}". {}'
+UNKNOWN = 'Неожиданный статус домашней работы: "{}"'
+
+
+@pytest.fixture
+def registry():
+    return StatusRegistry(VERDICTS_TEXT, TEMPLATE, UNKNOWN)
+
+
+class TestStatusRegistry:
+
+    def test_render_matches_template(self, registry):
+        for name, verdict in VERDICTS_TEXT.items():
+            assert registry.get(name).render('hw {}') == (
+                TEMPLATE.format('hw {}', verdict)
+            )
+        assert registry.get('approved').lane == VERDICTS
+        assert registry.get('reviewing').lane == REVIEWING
+
+    def test_unknown_status_escalated_without_raising(self, registry):
+        status = registry.get('on_hold')
+        assert not status.known
+        assert status.policy == ESCALATE
+        assert status.lane == ERRORS
+        assert UNKNOWN.format('on_hold') in status.render('hw')
+
+    def test_load_from_config(self, registry, tmp_path):
+        path = tmp_path / 'statuses.json'
+        path.write_text(json.dumps({
+            'reviewing': {'policy': 'silent', 'poll_interval': 60},
+            'on_hold': {'verdict': 'Работа отложена.', 'lane': 'reviewing'},
+        }), encoding='utf-8')
+        registry.load(str(path))
+        reviewing = registry.get('reviewing')
+        assert reviewing.policy == SILENT
+        assert reviewing.poll_interval == 60
+        assert reviewing.verdict == VERDICTS_TEXT['reviewing']
+        assert registry.get('on_hold').render('hw').endswith(
+            'Работа отложена.'
+        )
+
+    def test_invalid_config(self, registry):
+        with pytest.raises(ValueError):
+            registry.update({'approved': {'policy': 'shout'}})
+        with pytest.raises(ValueError):
+            registry.update({'approved': {'lane': 'express'}})
+
+    @pytest.mark.parametrize('options', [
+        {'poll_interval': '60'}, {'poll_interval': 0},
+        {'poll_interval': True}, {'verdict': 1}, {'verdict': None},
+        {'lane': 7}, {'lane': ['reviewing']}, {'colour': 'red'}, 'silent',
+    ])
+    def test_wrong_types_rejected_on_load(self, registry, options):
+        before = dict(registry.statuses)
+        with pytest.raises(ValueError, match='approved'):
+            registry.update({
+                'reviewing': {'policy': 'silent'}, 'approved': options
+            })
+        assert registry.statuses == before
+
+
+class TestEnqueueHomeworks:
+
+    def test_policies_applied_in_hot_path(self, homework_module):
+        dispatcher = Dispatcher(lambda *args: True)
+        delivered = []
+        homework_module.enqueue_homeworks(
+            dispatcher, None, Tenant('token', 'bot', '1'), [
+                {'homework_name': 'a', 'status': 'approved'},
+                {'homework_name': 'b', 'status': 'on_hold'},
+            ],
+            lambda: delivered.append(True)
+        )
+        assert dispatcher.depths() == {
+            'verdicts': 1, 'reviewing': 0, 'errors': 1
+        }
+        dispatcher.drain()
+        assert delivered
@@ -0,0 +1,242 @@
+import multiprocessing
+import queue
+import signal
+import sys
+import time
+
+import supervisor
+from botapi import TelegramClient
+from ingest import LocalBroker
+from state import new_state
+from supervisor import (
+    Child, EventRouter, Heartbeat, QueueSender, Supervisor
+)
+from tenants import Tenant, TenantRegistry, shard_of
+
+
+def exit_with_error():
+    sys.exit(3)
+
+
+def hang():
+    while True:
+        time.sleep(0.01)
+
+
+def wait_for_reload(events):
+    signal.signal(signal.SIGHUP, lambda signum, frame: events.put(signum))
+    events.put('ready')
+    while True:
+        time.sleep(0.01)
+
+
+class TestSharding:
+
+    def test_each_tenant_in_exactly_one_shard(self):
+        tenants = [Tenant(f'token{i}', 'bot', str(i)) for i in range(50)]
+        shards = [[] for _ in range(3)]
+        for tenant in tenants:
+            shards[shard_of(tenant.key, 3)].append(tenant)
+        assert sum(len(shard) for shard in shards) == 50
+        assert all(shards)
+
+    def test_registry_keeps_own_shard(self):
+        default = Tenant('sometoken', '1234:abcdefg', '12345')
+        index = shard_of(default.key, 2)
+        assert list(TenantRegistry(default, shard=(index, 2))) == [default]
+        assert list(TenantRegistry(default, shard=(1 - index, 2))) == []
+
+
+class TestQueueSender:
+
+    def test_stale_replies_skipped(self):
+        requests, replies = queue.Queue(), queue.Queue()
+        sender = QueueSender(0, requests, replies, timeout=0.05, nonce=7)
+        tenant = Tenant('token', 'bot', '1')
+        assert sender(None, tenant, 'first') is False
+        replies.put(((7, 0), True))
+        replies.put(((7, 1), True))
+        assert sender(None, tenant, 'second') is True
+        assert requests.get_nowait() == (0, (7, 0), 'bot', '1', 'first')
+
+    def test_replies_to_previous_process_skipped(self):
+        requests, replies = queue.Queue(), queue.Queue()
+        replies.put(((1, 0), False))
+        replies.put(((2, 0), True))
+        sender = QueueSender(0, requests, replies, timeout=0.05, nonce=2)
+        assert sender(None, Tenant('token', 'bot', '1'), 'text') is True
+
+
+class TestEventRouter:
+
+    def test_event_routed_to_owning_poller(self):
+        queues = [queue.Queue() for _ in range(3)]
+        route = EventRouter(queues)
+        tenants = [Tenant(f'token{i}', 'bot', str(i)) for i in range(20)]
+        for tenant in tenants:
+            route({'tenant': tenant.key})
+        routed = 0
+        for index, events in enumerate(queues):
+            assert events.qsize()
+            while not events.empty():
+                assert shard_of(events.get_nowait()['tenant'], 3) == index
+                routed += 1
+        assert routed == len(tenants)
+
+    def test_full_queue_logged(self, caplog):
+        route = EventRouter([queue.Queue(1)], timeout=0.01)
+        route({'tenant': 'a'})
+        route({'tenant': 'b'})
+        assert 'отброшено' in caplog.text
+
+    def test_supervisor_routes_broker_events(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'broker.db')
+        monkeypatch.setattr(supervisor.homework, 'BROKER_FILE', path)
+        tenant = Tenant('token', 'bot', '1')
+        sup = Supervisor(pollers=2)
+        broker = LocalBroker(path)
+        broker.publish({'tenant': tenant.key, 'homeworks': []})
+        broker.close()
+        sources = sup.start_ingestion()
+        try:
+            event = sup.events[shard_of(tenant.key, 2)].get(timeout=1)
+        finally:
+            for source in sources:
+                source.stop()
+            sup.table.close()
+            sup.table.unlink()
+        assert event == {'tenant': tenant.key, 'homeworks': []}
+        assert sup.pollers[0].args[-1] is sup.events[0]
+
+
+class TestHeartbeat:
+
+    def test_progress_throttled(self):
+        health = queue.Queue()
+        heartbeat = Heartbeat('poller-0', health, period=60)
+        runtime = type('Runtime', (), {'states': {'a': {}}})
+        heartbeat.progress(runtime)
+        assert health.empty()
+        heartbeat.sent -= 60
+        heartbeat.progress(runtime)
+        heartbeat.progress(runtime)
+        name, _, tenants = health.get_nowait()
+        assert (name, tenants) == ('poller-0', 1)
+        assert health.empty()
+
+    def test_sent_during_poll_cycle(self, monkeypatch, homework_module):
+        health = queue.Queue()
+        heartbeat = Heartbeat('poller-0', health, period=0)
+        monkeypatch.setattr(
+            homework_module, 'PROGRESS_HOOKS', [heartbeat.progress]
+        )
+        tenants = [Tenant(f'token{i}', 'bot', str(i)) for i in range(3)]
+        runtime = homework_module.Runtime(
+            None, {tenant.key: new_state(0) for tenant in tenants},
+            lambda *args: True
+        )
+        runtime.bots['bot'] = None
+        runtime.fetch = lambda *args: {'homeworks': [], 'current_date': 1}
+        homework_module.poll_tenants(runtime, tenants)
+        assert health.qsize() == 3
+
+
+class TestNotifier:
+
+    def test_bots_bounded_and_closed(self, monkeypatch):
+        monkeypatch.setattr(supervisor.signal, 'signal', lambda *args: None)
+        monkeypatch.setattr(supervisor.homework, 'BOT_CACHE_SIZE', 2)
+        monkeypatch.setattr(supervisor.homework, 'TELEGRAM_CLIENT', 'pooled')
+        closed, sent = [], []
+        monkeypatch.setattr(
+            TelegramClient, 'close', lambda client: closed.append(client)
+        )
+        monkeypatch.setattr(
+            supervisor.homework, 'send_chat_message',
+            lambda bot, chat_id, text: sent.append(bot) or True
+        )
+        requests, replies = queue.Queue(), [queue.Queue()]
+        for number, token in enumerate(['1:a', '2:b', '1:a', '3:c', None]):
+            requests.put(token and (0, number, token, '1', 'text'))
+        supervisor.notifier_main(requests, replies, queue.Queue())
+        assert sent[0] is sent[2]
+        assert closed == [sent[1]]
+        assert replies[0].qsize() == 4
+
+
+class TestChild:
+
+    def test_backoff_grows_and_resets(self, monkeypatch):
+        monkeypatch.setattr(supervisor, 'RESTART_BACKOFF_MAX', 4)
+        child = Child('poller-0', exit_with_error, ())
+        backoffs = []
+        for _ in range(4):
+            child.process = multiprocessing.Process()
+            child.schedule_restart(now=0)
+            backoffs.append(child.backoff)
+        assert backoffs == [1, 2, 4, 4]
+        child.process = multiprocessing.Process()
+        child.started = 0
+        child.schedule_restart(now=supervisor.STABLE_PERIOD)
+        assert child.backoff == 1
+        assert child.restarts == 5
+
+    def test_crashed_child_restarted(self):
+        sup = Supervisor(pollers=1)
+        child = Child('poller-0', exit_with_error, ())
+        sup.pollers = [child]
+        sup.notifier = Child('notifier', exit_with_error, ())
+        sup.check_children(now=0)
+        child.process.join(1)
+        assert child.process.exitcode == 3
+        sup.check_children(now=0.5)
+        assert child.process is None
+        assert child.next_start == 1.5
+        sup.check_children(now=1.5)
+        assert child.process is not None
+        assert sup.health_report()['poller-0']['restarts'] == 1
+        for each in sup.children:
+            each.process.join(1)
+        sup.table.close()
+        sup.table.unlink()
+
+    def test_stuck_poller_restarted(self, monkeypatch):
+        monkeypatch.setattr(supervisor.homework, 'LIVENESS_TIMEOUT', 1)
+        sup = Supervisor(pollers=1)
+        child = Child('poller-0', hang, ())
+        sup.pollers = [child]
+        sup.notifier = Child('notifier', hang, ())
+        try:
+            sup.check_children(now=0)
+            process = child.process
+            sup.seen['poller-0'] = 1.5
+            sup.check_children(now=2)
+            assert child.process is process and process.is_alive()
+            sup.check_children(now=3)
+            assert not process.is_alive()
+            assert child.process is None and child.next_start == 4
+            sup.check_children(now=4)
+            assert child.alive and child.restarts == 1
+            assert sup.notifier.process.is_alive()
+        finally:
+            for each in sup.children:
+                each.process.kill()
+                each.process.join(1)
+            sup.table.close()
+            sup.table.unlink()
+
+    def test_reload_forwarded_to_pollers(self):
+        sup = Supervisor(pollers=1)
+        events = multiprocessing.Queue()
+        child = Child('poller-0', wait_for_reload, (events,))
+        sup.pollers = [child]
+        try:
+            child.start(sup.context, now=0)
+            assert events.get(timeout=1) == 'ready'
+            sup.forward_reload()
+            assert events.get(timeout=1) == signal.SIGHUP
+        finally:
+            child.process.kill()
+            child.process.join(1)
+            sup.table.close()
+            sup.table.unlink()
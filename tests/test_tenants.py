@@ -0,0 +1,112 @@
+import json
+import os
+import signal
+
+import pytest
+
+from lifecycle import Lifecycle, ShutdownRequested
+from state import StateStore, new_state, sync_states
+from tenants import Tenant, TenantRegistry
+
+DEFAULT = Tenant('sometoken', '1234:abcdefg', '12345')
+
+
+def write_tenants(path, records):
+    path.write_text(json.dumps(records), encoding='utf-8')
+
+
+class TestTenants:
+
+    def test_registry_reload_keeps_default(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        write_tenants(path, [
+            {'practicum_token': 'a', 'telegram_token': 'b', 'chat_id': 1},
+            {'practicum_token': 'a', 'telegram_token': 'b', 'chat_id': 1},
+        ])
+        registry = TenantRegistry(DEFAULT, str(path))
+        assert list(registry) == [DEFAULT, Tenant('a', 'b', '1')]
+
+        write_tenants(path, [])
+        os.utime(path, (0, 0))
+        assert registry.changed_on_disk()
+        assert registry.reload()
+        assert list(registry) == [DEFAULT]
+
+    def test_registry_keeps_tenants_on_broken_file(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        write_tenants(path, [
+            {'practicum_token': 'a', 'telegram_token': 'b', 'chat_id': 1}
+        ])
+        registry = TenantRegistry(DEFAULT, str(path))
+        path.write_text('[{"chat_id": 1}]', encoding='utf-8')
+        assert not registry.reload()
+        assert len(registry) == 2
+
+    @pytest.mark.parametrize('payload', [
+        {'practicum_token': 'a'}, [None], ['tenant'], 'tenants',
+    ])
+    def test_registry_rejects_wrong_shape(self, tmp_path, payload):
+        path = tmp_path / 'tenants.json'
+        write_tenants(path, [
+            {'practicum_token': 'a', 'telegram_token': 'b', 'chat_id': 1}
+        ])
+        registry = TenantRegistry(DEFAULT, str(path))
+        write_tenants(path, payload)
+        os.utime(path, (0, 0))
+        assert registry.changed_on_disk()
+        assert not registry.reload()
+        assert len(registry) == 2
+        assert not registry.changed_on_disk()
+
+    def test_sync_states_keeps_known_tenants(self):
+        other = Tenant('a', 'b', '1')
+        states = {DEFAULT.key: new_state(100), 'removed': new_state(1)}
+        synced = sync_states(states, [DEFAULT, other], 500)
+        assert synced == {
+            DEFAULT.key: new_state(100), other.key: new_state(500)
+        }
+
+    def test_tenant_key_hides_token(self):
+        assert DEFAULT.practicum_token not in DEFAULT.key
+
+    def test_state_store_roundtrip(self, tmp_path):
+        store = StateStore(str(tmp_path / 'state.json'))
+        assert store.load() == {}
+        store.save({'key': new_state(42)})
+        assert store.load() == {'key': new_state(42)}
+
+    def test_sharded_store_reads_every_shard(self, tmp_path):
+        path = str(tmp_path / 'state.json')
+        StateStore(path, (0, 4)).save({'a': new_state(10), 'b': new_state(7)})
+        StateStore(path, (3, 4)).save({'b': new_state(20)})
+        StateStore(path).save({'c': new_state(1)})
+        store = StateStore(path, (1, 2))
+        assert store.path == f'{path}.1'
+        assert store.load() == {
+            'a': new_state(10), 'b': new_state(20), 'c': new_state(1)
+        }
+
+
+class TestLifecycle:
+
+    def test_stop_signal_interrupts_only_idle_wait(self):
+        lifecycle = Lifecycle()
+        lifecycle.install()
+        try:
+            with lifecycle.cycle():
+                os.kill(os.getpid(), signal.SIGTERM)
+            assert lifecycle.stopping
+            with pytest.raises(ShutdownRequested):
+                os.kill(os.getpid(), signal.SIGTERM)
+        finally:
+            lifecycle.restore()
+
+    def test_reload_signal_sets_flag(self):
+        lifecycle = Lifecycle()
+        lifecycle.install()
+        try:
+            os.kill(os.getpid(), signal.SIGHUP)
+        finally:
+            lifecycle.restore()
+        assert lifecycle.take_reload()
+        assert not lifecycle.take_reload()
@@ -0,0 +1,44 @@
+import json
+import pstats
+
+import pytest
+
+from tracing import Profiler, Tracer
+
+
+class TestTracing:
+
+    def test_nested_spans_exported_as_otlp_json(self, tmp_path):
+        path = tmp_path / 'spans.jsonl'
+        tracer = Tracer()
+        tracer.configure(str(path))
+        with tracer.span('cycle'):
+            with pytest.raises(ValueError):
+                with tracer.span('parse_status', homework='hw'):
+                    raise ValueError('bad status')
+        child, parent = [
+            json.loads(line) for line in path.read_text().splitlines()
+        ]
+        assert child['parentSpanId'] == parent['spanId']
+        assert child['traceId'] == parent['traceId']
+        assert child['status']['code'] == 'STATUS_CODE_ERROR'
+        assert child['endTimeUnixNano'] >= child['startTimeUnixNano']
+        assert {'key': 'homework', 'value': {'stringValue': 'hw'}} in (
+            child['attributes']
+        )
+
+    def test_disabled_tracer_is_noop(self):
+        tracer = Tracer()
+        with tracer.span('cycle') as attributes:
+            attributes['ignored'] = True
+        assert not tracer.enabled
+
+    def test_profiler_dumps_after_n_cycles(self, tmp_path):
+        path = tmp_path / 'homework.prof'
+        profiler = Profiler(2, str(path))
+        for _ in range(2):
+            assert not profiler.done
+            with profiler.cycle():
+                sum(range(100))
+        assert profiler.done
+        assert pstats.Stats(str(path)).total_calls > 0
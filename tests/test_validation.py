@@ -0,0 +1,78 @@
+import time
+
+import requests
+
+import tests.check_utils as check_utils
+from benchmarks import make_homeworks
+from state import new_state
+from tenants import Tenant
+from validation import HOMEWORK_SCHEMA, BatchValidator
+
+
+class TestBatchValidator:
+
+    def test_collects_errors_per_item(self):
+        validator = BatchValidator()
+        good = {'homework_name': 'hw1', 'status': 'approved'}
+        result = validator.validate([
+            good,
+            {'status': 'approved'},
+            {'homework_name': 1, 'status': 'approved', 'id': 'x'},
+            ['not', 'a', 'dict'],
+        ])
+        assert result.valid == [good]
+        assert [record.index for record in result.rejected] == [1, 2, 3]
+        assert len(result.rejected[1].errors) == 2
+        assert list(validator.quarantine) == result.rejected
+
+    def test_choices(self):
+        validator = BatchValidator({
+            **HOMEWORK_SCHEMA,
+            'status': {'type': str, 'choices': ('approved',)}
+        })
+        result = validator.validate([{'homework_name': 'a', 'status': 'x'}])
+        assert not result.valid
+
+    def test_quarantine_bounded(self):
+        validator = BatchValidator(quarantine_size=10)
+        validator.validate([None] * 100)
+        assert len(validator.quarantine) == 10
+
+    def test_large_payload_in_one_pass(self):
+        homeworks = make_homeworks(10000)
+        start = time.perf_counter()
+        result = BatchValidator().validate(homeworks)
+        assert time.perf_counter() - start < 0.5
+        assert len(result.valid) + len(result.rejected) == 10000
+
+
+class TestPollTenantValidation:
+
+    def test_bad_homework_does_not_block_good_ones(
+            self, monkeypatch, random_timestamp, homework_module
+    ):
+        data = {
+            'homeworks': [
+                {'homework_name': 'new.zip', 'status': 'approved'},
+                {'status': 'approved'},
+                {'homework_name': 'old.zip', 'status': 'reviewing'},
+            ],
+            'current_date': random_timestamp
+        }
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            check_utils.MockResponseGET(data=data)
+        ))
+        sent = []
+        monkeypatch.setattr(
+            homework_module, 'notify',
+            lambda bot, tenant, message: sent.append(message) or True
+        )
+        tenant = Tenant('token', 'bot', '1')
+        state = new_state(100)
+        runtime = homework_module.Runtime(None, {tenant.key: state})
+        runtime.bots['bot'] = None
+        homework_module.poll_tenants(runtime, [tenant])
+        assert '"new.zip"' in sent[0]
+        assert '"old.zip"' in sent[1]
+        assert sent[2].startswith('Сбой в работе программы')
+        assert state['timestamp'] == random_timestamp
@@ -0,0 +1,98 @@
+import pytest
+import requests
+
+import tests.check_utils as check_utils
+from caches import TTLCache
+from state import new_state
+from tenants import Tenant, TenantRegistry
+from vault import TokenVault, generate_key
+
+
+@pytest.fixture
+def vault(tmp_path):
+    vault = TokenVault(str(tmp_path / 'vault.db'), generate_key())
+    yield vault
+    vault.close()
+
+
+class TestTokenVault:
+
+    def test_tokens_encrypted_at_rest(self, vault, tmp_path):
+        vault.put_many([Tenant('practicum-secret', 'telegram-secret', '1')])
+        raw = (tmp_path / 'vault.db').read_bytes()
+        assert b'practicum-secret' not in raw
+        assert b'telegram-secret' not in raw
+
+    def test_listing_does_not_decrypt(self, vault, monkeypatch):
+        vault.put_many([Tenant(f'token{i}', 'bot', str(i)) for i in range(5)])
+        decrypted = []
+        decrypt = vault.fernet.decrypt
+        monkeypatch.setattr(
+            vault.fernet, 'decrypt',
+            lambda token: decrypted.append(token) or decrypt(token)
+        )
+        tenants = vault.tenants()
+        assert len(tenants) == 5
+        assert decrypted == []
+        assert tenants[0].headers == {'Authorization': 'OAuth token0'}
+        assert tenants[0].telegram_token == 'bot'
+        assert len(decrypted) == 1
+
+    def test_keys_match_plain_tenants(self, vault):
+        tenant = Tenant('token', 'bot', '1')
+        assert vault.put_many([tenant]) == [tenant.key]
+        vault.remove(tenant.key)
+        assert vault.tenants() == []
+        with pytest.raises(KeyError):
+            vault.credentials(tenant.key)
+
+    def test_registry_reads_vault(self, vault):
+        default = Tenant('sometoken', '1234:abcdefg', '12345')
+        vault.put_many([Tenant('token', 'bot', '1'), default])
+        registry = TenantRegistry(default, vault=vault)
+        assert [tenant.key for tenant in registry] == [
+            default.key, Tenant('token', 'bot', '1').key
+        ]
+
+    def test_undecryptable_tenant_does_not_stop_polling(
+            self, vault, tmp_path, monkeypatch, homework_module, caplog
+    ):
+        path = str(tmp_path / 'vault.db')
+        rotated = TokenVault(path, generate_key())
+        rotated.put_many([Tenant('stale', 'bot', '2')])
+        rotated.close()
+        vault.put_many([Tenant('token', 'bot', '1')])
+        calls = []
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: calls.append(kwargs['headers'])
+            or check_utils.MockResponseGET(data={
+                'homeworks': [], 'current_date': 1
+            })
+        )
+        tenants = vault.tenants()
+        runtime = homework_module.Runtime(
+            None, {tenant.key: new_state(0) for tenant in tenants}
+        )
+        runtime.bots['bot'] = check_utils.MockTelegramBot()
+        homework_module.poll_tenants(runtime, tenants)
+        assert calls == [{'Authorization': 'OAuth token'}]
+        stale = Tenant('stale', 'bot', '2').key
+        assert runtime.states[stale]['errors'] == 1
+        assert stale in caplog.text
+
+    def test_missing_master_key(self, tmp_path):
+        with pytest.raises(ValueError):
+            TokenVault(str(tmp_path / 'vault.db'), None)
+
+
+class TestTTLCache:
+
+    def test_entries_expire(self):
+        now = [0]
+        cache = TTLCache(10, ttl=5, timer=lambda: now[0])
+        cache.set('key', 'value')
+        assert cache.get('key') == 'value'
+        now[0] = 5
+        assert cache.get('key') is None
+        assert 'key' not in cache
@@ -0,0 +1,137 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+TRACE_STDOUT = ('-', 'stdout')
+
+TRACE_EXPORT_ERROR = 'Не удалось записать span: {}'
+PROFILE_SAVED = 'Профиль {} циклов сохранён в {}'
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """Замер длительности этапов с выгрузкой в формате OTLP/JSON.
+
+    Каждый span пишется отдельной JSON-строкой с полями OpenTelemetry:
+    traceId, spanId, parentSpanId, name, startTimeUnixNano,
+    endTimeUnixNano, attributes. Пока выгрузка не настроена,
+    span ничего не делает.
+    """
+
+    def __init__(self):
+        """Трассировщик с выключенной выгрузкой."""
+        self.stream = None
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Включена ли выгрузка span."""
+        return self.stream is not None
+
+    def configure(self, target):
+        """Включение выгрузки в stdout или в файл."""
+        if not target:
+            self.stream = None
+        elif target in TRACE_STDOUT:
+            self.stream = sys.stdout
+        else:
+            self.stream = open(target, 'a', encoding='utf-8')
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Замер участка кода; вложенные span связываются с родителем."""
+        if not self.enabled:
+            yield attributes
+            return
+        stack = self.local.__dict__.setdefault('stack', [])
+        parent = stack[-1] if stack else None
+        trace_id = parent['traceId'] if parent else os.urandom(16).hex()
+        record = {
+            'traceId': trace_id,
+            'spanId': os.urandom(8).hex(),
+            'parentSpanId': parent['spanId'] if parent else '',
+            'name': name,
+            'startTimeUnixNano': time.time_ns(),
+        }
+        stack.append(record)
+        status = 'STATUS_CODE_OK'
+        try:
+            yield attributes
+        except BaseException as error:
+            status = 'STATUS_CODE_ERROR'
+            attributes['exception.type'] = type(error).__name__
+            raise
+        finally:
+            stack.pop()
+            record['endTimeUnixNano'] = time.time_ns()
+            record['status'] = {'code': status}
+            record['attributes'] = [
+                {'key': key, 'value': {'stringValue': str(value)}}
+                for key, value in attributes.items()
+            ]
+            self.export(record)
+
+    def export(self, record):
+        """Запись завершённого span."""
+        try:
+            with self.lock:
+                self.stream.write(json.dumps(record) + '\n')
+                self.stream.flush()
+        except (OSError, ValueError) as error:
+            logger.error(TRACE_EXPORT_ERROR.format(error))
+
+
+tracer = Tracer()
+
+
+def traced(name):
+    """Декоратор: вызов функции оборачивается в span."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Profiler:
+    """Профилирование первых N циклов в файл формата cProfile/pstats."""
+
+    def __init__(self, cycles=0, path='homework.prof'):
+        """Профилировщик cycles циклов с записью в path."""
+        self.cycles = cycles
+        self.path = path
+        self.done_cycles = 0
+        self.profile = cProfile.Profile() if cycles else None
+
+    @property
+    def done(self):
+        """Профилирование завершено."""
+        return bool(self.cycles) and self.done_cycles >= self.cycles
+
+    @contextmanager
+    def cycle(self):
+        """Профилируемый цикл; после N-го профиль сохраняется."""
+        if self.profile is None or self.done:
+            yield
+            return
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+            self.done_cycles += 1
+            if self.done:
+                self.profile.dump_stats(self.path)
+                logger.info(PROFILE_SAVED.format(self.cycles, self.path))
@@ -0,0 +1,142 @@
+import logging
+import reprlib
+from collections import deque, namedtuple
+from itertools import islice
+
+QUARANTINE_SIZE = 1000
+PREVIEW_LIMIT = 200
+
+HOMEWORK_SCHEMA = {
+    'homework_name': {'type': str},
+    'status': {'type': str},
+    'id': {'type': int, 'required': False},
+    'date_updated': {'type': str, 'required': False},
+    'reviewer_comment': {'type': str, 'required': False},
+    'lesson_name': {'type': str, 'required': False},
+}
+
+NOT_DICT_ITEM = 'Элемент не является словарем, тип объекта {}'
+MISSING_FIELD = 'Отсутствует ключ "{}"'
+WRONG_TYPE = 'Ключ "{}": ожидался тип {}, получен {}'
+UNEXPECTED_VALUE = 'Ключ "{}": недопустимое значение "{}"'
+QUARANTINED = 'Отложено записей: {}, первая #{}: {}'
+
+ValidationResult = namedtuple('ValidationResult', ('valid', 'rejected'))
+Rejected = namedtuple('Rejected', ('index', 'item', 'errors'))
+
+logger = logging.getLogger(__name__)
+
+
+class Preview(reprlib.Repr):
+    """reprlib без полной сортировки словарей и копирования байтов."""
+
+    def repr_dict(self, x, level):
+        """Первые maxdict пар словаря в порядке вставки."""
+        if not x:
+            return '{}'
+        if level <= 0:
+            return '{...}'
+        pieces = [
+            f'{self.repr1(key, level - 1)}: {self.repr1(x[key], level - 1)}'
+            for key in islice(x, self.maxdict)
+        ]
+        if len(x) > self.maxdict:
+            pieces.append('...')
+        return '{%s}' % ', '.join(pieces)
+
+    def repr_bytes(self, x, level):
+        """Начало байтовой строки."""
+        if len(x) <= self.maxstring:
+            return repr(x)
+        return repr(x[:self.maxstring]) + '...'
+
+    def repr_int(self, x, level):
+        """Число; для очень длинного — только число его битов."""
+        if x.bit_length() > self.maxlong * 4:
+            return f'<int: {x.bit_length()} bits>'
+        return super().repr_int(x, level)
+
+
+previews = Preview()
+previews.maxstring = previews.maxother = previews.maxlong = PREVIEW_LIMIT
+previews.maxlevel = 3
+
+
+def preview(value):
+    """Короткое представление значения из ответа API для сообщений.
+
+    Стоимость не зависит от размера и вложенности значения.
+    """
+    text = value if isinstance(value, str) else previews.repr(value)
+    if len(text) <= PREVIEW_LIMIT:
+        return text
+    return text[:PREVIEW_LIMIT] + '…'
+
+
+def compile_schema(schema):
+    """Схема в виде кортежа проверок (ключ, тип, обязательность, значения)."""
+    return tuple(
+        (
+            field,
+            rules['type'],
+            rules.get('required', True),
+            frozenset(rules['choices']) if 'choices' in rules else None
+        )
+        for field, rules in schema.items()
+    )
+
+
+class BatchValidator:
+    """Проверка списка записей за один проход по скомпилированной схеме.
+
+    Ошибки собираются по каждой записи; некорректные записи откладываются
+    в карантин ограниченного размера, корректные возвращаются дальше.
+    """
+
+    def __init__(
+        self, schema=HOMEWORK_SCHEMA, quarantine_size=QUARANTINE_SIZE
+    ):
+        """Проверка по схеме с карантином quarantine_size записей."""
+        self.checks = compile_schema(schema)
+        self.quarantine = deque(maxlen=quarantine_size)
+
+    def item_errors(self, item):
+        """Ошибки одной записи; пустой список для корректной."""
+        if type(item) is not dict:
+            return [NOT_DICT_ITEM.format(type(item))]
+        errors = []
+        for field, expected_type, required, choices in self.checks:
+            if field not in item:
+                if required:
+                    errors.append(MISSING_FIELD.format(field))
+                continue
+            value = item[field]
+            if not isinstance(value, expected_type):
+                errors.append(WRONG_TYPE.format(
+                    field, expected_type.__name__, type(value).__name__
+                ))
+            elif choices is not None and value not in choices:
+                errors.append(UNEXPECTED_VALUE.format(field, preview(value)))
+        return errors
+
+    def validate(self, items):
+        """Разделение записей на корректные и отложенные.
+
+        Отложенные записи хранятся в виде короткого представления,
+        чтобы карантин не удерживал большие ответы.
+        """
+        valid = []
+        rejected = []
+        for index, item in enumerate(items):
+            errors = self.item_errors(item)
+            if errors:
+                rejected.append(Rejected(index, preview(item), errors))
+            else:
+                valid.append(item)
+        if rejected:
+            first = rejected[0]
+            logger.warning(QUARANTINED.format(
+                len(rejected), first.index, first.errors
+            ))
+            self.quarantine.extend(rejected)
+        return ValidationResult(valid, rejected)
@@ -0,0 +1,137 @@
+import json
+import logging
+import sqlite3
+import threading
+from collections import namedtuple
+
+from cryptography.fernet import Fernet
+
+from caches import TTLCache
+from tenants import oauth_headers, tenant_key
+
+CREDENTIALS_CACHE_SIZE = 1024
+CREDENTIALS_TTL = 900
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tenants (
+    key TEXT PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    secret BLOB NOT NULL
+)
+'''
+
+VAULT_KEY_MISSING = 'Не задан мастер-ключ хранилища токенов'
+UNKNOWN_TENANT = 'Арендатор {} отсутствует в хранилище токенов'
+TENANTS_STORED = 'В хранилище токенов записано арендаторов: {}'
+
+logger = logging.getLogger(__name__)
+
+
+def generate_key():
+    """Новый мастер-ключ хранилища."""
+    return Fernet.generate_key().decode()
+
+
+class VaultTenant(namedtuple('VaultTenant', ('vault', 'key', 'chat_id'))):
+    """Арендатор из хранилища; токены расшифровываются при обращении."""
+
+    __slots__ = ()
+
+    @property
+    def practicum_token(self):
+        """Токен Практикума."""
+        return self.vault.credentials(self.key)[0]
+
+    @property
+    def telegram_token(self):
+        """Токен Telegram."""
+        return self.vault.credentials(self.key)[1]
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API Практикума."""
+        return oauth_headers(self.practicum_token)
+
+
+class TokenVault:
+    """Зашифрованное хранилище токенов арендаторов в SQLite.
+
+    Токены шифруются мастер-ключом (Fernet) и расшифровываются лениво,
+    при первом обращении; расшифрованные пары токенов держатся
+    в LRU-кэше с ограниченным временем жизни.
+    """
+
+    def __init__(
+        self, path, master_key, cache_size=CREDENTIALS_CACHE_SIZE,
+        ttl=CREDENTIALS_TTL
+    ):
+        """Открытие хранилища в файле path с мастер-ключом."""
+        if not master_key:
+            raise ValueError(VAULT_KEY_MISSING)
+        self.path = path
+        self.fernet = Fernet(master_key)
+        self.cache = TTLCache(cache_size, ttl)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(SCHEMA)
+
+    def encrypt(self, practicum_token, telegram_token):
+        """Шифрование пары токенов."""
+        return self.fernet.encrypt(
+            json.dumps([practicum_token, telegram_token]).encode()
+        )
+
+    def put_many(self, tenants):
+        """Запись арендаторов одной транзакцией."""
+        rows = [
+            (
+                tenant_key(tenant.chat_id, tenant.practicum_token),
+                tenant.chat_id,
+                self.encrypt(tenant.practicum_token, tenant.telegram_token)
+            )
+            for tenant in tenants
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO tenants VALUES (?, ?, ?)', rows
+            )
+        for key, _, _ in rows:
+            self.cache.pop(key)
+        logger.info(TENANTS_STORED.format(len(rows)))
+        return [key for key, _, _ in rows]
+
+    def remove(self, key):
+        """Удаление арендатора."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM tenants WHERE key = ?', (key,)
+            )
+        self.cache.pop(key)
+
+    def tenants(self):
+        """Арендаторы хранилища без расшифровки токенов."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT key, chat_id FROM tenants ORDER BY key'
+            ).fetchall()
+        return [VaultTenant(self, key, chat_id) for key, chat_id in rows]
+
+    def credentials(self, key):
+        """Пара токенов арендатора: из кэша или с расшифровкой."""
+        credentials = self.cache.get(key)
+        if credentials is not None:
+            return credentials
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT secret FROM tenants WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(UNKNOWN_TENANT.format(key))
+        credentials = tuple(json.loads(self.fernet.decrypt(row[0])))
+        self.cache.set(key, credentials)
+        return credentials
+
+    def close(self):
+        """Закрытие соединения с базой."""
+        self.connection.close()